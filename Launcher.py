@@ -1,32 +1,85 @@
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical
-from textual.widgets import Button, Static, ListView, ListItem, Header, Footer, TextArea
+from textual.widgets import Button, Static, Input, Header, Footer
 from textual.reactive import reactive
 from textual.binding import Binding
 from textual.message import Message
+from datetime import datetime
+import argparse
+import asyncio
 import subprocess
 import os
-import yaml
-import psutil
 import sys
 import threading
+import time
 import traceback
 import queue
 
-from widgets.screens import ProcessesModal, ManageApplicationsModal
+from widgets.app_list import AppList
+from core import (
+    OutputBuffer,
+    OutputNotifier,
+    OutputStream,
+    READ_CHUNK_SIZE, run_process, supervise,
+    CondaEnvNotFound, CondaEnvResolver,
+    PrewarmConfig, WarmPool,
+    EXITED, RUNNING, ProcessTable,
+    ProcessIndex,
+    NEW_SESSION_KWARGS,
+    ResourceSampler,
+    LogSpooler,
+    AppCatalog, CatalogError, diff_entries,
+    AppSearchIndex,
+    build_command,
+    BatchRunner, PrefixedOutput, report,
+    ADMIT_INTERVAL, LaunchQueue, LaunchRequest,
+    Supervisor, SupervisorClient, default_socket_path,
+    MetricsExporter, MetricsRegistry,
+    SamplingProfiler,
+)
 
 class CondaLauncher(App):
     CSS_PATH = "styles.tcss"
 
     BINDINGS = [
         Binding("ctrl+o", "show_processes", "Show Running Processes"),
-        Binding("ctrl+q", "quit", "Quit")
+        Binding("ctrl+q", "quit", "Quit"),
+        Binding("f12", "show_stats", "Launcher Stats", show=False),
+        Binding("f11", "dump_profile", "Dump Profile", show=False),
     ]
 
     applications = reactive([])
     selected_app = reactive(None)
-    running_processes = reactive({})
     process_outputs = {}
+    settings = {}
+
+    def __init__(self):
+        super().__init__()
+        self.metrics = MetricsRegistry()
+        self.metrics_exporter = None
+        self._metrics_config = (None, None)
+        self.profiler = SamplingProfiler()
+        self._awaiting_output = {}  # app name -> output of a run with no output yet
+        self.output_notifier = OutputNotifier(
+            lambda app_name: self._post(self.ProcessOutputUpdated(app_name))
+        )
+        self.conda_envs = CondaEnvResolver()
+        self.warm_pool = WarmPool()
+        self.process_index = ProcessIndex()
+        self.process_table = ProcessTable(
+            lambda record: self._post(self.ProcessStateChanged(record))
+        )
+        self.resource_sampler = ResourceSampler(self.process_table.running_apps, on_pass=self.process_index.refresh)
+        self.launch_queue = LaunchQueue()
+        self.supervisor = None  # SupervisorClient while attached
+        self._attached_at = None  # when the last attach to the supervisor began
+        self.log_spooler = LogSpooler(
+            on_error=lambda path, error: self._post(self.OutputLogFailed(path, error))
+        )
+        self.catalog = AppCatalog()
+        self.search_index = AppSearchIndex()
+        self._listed_apps = {}  # name -> entry shown in #app_list
+        self._reported_duplicates = []
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -34,7 +87,8 @@ class CondaLauncher(App):
             Horizontal(
                 Vertical(
                     Static("Applications", classes="section-title"),
-                    ListView(id="app_list"),
+                    Input(placeholder="Search applications", id="app_search"),
+                    AppList(id="app_list"),
                     Button("Manage Applications", id="manage_applications_button"),
                     id="left-panel"
                 ),
@@ -55,60 +109,158 @@ class CondaLauncher(App):
         yield Footer()
 
     def on_mount(self) -> None:
+        self.output_notifier.start()
+        self.resource_sampler.start()
+        self.log_spooler.start()
+        # Load and free memory change on their own, so queued launches are re-checked.
+        self.set_interval(ADMIT_INTERVAL, self._admit_launches)
+        # The catalog is read after the first frame, so the window shows up before it is parsed.
+        self.call_after_refresh(
+            lambda: self.run_worker(self._read_catalog, thread=True, group="catalog", exit_on_error=False)
+        )
+
+    def _read_catalog(self) -> None:
+        try:
+            self.catalog.load()
+        except (OSError, CatalogError):
+            pass  # load_applications reports it
+        self.call_from_thread(self._catalog_ready)
+
+    def _catalog_ready(self) -> None:
+        """Show the first load of the catalog, then watch it and attach to the supervisor."""
         self.load_applications()
+        self.catalog.watch(
+            lambda: self.call_from_thread(self.load_applications),
+            lambda e: self.call_from_thread(self.notify, f"Could not reload applications: {e}", severity="error"),
+        )
+        if self._use_supervisor():
+            self.run_worker(self._attach_supervisor(), group="supervisor", exit_on_error=False)
 
     def load_applications(self) -> None:
-        with open("applications.yaml", "r") as file:
-            data = yaml.safe_load(file)
-        self.applications = data["applications"]
-        app_list = self.query_one("#app_list", ListView)
-        app_list.clear()
-        for app in self.applications:
-            app_list.append(ListItem(Static(app["name"]), name=app["name"]))
+        try:
+            self.catalog.load()
+        except (OSError, CatalogError) as e:
+            self.notify(f"Could not load applications: {e}", severity="error")
+            return
+        # The watcher may already have loaded the change, so compare with
+        # what was last reported rather than relying on load()'s result.
+        if self.catalog.duplicates != self._reported_duplicates:
+            self._reported_duplicates = self.catalog.duplicates
+            if self.catalog.duplicates:
+                names = ", ".join(sorted(set(self.catalog.duplicates)))
+                self.notify(f"Duplicate application names, only the first entry is used: {names}", severity="warning")
+        self.applications = self.catalog.applications
+        self.settings = self.catalog.settings
+        self.output_notifier.window = self.settings.get("output_batch_window", self.output_notifier.window)
+        self.warm_pool.max_workers = self.settings.get("prewarm_max_workers", self.warm_pool.max_workers)
+        self.resource_sampler.interval = self.settings.get("metrics_interval", self.resource_sampler.interval)
+        self.resource_sampler.history_size = self.settings.get("metrics_history", self.resource_sampler.history_size)
+        self.log_spooler.log_dir = self.settings.get("log_dir", self.log_spooler.log_dir)
+        self.log_spooler.keep_runs = self.settings.get("log_keep_runs", self.log_spooler.keep_runs)
+        self.log_spooler.search_index = self.settings.get("output_search_index", False)
+        try:
+            self.launch_queue.configure(self.settings)
+        except ValueError as e:
+            self.notify(f"Invalid launch queue settings: {e}", severity="error")
+        self._configure_instrumentation()
+        diff = diff_entries(self._listed_apps, self.catalog.by_name)
+        for name in diff.added + diff.changed:
+            app = self.catalog.get(name)
+            if not PrewarmConfig.from_config(app):
+                continue
+            if self.supervisor is not None:
+                self.supervisor.prewarm(app, self.settings)
+            elif not self._use_supervisor():
+                self.run_worker(self._prewarm(app), group="prewarm", exit_on_error=False)
+        self._update_app_list(diff)
 
-    def get_running_apps(self):
-        running_apps = []
-        to_remove = []
-        for app_name, pid in self.running_processes.items():
-            try:
-                process = psutil.Process(pid)
-                if process.is_running():
-                    running_apps.append((app_name, pid))
+    def _update_app_list(self, diff) -> None:
+        """Re-index the catalog if it changed and re-run the current search."""
+        if any(diff) or list(self._listed_apps) != list(self.catalog.by_name):
+            self.search_index.rebuild(list(self.catalog.by_name.values()))
+            self.filter_applications()
+        self._listed_apps = dict(self.catalog.by_name)
+
+        if self.selected_app is not None:
+            name = self.selected_app["name"]
+            if name in diff.removed:
+                self.selected_app = None
+                self.query_one("#details", Static).update("")
+            elif name in diff.changed:
+                self.selected_app = self.catalog.get(name)
+                self.show_details()
+
+    def _configure_instrumentation(self) -> None:
+        """Start or stop the metrics exporter and the profiler to match the settings."""
+        config = (self.settings.get("metrics_textfile"), self.settings.get("metrics_port"))
+        if config != self._metrics_config:
+            self._metrics_config = config
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.stop()
+                self.metrics_exporter = None
+            if any(config):
+                exporter = MetricsExporter(self.metrics, *config)
+                try:
+                    exporter.start()
+                except OSError as e:
+                    self.notify(f"Cannot serve metrics on port {config[1]}: {e}", severity="error")
                 else:
-                    to_remove.append(app_name)
-            except psutil.NoSuchProcess:
-                to_remove.append(app_name)
-        
-        # Remove non-existent processes outside the loop
-        for app_name in to_remove:
-            del self.running_processes[app_name]
-            if app_name in self.process_outputs:
-                del self.process_outputs[app_name]
-        
-        return running_apps
-
-    def get_app_pid(self, path):
-        script_name = os.path.basename(path)
-        for process in psutil.process_iter(['name', 'cmdline', 'pid']):
-            try:
-                if process.name().lower() == 'python.exe':
-                    cmdline = process.cmdline()
-                    if len(cmdline) > 1 and script_name in cmdline[-1]:
-                        return process.pid
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-        return None
+                    self.metrics_exporter = exporter
+        self.profiler.interval = self.settings.get("profiler_interval", self.profiler.interval)
+        if self.settings.get("profiler", False):
+            self.profiler.start()
+        else:
+            self.profiler.stop()
+
+    def _post(self, message) -> None:
+        self.metrics.counter("messages_posted_total", "Messages posted to the UI by the launcher.", message=type(message).__name__).inc()
+        self.post_message(message)
+
+    def _output_marked(self, app_name, count) -> None:
+        """Account for ``count`` lines of ``app_name`` stored or rewritten, and tell the UI."""
+        self.metrics.counter("output_lines_total", "Lines of application output stored or rewritten.", app=app_name).inc(count)
+        if self._awaiting_output.pop(app_name, None) is not None:
+            record = self.process_table.get(app_name)
+            if record is not None and record.started_at is not None:
+                self.metrics.histogram(
+                    "first_output_seconds", "Time from the start of a launch to its first line of output.", app=app_name,
+                ).observe(time.time() - record.started_at)
+        self.output_notifier.mark(app_name, count)
+
+    def _bytes_counter(self, app_name):
+        return self.metrics.counter("output_bytes_total", "Bytes of application output read from its pipes.", app=app_name)
+
+    @property
+    def running_processes(self):
+        return dict(self.process_table.running_apps())
+
+    def get_running_apps(self):
+        with self.metrics.histogram("get_running_apps_seconds", "Time taken by get_running_apps.").time():
+            return self.process_table.running_apps()
 
-    def on_list_view_selected(self, event: ListView.Selected) -> None:
-        if event.list_view.id == "app_list":
-            selected_name = event.item.name
-            self.selected_app = next((app for app in self.applications if app["name"] == selected_name), None)
-            if self.selected_app:
-                details = f"Name: {self.selected_app['name']}\n"
-                details += f"Conda Env: {self.selected_app['conda_env']}\n"
-                details += f"Path: {self.selected_app['path']}\n"
-                details += f"Description: {self.selected_app['description']}"
-                self.query_one("#details", Static).update(details)
+    def filter_applications(self) -> None:
+        query = self.query_one("#app_search", Input).value
+        self.query_one("#app_list", AppList).set_rows(self.search_index.search(query))
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "app_search":
+            self.filter_applications()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        if event.input.id == "app_search":
+            self.query_one("#app_list", AppList).action_select_cursor()
+
+    def on_app_list_selected(self, event: AppList.Selected) -> None:
+        self.selected_app = self.catalog.get(event.name)
+        if self.selected_app:
+            self.show_details()
+
+    def show_details(self) -> None:
+        details = f"Name: {self.selected_app['name']}\n"
+        details += f"Conda Env: {self.selected_app['conda_env']}\n"
+        details += f"Path: {self.selected_app['path']}\n"
+        details += f"Description: {self.selected_app['description']}"
+        self.query_one("#details", Static).update(details)
 
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "launch_button":
@@ -116,6 +268,8 @@ class CondaLauncher(App):
         elif event.button.id == "refresh_button":
             self.load_applications()
         elif event.button.id == "manage_applications_button":
+            from widgets.screens import ManageApplicationsModal
+
             self.push_screen(ManageApplicationsModal())
 
     def launch_application(self) -> None:
@@ -123,73 +277,395 @@ class CondaLauncher(App):
             self.notify("Please select an application.")
             return
 
-        activate_cmd = f'conda activate {self.selected_app["conda_env"]}'
-        python_cmd = f'python "{self.selected_app["path"]}"'
-        full_cmd = f'{activate_cmd} && {python_cmd}'
+        app = self.selected_app
+        if self.supervisor is not None:
+            self.supervisor.launch(app, self.settings)
+            return
+        if app['name'] in self.launch_queue:
+            self.notify(f"{app['name']} is already queued or running.")
+            return
+        try:
+            request = LaunchRequest.from_config(app, payload=app)
+        except ValueError as e:
+            self.notify(f"Cannot launch {app['name']}: {e}", severity="error")
+            return
+        self.launch_queue.submit(request)
+        self.process_table.queued(app['name'])
+        self._admit_launches()
+        if request.admitted_at is None:
+            self.notify(f"Queued {app['name']}: {request.reason}.")
+
+    def cancel_launch(self, app_name) -> None:
+        """Drop a launch that is still queued."""
+        if self.supervisor is not None:
+            self.supervisor.cancel(app_name)
+        elif self.launch_queue.cancel(app_name):
+            self.process_table.exited(app_name, None)
+            self.notify(f"Cancelled launch of {app_name}.")
+
+    def launch_reason(self, app_name):
+        """Why the queued launch of ``app_name`` is still waiting."""
+        if self.supervisor is not None:
+            return self.supervisor.reasons.get(app_name, "")
+        return next((r.reason for r in self.launch_queue.queued if r.name == app_name), "")
+
+    def _use_supervisor(self):
+        return self.settings.get("supervisor", False) and os.name != 'nt'
+
+    async def _attach_supervisor(self) -> None:
+        client = SupervisorClient(
+            self.process_table, self._mirror_output, self._output_marked, self.notify,
+            path=self.settings.get("supervisor_socket"),
+            base_dir=os.path.dirname(os.path.abspath(self.catalog.path)),
+        )
+        self._attached_at = time.time()
+        try:
+            await client.connect(spawn=lambda: self._spawn_supervisor(client.path))
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self.notify(f"Cannot reach the supervisor, launching directly: {e}", severity="error")
+            return
+        self.supervisor = client
+        running = len(self.process_table.running_apps())
+        self.notify(f"Attached to the supervisor (PID {client.pid}), {running} application(s) running.")
+        for app in self.catalog.applications:
+            if PrewarmConfig.from_config(app):
+                client.prewarm(app, self.settings)
+        await client.run()
+        if self.supervisor is client:
+            self.supervisor = None
+            self.notify("Lost the connection to the supervisor; new launches run directly.", severity="warning")
+
+    def _spawn_supervisor(self, path) -> None:
+        """Start ``Launcher.py supervisor`` in a session of its own, so it outlives this process."""
+        log_dir = self.settings.get("log_dir", self.log_spooler.log_dir)
+        os.makedirs(log_dir, exist_ok=True)
+        with open(os.path.join(log_dir, "supervisor.log"), "ab") as log:
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "supervisor", "--socket", path],
+                stdin=subprocess.DEVNULL, stdout=log, stderr=log, **NEW_SESSION_KWARGS,
+            )
+
+    def _mirror_output(self, app_name, log):
+        """Create the buffer that output of a run under the supervisor is copied into."""
+        output = self.process_outputs[app_name] = OutputBuffer.from_config(self.catalog.get(app_name) or {}, log=log)
+        self._awaiting_output[app_name] = output
+        return output
+
+    def _admit_launches(self) -> None:
+        for request in self.launch_queue.pump():
+            self.process_table.admitted(request.name)
+            self._start_launch(request.payload)
+
+    def _start_launch(self, app) -> None:
+        command, shell, env = self._build_command(app)
 
         try:
-            thread = threading.Thread(target=self._run_app_in_thread, args=(full_cmd,))
-            thread.start()
-            self.notify(f"Launched {self.selected_app['name']} in {self.selected_app['conda_env']} environment.")
+            if self.settings.get("launch_backend", "asyncio") == "thread":
+                thread = threading.Thread(target=self._run_app_in_thread, args=(command, app, shell, env))
+                thread.start()
+            else:
+                self.run_worker(self._run_app_async(command, app, shell, env), group="launch", exit_on_error=False)
+            self.notify(f"Launched {app['name']} in {app['conda_env']} environment.")
         except Exception as e:
+            self.process_table.exited(app['name'], None)
             self.notify(f"Error launching application: {str(e)}")
             traceback.print_exc()
 
-    def _run_app_in_thread(self, cmd):
-        print(f"Running command: {cmd}")  # Debug print
-        if os.name == 'nt':  # Windows
-            process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1, universal_newlines=True)
-        else:  # Unix-like systems
-            process = subprocess.Popen(['bash', '-c', cmd], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1, universal_newlines=True)
+    def _build_command(self, app):
+        """Return ``(command, shell, env)`` used to start ``app``."""
+        return build_command(
+            app, self.settings, self.conda_envs,
+            lambda e: self.notify(f"{e}; falling back to conda activate.", severity="warning"),
+        )
 
-        self.running_processes[self.selected_app['name']] = process.pid
-        print(f"Added process to running_processes: {self.selected_app['name']} (PID: {process.pid})")  # Debug print
-        
-        self.process_outputs[self.selected_app['name']] = ""
+    def _run_app_in_thread(self, cmd, app, shell=False, env=None):
+        app_name = app['name']
+        # This runs on its own thread; toasts have to be raised on the app's.
+        def notify(*args, **kwargs):
+            self.call_from_thread(self.notify, *args, **kwargs)
+
+        self.process_table.starting(app_name)
+        try:
+            process = subprocess.Popen(cmd, shell=shell, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **NEW_SESSION_KWARGS)
+        except OSError as e:
+            self.process_table.exited(app_name, None)
+            notify(f"Error launching application: {str(e)}")
+            return
+
+        self.process_table.running(app_name, process.pid)
+        self.process_index.track(app_name, process.pid, app['path'])
+
+        output = self._new_output(app, notify)
+        received = self._bytes_counter(app_name)
 
         def enqueue_output(out, app_name):
-            print("Starting to read output")  # Debug print
-            for line in iter(out.readline, ''):
-                print(f"Read line: {line}")  # Debug print
-                self.process_outputs[app_name] += line
-                self.post_message(self.ProcessOutputUpdated(app_name))
-            print("Finished reading output")  # Debug print
+            lines = OutputStream(output)
+            # read1 returns whatever is in the pipe (up to the chunk size)
+            # instead of waiting for a full line.
+            for data in iter(lambda: out.read1(READ_CHUNK_SIZE), b''):
+                received.inc(len(data))
+                count = lines.feed(data)
+                if count:
+                    self._output_marked(app_name, count)
+            count = lines.close()
+            if count:
+                self._output_marked(app_name, count)
             out.close()
 
-        threading.Thread(target=enqueue_output, args=(process.stdout, self.selected_app['name']), daemon=True).start()
-        threading.Thread(target=enqueue_output, args=(process.stderr, self.selected_app['name']), daemon=True).start()
+        readers = [
+            threading.Thread(target=enqueue_output, args=(process.stdout, app_name), daemon=True),
+            threading.Thread(target=enqueue_output, args=(process.stderr, app_name), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
 
         process.wait()
-        
-        # Check if the process has exited normally
-        if process.returncode is not None:
-            if self.selected_app['name'] in self.running_processes:
-                del self.running_processes[self.selected_app['name']]
-            print(f"Removed process from running_processes: {self.selected_app['name']}")  # Debug print
+        for reader in readers:
+            reader.join()
+        output.finish()
+        self.process_index.untrack(app_name)
+        self.process_table.exited(app_name, process.returncode)
+
+    def _new_output(self, app, notify=None):
+        """Create the output buffer for a new run of ``app``, spooled to a fresh log file.
+
+        ``notify`` replaces ``self.notify`` when called off the app's thread.
+        """
+        try:
+            log = self.log_spooler.open_run(app['name'])
+        except OSError as e:
+            (notify or self.notify)(f"Cannot write output log for {app['name']}: {e}", severity="warning")
+            log = None
+        output = self.process_outputs[app['name']] = OutputBuffer.from_config(app, log=log)
+        self._awaiting_output[app['name']] = output
+        return output
+
+    async def _prewarm(self, app):
+        try:
+            await self.warm_pool.prewarm_app(app, self.conda_envs)
+        except CondaEnvNotFound as e:
+            self.notify(f"Cannot prewarm {app['name']}: {e}", severity="warning")
+
+    async def _run_app_async(self, cmd, app, shell=False, env=None):
+        app_name = app['name']
+        output = self._new_output(app)
+        self.process_table.starting(app_name)
+
+        def started(pid, direct=False):
+            self.process_table.running(app_name, pid)
+            self.process_index.track(app_name, pid, app['path'], direct=direct)
 
-    def get_process_output(self, app_name):
-        return self.process_outputs.get(app_name, "No output available.")
+        def on_lines(count):
+            self._output_marked(app_name, count)
+
+        on_data = self._bytes_counter(app_name).inc
+        returncode = None
+        try:
+            process = await self.warm_pool.acquire_app(app, self.conda_envs)
+            if process is not None:
+                # A warm worker runs the script itself, with no wrapper to look through.
+                returncode = await supervise(process, output, on_lines, lambda pid: started(pid, direct=True), on_data)
+            else:
+                returncode = await run_process(cmd, output, on_lines, started, shell=shell, env=env, on_data=on_data)
+        except Exception as e:
+            self.notify(f"Error launching application: {str(e)}")
+            traceback.print_exc()
+        finally:
+            output.finish()
+            self.process_index.untrack(app_name)
+            self.process_table.exited(app_name, returncode)
+
+    def get_process_output(self, app_name, offset=0, limit=None):
+        """Return ``(lines, next_offset)`` for output of ``app_name`` produced since ``offset``."""
+        output = self.process_outputs.get(app_name)
+        if output is None:
+            return [], 0
+        return output.lines_since(offset, limit)
 
     class ProcessOutputUpdated(Message):
+        # Forwarded to the active screen by the app, so it must not bubble back.
+        bubble = False
+
         def __init__(self, app_name: str) -> None:
             self.app_name = app_name
             super().__init__()
 
+    class ProcessStateChanged(Message):
+        def __init__(self, record) -> None:
+            self.record = record
+            super().__init__()
+
+    class OutputLogFailed(Message):
+        def __init__(self, path, error) -> None:
+            self.path = path
+            self.error = error
+            super().__init__()
+
+    def on_conda_launcher_output_log_failed(self, message: OutputLogFailed) -> None:
+        self.notify(
+            f"Stopped writing output log {message.path}: {message.error}. Output no longer kept in memory will be unavailable.",
+            severity="error",
+        )
+
+    def on_conda_launcher_process_state_changed(self, message: ProcessStateChanged) -> None:
+        record = message.record
+        # The app may have been launched again since this message was posted.
+        if record.state == EXITED and self.process_table.get(record.app_name).state == EXITED:
+            self.launch_queue.finished(record.app_name)
+            self._admit_launches()
+        if self.supervisor is not None and record.app_name in self.supervisor.outputs:
+            app = self.catalog.get(record.app_name)
+            if record.state == RUNNING and app is not None:
+                self.process_index.track(record.app_name, record.pid, app['path'])
+            elif record.state == EXITED:
+                self.process_index.untrack(record.app_name)
+        # The supervisor's snapshot on attaching includes runs that exited before; only report new exits.
+        exited_before = self._attached_at is not None and record.exited_at is not None and record.exited_at < self._attached_at
+        if record.state == EXITED and record.returncode is not None and not exited_before:
+            severity = "information" if record.returncode == 0 else "warning"
+            self.notify(f"{record.app_name} exited with code {record.returncode}.", severity=severity)
+        modal = self._processes_modal()
+        if modal is not None:
+            modal.update_running_apps()
+
+    def on_conda_launcher_process_output_updated(self, message: ProcessOutputUpdated) -> None:
+        self.output_notifier.acknowledge(message.app_name)
+        modal = self._processes_modal()
+        if modal is not None:
+            modal.post_message(self.ProcessOutputUpdated(message.app_name))
+
+    def _processes_modal(self):
+        """The processes screen if it is on top, without importing it before it was ever opened."""
+        module = sys.modules.get("widgets.screens.processes_modal")
+        if module is not None and self.screen_stack and isinstance(self.screen_stack[-1], module.ProcessesModal):
+            return self.screen_stack[-1]
+        return None
+
     def action_show_processes(self) -> None:
+        from widgets.screens import ProcessesModal
+
         self.push_screen(ProcessesModal())
 
-    def on_manage_applications_modal_applications_updated(self, message: ManageApplicationsModal.ApplicationsUpdated):
+    def action_show_stats(self) -> None:
+        from widgets.screens import StatsModal
+
+        if isinstance(self.screen, StatsModal):
+            self.pop_screen()
+        else:
+            self.push_screen(StatsModal())
+
+    def action_dump_profile(self) -> None:
+        """Write the profiler's samples as folded stacks, for a flame graph."""
+        if not self.profiler.running:
+            self.notify("The profiler is off; set profiler: true in the settings to record samples.", severity="warning")
+            return
+        log_dir = self.settings.get("log_dir", self.log_spooler.log_dir)
+        path = os.path.join(log_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            samples = self.profiler.dump(path)
+        except OSError as e:
+            self.notify(f"Cannot write profile: {e}", severity="error")
+            return
+        self.notify(f"Wrote {samples} profiler samples to {path}.")
+
+    def on_manage_applications_modal_applications_updated(self, message):
         self.load_applications()
 
-    def action_quit(self) -> None:
-        """Quit the application if no processes are running."""
+    async def action_quit(self) -> None:
+        """Quit the application if no processes are running, or detach from the supervisor."""
         running_apps = self.get_running_apps()
+        if self.supervisor is not None:
+            # Apps under the supervisor keep running after this UI is gone.
+            running_apps = [app for app in running_apps if app[0] not in self.supervisor.outputs]
         if running_apps:
             app_names = ", ".join([app[0] for app in running_apps])
             self.notify(f"Cannot quit. Processes are still running: {app_names}", severity="error", timeout=5)
         else:
+            if self.supervisor is not None:
+                client, self.supervisor = self.supervisor, None
+                client.close()
+            await self.warm_pool.shutdown()
+            self.catalog.stop()
+            self.log_spooler.stop()
+            self.profiler.stop()
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.stop()
             self.exit()
 
+def run_batch(args) -> int:
+    """Start applications without the UI and stream their output; return the exit status."""
+    catalog = AppCatalog()
+    try:
+        catalog.load()
+    except (OSError, CatalogError) as e:
+        print(f"Could not load applications: {e}", file=sys.stderr)
+        return 2
+    names = list(catalog.by_name) if args.all else list(dict.fromkeys(args.apps))
+    unknown = [name for name in names if name not in catalog.by_name]
+    if unknown:
+        print(f"Unknown applications: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if not names:
+        print("No applications to run.", file=sys.stderr)
+        return 2
+
+    settings = catalog.settings
+    log_spooler = LogSpooler(on_error=lambda path, error: print(f"Stopped writing output log {path}: {error}", file=sys.stderr))
+    log_spooler.log_dir = settings.get("log_dir", log_spooler.log_dir)
+    log_spooler.keep_runs = settings.get("log_keep_runs", log_spooler.keep_runs)
+    color = sys.stdout.isatty() and "NO_COLOR" not in os.environ
+    try:
+        runner = BatchRunner(
+            [catalog.get(name) for name in names], settings, CondaEnvResolver(), log_spooler,
+            PrefixedOutput(names, sys.stdout, color), parallel=args.parallel,
+        )
+    except ValueError as e:
+        print(f"Invalid launch settings: {e}", file=sys.stderr)
+        return 2
+    log_spooler.start()
+    try:
+        results = asyncio.run(runner.run())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("Interrupted; running applications were terminated.", file=sys.stderr)
+        return 130
+    finally:
+        log_spooler.stop()
+    return report(results)
+
+
+def run_supervisor(args) -> int:
+    """Serve launches to UI clients until idle; return the exit status."""
+    if os.name == 'nt':
+        # Same check as _use_supervisor: clients reach it over a Unix socket.
+        print("The supervisor is not available on Windows.", file=sys.stderr)
+        return 2
+    path = args.socket or default_socket_path()
+    try:
+        asyncio.run(Supervisor(path).serve())
+    except OSError as e:
+        print(f"Cannot serve on {path}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Launch Python applications in their Conda environments.")
+    commands = parser.add_subparsers(dest="command")
+    run = commands.add_parser("run", help="start applications without the UI and print their output")
+    run.add_argument("apps", nargs="*", help="names of entries in applications.yaml")
+    run.add_argument("--all", action="store_true", help="run every application")
+    run.add_argument("--parallel", type=int, metavar="N", help="run at most N at once (default: the max_concurrency setting, or the number of CPUs)")
+    supervisor = commands.add_parser("supervisor", help="run the supervisor that keeps applications running while no UI is open")
+    supervisor.add_argument("--socket", metavar="PATH", help="Unix socket to serve on (default: in $XDG_RUNTIME_DIR or the temp directory)")
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return run_batch(args)
+    if args.command == "supervisor":
+        return run_supervisor(args)
+    CondaLauncher().run()
+    return 0
+
+
 if __name__ == "__main__":
-    app = CondaLauncher()
-    app.run()
+    sys.exit(main())
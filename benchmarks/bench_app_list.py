@@ -0,0 +1,177 @@
+"""Time first paint and per-keystroke search of the application list on a large catalog.
+
+Usage:
+    python benchmarks/bench_app_list.py [--apps 10000] [--query "stable diff"] [--listview-apps 2000] [--max-p95 10]
+
+Generates a synthetic catalog, then reports:
+
+- the search index: the time to build its postings, then the time for each
+  prefix of ``--query`` as it is typed (incremental) and for the same
+  prefix searched with a fresh index;
+- first paint: a bare app showing the catalog as one ``ListItem`` per entry,
+  as ``#app_list`` used to, against the same app with ``AppList``, and the
+  launcher itself started in a temporary directory. The ``ListView`` takes
+  minutes at 10,000 entries, so it gets only ``--listview-apps`` of them;
+- the launcher's search handler (index search plus list update) for each
+  keystroke of ``--query``. Times exclude the headless pilot's own wait.
+
+Exits with status 1 if the 95th percentile of the typed searches or of the
+search handler is over ``--max-p95`` milliseconds.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from textual.app import App
+from textual.widgets import Input, ListItem, ListView, Static
+
+from core import AppSearchIndex
+from core.app_search import BACKGROUND_BUILD
+from Launcher import CondaLauncher
+from widgets.app_list import AppList
+
+WORDS = ("stable diffusion comfy jupyter lab notebook whisper llama server trainer "
+         "vision torch audio video label studio gradio demo tensorboard chat").split()
+
+
+def synthetic_catalog(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+            "conda_env": rng.choice(["base", "ml", "torch-2.1", "/opt/envs/sd"]),
+            "path": f"/opt/apps/app_{i}.py",
+            "description": " ".join(rng.choices(WORDS, k=8)),
+        }
+        for i in range(count)
+    ]
+
+
+def ms(seconds):
+    return f"{seconds * 1000:8.2f}ms"
+
+
+def p95(times):
+    return statistics.quantiles(times, n=20, method="inclusive")[18] if len(times) > 1 else times[0]
+
+
+def fresh_index(apps):
+    index = AppSearchIndex(apps)
+    index.wait()
+    return index
+
+
+def bench_search(apps, query):
+    start = time.perf_counter()
+    index = fresh_index(apps)
+    print(f"index build: {ms(time.perf_counter() - start)} (on a background thread from {BACKGROUND_BUILD} entries)")
+    print(f"{'prefix':<20} {'matches':>8} {'typed':>10} {'from scratch':>12}")
+    typed_times = []
+    for end in range(1, len(query) + 1):
+        prefix = query[:end]
+        start = time.perf_counter()
+        matches = index.search(prefix)
+        typed = time.perf_counter() - start
+        typed_times.append(typed)
+        cold = fresh_index(apps)
+        start = time.perf_counter()
+        cold.search(prefix)
+        scratch = time.perf_counter() - start
+        print(f"{prefix!r:<20} {len(matches):>8} {ms(typed)} {ms(scratch):>12}")
+    print(f"typed: median {ms(statistics.median(typed_times))}, p95 {ms(p95(typed_times))}, max {ms(max(typed_times))}")
+    return typed_times
+
+
+class ListViewApp(App):
+    def __init__(self, names):
+        super().__init__()
+        self.names = names
+
+    def compose(self):
+        yield ListView(*(ListItem(Static(name), name=name) for name in self.names))
+
+
+class AppListApp(App):
+    def __init__(self, names):
+        super().__init__()
+        self.names = names
+
+    def compose(self):
+        yield AppList()
+
+    def on_mount(self):
+        self.query_one(AppList).set_rows(self.names)
+
+
+async def first_paint(app):
+    start = time.perf_counter()
+    async with app.run_test() as pilot:
+        await pilot.pause()
+        return time.perf_counter() - start
+
+
+async def bench_launcher(query):
+    elapsed = await first_paint(CondaLauncher())
+    print(f"first paint, launcher          {ms(elapsed)}  (includes parsing applications.yaml)")
+    app = CondaLauncher()
+    async with app.run_test() as pilot:
+        while not app._listed_apps:
+            await asyncio.sleep(0.01)  # the catalog is read after the first frame
+        app.search_index.wait()
+        await pilot.pause()
+        search = app.query_one("#app_search", Input)
+        times = []
+        for end in range(1, len(query) + 1):
+            with search.prevent(Input.Changed):
+                search.value = query[:end]
+            start = time.perf_counter()
+            app.filter_applications()
+            times.append(time.perf_counter() - start)
+            await pilot.pause()
+        print(f"search handler per keystroke: median {ms(statistics.median(times))}, p95 {ms(p95(times))}, max {ms(max(times))}")
+        return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=10000)
+    parser.add_argument("--query", default="stable diff")
+    parser.add_argument("--listview-apps", type=int, default=2000)
+    parser.add_argument("--max-p95", type=float, default=10.0, metavar="MS", help="fail above this per-keystroke p95")
+    args = parser.parse_args()
+
+    apps = synthetic_catalog(args.apps)
+    names = [app["name"] for app in apps]
+    typed_times = bench_search(apps, args.query)
+
+    elapsed = asyncio.run(first_paint(AppListApp(names)))
+    print(f"first paint, AppList           {ms(elapsed)}  ({len(names)} entries)")
+    listed = names[:args.listview_apps]
+    elapsed = asyncio.run(first_paint(ListViewApp(listed)))
+    print(f"first paint, ListView          {ms(elapsed)}  ({len(listed)} entries)")
+
+    os.chdir(tempfile.mkdtemp(prefix="bench-app-list-"))
+    with open("applications.yaml", "w") as file:
+        yaml.safe_dump({"applications": apps}, file, sort_keys=False)
+    handler_times = asyncio.run(bench_launcher(args.query))
+
+    failed = False
+    for label, times in (("typed search", typed_times), ("search handler", handler_times)):
+        if p95(times) * 1000 > args.max_p95:
+            print(f"FAIL: {label} p95 {p95(times) * 1000:.2f}ms is over {args.max_p95:.1f}ms", file=sys.stderr)
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
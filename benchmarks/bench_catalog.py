@@ -0,0 +1,97 @@
+"""Time refreshing a large applications.yaml in the launcher, old way and new.
+
+Usage:
+    python benchmarks/bench_catalog.py [--apps 3000]
+
+Runs the launcher headless in a temporary directory holding a generated
+catalog. "old" re-parses with the pure-Python loader and mounts a list
+item per entry, as ``load_applications`` used to; the rest go through the
+cached catalog and the launcher's current list. Times include waiting for
+the UI to settle.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from textual.widgets import ListItem, ListView, Static
+
+from Launcher import CondaLauncher
+from widgets.app_list import AppList
+
+
+def write_catalog(path, apps):
+    with open(path, "w") as file:
+        yaml.safe_dump({"applications": apps}, file, sort_keys=False)
+
+
+def old_refresh(app):
+    with open("applications.yaml", "r") as file:
+        data = yaml.safe_load(file)
+    app_list = ListView()
+    app.query_one("#left-panel").mount(app_list)
+    for entry in data["applications"]:
+        app_list.append(ListItem(Static(entry["name"]), name=entry["name"]))
+
+
+async def run(apps):
+    app = CondaLauncher()
+    async with app.run_test() as pilot:
+        await pilot.pause()
+        await asyncio.sleep(1)  # let the first mount finish
+        await pilot.pause()
+
+        async def timed(label, action):
+            start = time.perf_counter()
+            action()
+            called = time.perf_counter()
+            await pilot.pause()
+            print(f"{label:<28} {(called - start) * 1000:9.1f}ms in the call, "
+                  f"{(time.perf_counter() - start) * 1000:9.1f}ms until the UI settled")
+
+        await timed("new refresh, unchanged", app.load_applications)
+        apps[len(apps) // 2]["description"] = "edited"
+        write_catalog("applications.yaml", apps)
+        await timed("new refresh, one edit", app.load_applications)
+        apps.insert(len(apps) // 3, {**apps[0], "name": "Inserted"})
+        del apps[-1]
+        write_catalog("applications.yaml", apps)
+        await timed("new refresh, add + remove", app.load_applications)
+        assert app.query_one(AppList).rows == [entry["name"] for entry in apps]
+        # Last, since it adds a second list to the screen.
+        await timed("old refresh (full rebuild)", lambda: old_refresh(app))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=3000)
+    args = parser.parse_args()
+
+    apps = [
+        {"name": f"App {i}", "conda_env": "base", "path": f"/opt/apps/app_{i}.py", "description": f"Application number {i}"}
+        for i in range(args.apps)
+    ]
+    os.chdir(tempfile.mkdtemp(prefix="bench-catalog-"))
+    write_catalog("applications.yaml", apps)
+
+    for loader in (yaml.SafeLoader, getattr(yaml, "CSafeLoader", None)):
+        if loader is None:
+            continue
+        with open("applications.yaml", "rb") as file:
+            start = time.perf_counter()
+            yaml.load(file, Loader=loader)
+        print(f"parse with {loader.__name__:<17} {(time.perf_counter() - start) * 1000:9.1f}ms")
+
+    start = time.perf_counter()
+    asyncio.run(run(apps))
+    print(f"total {time.perf_counter() - start:.1f}s for {args.apps} apps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Measure launch-to-first-output latency of fast launch against the shell path.
+
+Usage:
+    python benchmarks/bench_fast_launch.py [--runs 20] [--conda]
+
+A fake conda root (``<tmp>/envs/fake/bin/python``) is built around the
+current interpreter so no conda install is needed. ``--conda`` also times a
+real ``conda activate base`` through bash when conda is on PATH.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import CondaEnvResolver
+
+SCRIPT = "print('ready', flush=True)\n"
+
+
+def make_fake_root(root):
+    prefix = os.path.join(root, "envs", "fake")
+    bin_dir = os.path.join(prefix, "Scripts" if os.name == 'nt' else "bin")
+    os.makedirs(bin_dir)
+    os.makedirs(os.path.join(prefix, "conda-meta"))
+    python = os.path.join(prefix, "python.exe") if os.name == 'nt' else os.path.join(bin_dir, "python")
+    try:
+        os.symlink(sys.executable, python)
+    except OSError:  # no symlink privilege on Windows
+        shutil.copy(sys.executable, python)
+    return prefix
+
+
+def time_to_first_line(command, shell=False, env=None):
+    start = time.perf_counter()
+    process = subprocess.Popen(command, shell=shell, env=env, stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    process.wait()
+    return elapsed
+
+
+def report(name, samples, scale=1000, unit="ms"):
+    samples = sorted(samples)
+    print(f"{name:<28} median={statistics.median(samples) * scale:8.2f}{unit}  "
+          f"p90={samples[int(len(samples) * 0.9) - 1] * scale:8.2f}{unit}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--conda", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_fake_root(root)
+        script = os.path.join(root, "app.py")
+        with open(script, "w") as file:
+            file.write(SCRIPT)
+
+        resolver = CondaEnvResolver(environ={"CONDA_ROOT": root, "PATH": os.environ.get("PATH", "")})
+        start = time.perf_counter()
+        resolver.resolve("fake")
+        cold = time.perf_counter() - start
+        warm = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            resolver.resolve("fake")
+            warm.append(time.perf_counter() - start)
+        print(f"{'resolve (cold)':<28} {cold * 1e6:8.2f}us")
+        report("resolve (cached)", warm, 1e6, "us")
+
+        env = resolver.resolve("fake")
+        environ = env.environ()
+        report("fast launch", [time_to_first_line([env.python, script], env=environ) for _ in range(args.runs)])
+
+        if os.name != 'nt':
+            wrapped = f'export PATH="{env.path_entries()[0]}:$PATH" && python "{script}"'
+            report("bash -c wrapper", [time_to_first_line(["bash", "-c", wrapped]) for _ in range(args.runs)])
+
+        if args.conda and shutil.which("conda") and os.name != 'nt':
+            activate = f'eval "$(conda shell.bash hook)" && conda activate base && python "{script}"'
+            report("bash + conda activate", [time_to_first_line(["bash", "-c", activate]) for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Tear down deep fork trees of sleepers in parallel and check nothing survives.
+
+Usage:
+    python benchmarks/bench_kill_tree.py [--apps 10] [--depth 20] [--stubborn]
+
+Each app is a chain of ``--depth`` processes, each forking the next and then
+sleeping. ``--stubborn`` makes every process ignore SIGTERM so the SIGKILL
+escalation is exercised. Exits non-zero if any process outlives the kill.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import NEW_SESSION_KWARGS, terminate_tree
+
+# Passes its own source down the chain through CHAIN, which spawn_chain defines.
+CHAIN = r"""
+import signal, subprocess, sys, time
+depth, stubborn = int(sys.argv[1]), sys.argv[2]
+if stubborn == "1":
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+if depth > 1:
+    subprocess.Popen([sys.executable, "-c", "CHAIN = %r\n" % CHAIN + CHAIN, str(depth - 1), stubborn])
+time.sleep(3600)
+"""
+
+
+def spawn_chain(depth, stubborn):
+    return subprocess.Popen(
+        [sys.executable, "-c", f"CHAIN = {CHAIN!r}\n" + CHAIN, str(depth), "1" if stubborn else "0"],
+        **NEW_SESSION_KWARGS,
+    )
+
+
+def wait_for_tree(process, depth, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(psutil.Process(process.pid).children(recursive=True)) >= depth - 1:
+            return
+        time.sleep(0.05)
+    raise RuntimeError(f"tree under {process.pid} did not reach depth {depth}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--grace-period", type=float, default=1.0)
+    parser.add_argument("--stubborn", action="store_true")
+    args = parser.parse_args()
+
+    roots = [spawn_chain(args.depth, args.stubborn) for _ in range(args.apps)]
+    for root in roots:
+        wait_for_tree(root, args.depth)
+    tree = [p for root in roots for p in [psutil.Process(root.pid)] + psutil.Process(root.pid).children(recursive=True)]
+    print(f"started {len(tree)} processes in {args.apps} trees of depth {args.depth}")
+
+    remaining = {}
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=lambda root=root: remaining.__setitem__(root.pid, terminate_tree(root.pid, args.grace_period)))
+        for root in roots
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for root in roots:
+        root.wait()
+
+    survivors = [p for p in tree if p.is_running() and p.status() != psutil.STATUS_ZOMBIE]
+    print(f"terminated in {elapsed:.2f}s (grace period {args.grace_period:g}s), "
+          f"reported remaining={sum(remaining.values())}, survivors={len(survivors)}")
+    for process in survivors:
+        process.kill()
+    sys.exit(1 if survivors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare CPU use and thread count of the thread and asyncio launch backends.
+
+Usage:
+    python benchmarks/bench_launch_backends.py [--counts 10 50 100] [--duration 3]
+
+Each run starts N chatty children that print for ``--duration`` seconds and
+reports the launcher-side CPU time and the peak number of OS threads.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import OutputBuffer, run_process
+
+CHILD = (
+    "import sys, time\n"
+    "end = time.time() + {duration}\n"
+    "i = 0\n"
+    "while time.time() < end:\n"
+    "    print('step', i, 'loss', 0.1234, flush=True)\n"
+    "    i += 1\n"
+    "    time.sleep(0.001)\n"
+)
+
+
+class ThreadSampler:
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        me = psutil.Process()
+        while not self._stop.wait(0.05):
+            self.peak = max(self.peak, me.num_threads())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def child_command(duration):
+    return [sys.executable, "-c", CHILD.format(duration=duration)]
+
+
+def run_threads(count, duration):
+    """Mirror of the thread backend: one waiter and two reader threads per child."""
+    def launch():
+        process = subprocess.Popen(child_command(duration), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1)
+        output = OutputBuffer()
+
+        def enqueue_output(out):
+            for line in iter(out.readline, ''):
+                output.append(line)
+            out.close()
+
+        threading.Thread(target=enqueue_output, args=(process.stdout,), daemon=True).start()
+        threading.Thread(target=enqueue_output, args=(process.stderr,), daemon=True).start()
+        process.wait()
+
+    launchers = [threading.Thread(target=launch) for _ in range(count)]
+    for thread in launchers:
+        thread.start()
+    for thread in launchers:
+        thread.join()
+
+
+def run_asyncio(count, duration):
+    async def main():
+        await asyncio.gather(*(
+            run_process(child_command(duration), OutputBuffer(), lambda lines: None)
+            for _ in range(count)
+        ))
+
+    asyncio.run(main())
+
+
+def measure(name, func, count, duration):
+    me = psutil.Process()
+    before = me.cpu_times()
+    start = time.perf_counter()
+    with ThreadSampler() as sampler:
+        func(count, duration)
+    elapsed = time.perf_counter() - start
+    after = me.cpu_times()
+    cpu = (after.user - before.user) + (after.system - before.system)
+    print(f"{name:<8} children={count:<4} wall={elapsed:6.2f}s  cpu={cpu:6.2f}s "
+          f"({cpu / elapsed * 100:5.1f}% of a core)  peak_threads={sampler.peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for count in args.counts:
+        measure("thread", run_threads, count, args.duration)
+        measure("asyncio", run_asyncio, count, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Simulate a burst of CPU- and memory-heavy launches with and without the launch queue.
+
+Usage:
+    python benchmarks/bench_launch_queue.py [--jobs 10] [--cpus 8] [--memory 16] [--seed 0] [--trace]
+
+Runs entirely on a simulated clock with a fake resource probe, so every run
+with the same arguments gives the same result. The machine has ``--cpus``
+cores and ``--memory`` GiB; its load average follows runnable demand the way
+the kernel's one-minute average does, and a job's memory grows to its full
+size over its first seconds. Jobs slow down in proportion to CPU
+oversubscription, and to a tenth of their speed while memory is
+overcommitted (swapping).
+
+``--jobs`` CPU-heavy jobs are submitted at once, followed by one job with
+``max_concurrency: 1`` and a few light ones. The same burst is run with every
+launch started immediately (what the launcher did before) and through a
+``LaunchQueue``; the makespan, peak load, lowest free memory and time spent
+swapping are reported for both. Exits non-zero if the queue admits out of
+order, breaks a concurrency limit, or the two queued runs differ.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import ADMIT_INTERVAL, LaunchQueue, LaunchRequest
+
+GIB = 1024 ** 3
+TICK = 0.5           # simulated seconds per step
+LOAD_PERIOD = 60.0   # time constant of the one-minute load average
+MEMORY_RAMP = 10.0   # seconds for a job to reach its full memory use
+
+
+class Job:
+    def __init__(self, app, cpu, memory, work):
+        self.app = app
+        self.cpu = cpu          # cores used when not slowed down
+        self.memory = memory    # bytes used once ramped up
+        self.work = work        # seconds of run time on an idle machine
+        self.done = 0.0
+        self.started_at = None
+        self.finished_at = None
+
+    def memory_used(self, now):
+        return self.memory * min(1.0, (now - self.started_at) / MEMORY_RAMP)
+
+
+class FakeProbe:
+    """Resource readings of the simulated machine."""
+
+    def __init__(self, cpus, memory):
+        self.cpus = cpus
+        self.memory = memory
+        self.load_average = 0.0
+        self.used = 0
+
+    def cpu_count(self):
+        return self.cpus
+
+    def load(self):
+        return self.load_average
+
+    def available_memory(self):
+        return max(0, self.memory - self.used)
+
+
+def make_jobs(count, seed):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        cpu, memory = rng.choice((2, 3, 4)), rng.uniform(2, 4) * GIB
+        app = {"name": f"heavy-{i}", "cpu_weight": cpu, "mem_estimate": f"{memory / GIB:.1f}G"}
+        jobs.append(Job(app, cpu, memory, work=rng.uniform(60, 180)))
+    app = {"name": "exclusive", "cpu_weight": 1, "max_concurrency": 1}
+    jobs.append(Job(app, 1, 1 * GIB, work=30))
+    for i in range(3):
+        jobs.append(Job({"name": f"light-{i}"}, 0.1, 0.2 * GIB, work=20))
+    return jobs
+
+
+def simulate(jobs, cpus, memory, queued, trace=False):
+    """Run ``jobs`` to completion; return stats and the admission order."""
+    now = 0.0
+    probe = FakeProbe(cpus, memory)
+    queue = LaunchQueue(probe, clock=lambda: now)
+    for job in jobs:
+        queue.submit(LaunchRequest.from_config(job.app, payload=job))
+    pending = {job.app["name"]: job for job in jobs}
+    running = []
+    order = []
+    peak_load = lowest_free = None
+    swapping = 0.0
+    next_check = 0.0
+    violations = []
+    while pending or running:
+        if queued:
+            admit = []
+            if now >= next_check or not running:
+                admit = [request.payload for request in queue.pump()]
+                next_check = now + ADMIT_INTERVAL
+        else:
+            admit = list(pending.values())
+        for job in admit:
+            del pending[job.app["name"]]
+            job.started_at = now
+            running.append(job)
+            order.append(job.app["name"])
+            if trace:
+                print(f"{now:7.1f}s start {job.app['name']:<10} load {probe.load_average:5.1f} free {probe.available_memory() / GIB:5.1f}G")
+        if queued:
+            limit = min([j.app["max_concurrency"] for j in running if j.app.get("max_concurrency")], default=math.inf)
+            if len(running) > limit:
+                violations.append(f"{len(running)} running at {now:.1f}s with a limit of {limit}")
+
+        demand = sum(job.cpu for job in running)
+        probe.used = sum(job.memory_used(now) for job in running)
+        speed = min(1.0, cpus / demand) if demand else 1.0
+        if probe.used > memory:
+            speed *= 0.1
+            swapping += TICK
+        probe.load_average += (demand - probe.load_average) * (1 - math.exp(-TICK / LOAD_PERIOD))
+        peak_load = max(peak_load or 0.0, demand / cpus)
+        free = memory - probe.used
+        lowest_free = free if lowest_free is None else min(lowest_free, free)
+
+        now += TICK
+        for job in list(running):
+            job.done += TICK * speed
+            if job.done >= job.work:
+                job.finished_at = now
+                running.remove(job)
+                queue.finished(job.app["name"])
+                next_check = now
+    waits = [job.started_at for job in jobs]
+    return {
+        "makespan": now,
+        "peak_load": peak_load,
+        "lowest_free": lowest_free,
+        "swapping": swapping,
+        "mean_wait": sum(waits) / len(waits),
+        "mean_turnaround": sum(job.finished_at for job in jobs) / len(jobs),
+    }, order, violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--cpus", type=int, default=8)
+    parser.add_argument("--memory", type=float, default=16, help="GiB")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace", action="store_true", help="print every start of the queued run")
+    args = parser.parse_args()
+    memory = args.memory * GIB
+
+    results = {}
+    for name, queued in (("immediate", False), ("queued", True)):
+        results[name], order, violations = simulate(make_jobs(args.jobs, args.seed), args.cpus, memory, queued, args.trace and queued)
+    _, again, _ = simulate(make_jobs(args.jobs, args.seed), args.cpus, memory, True)
+
+    print(f"{args.jobs} heavy jobs + 1 exclusive + 3 light on {args.cpus} CPUs / {args.memory:.0f}G (simulated)")
+    print(f"{'':<10} {'makespan':>9} {'turnaround':>11} {'wait':>7} {'peak load/CPU':>14} {'lowest free':>12} {'swapping':>9}")
+    for name, stats in results.items():
+        print(
+            f"{name:<10} {stats['makespan']:8.0f}s {stats['mean_turnaround']:10.0f}s {stats['mean_wait']:6.0f}s"
+            f" {stats['peak_load']:14.2f} {stats['lowest_free'] / GIB:11.1f}G {stats['swapping']:8.0f}s"
+        )
+
+    submitted = [job.app["name"] for job in make_jobs(args.jobs, args.seed)]
+    problems = list(violations)
+    if order != submitted:
+        problems.append(f"admitted out of order: {order}")
+    if again != order:
+        problems.append("two runs with the same arguments admitted differently")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
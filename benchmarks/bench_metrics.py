@@ -0,0 +1,79 @@
+"""Measure what the launcher's metrics and the sampling profiler cost.
+
+Usage:
+    python benchmarks/bench_metrics.py [--ops 1000000] [--work 2.0] [--interval 0.05]
+
+Reports the time per operation of the calls made on the output path (a
+counter lookup and increment per chunk, a histogram observation, a timed
+block) next to the debug ``print`` per chunk they replace, written to
+/dev/null, and to an empty call for the loop's own overhead. Then runs ``--work`` seconds of pure-Python work with and
+without the ``SamplingProfiler`` sampling every ``--interval`` seconds and
+reports the slowdown.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import MetricsRegistry, SamplingProfiler
+from core.profiler import DEFAULT_INTERVAL
+
+
+def per_op(function, ops):
+    start = time.perf_counter()
+    for _ in range(ops):
+        function()
+    return (time.perf_counter() - start) / ops
+
+
+def work(seconds):
+    """Count loop iterations done in ``seconds`` of wall time."""
+    done = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for i in range(1000):
+            done += i & 1
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=1_000_000)
+    parser.add_argument("--work", type=float, default=2.0, help="seconds")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="profiler interval, seconds")
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    counter = registry.counter("output_bytes_total", "Bytes.", app="bench")
+    histogram = registry.histogram("update_seconds", "Seconds.")
+    timed = registry.histogram("timed_seconds", "Seconds.")
+
+    def timed_block():
+        with timed.time():
+            pass
+
+    with open(os.devnull, "w") as devnull:
+        calls = [
+            ("empty call (loop overhead)", lambda: None),
+            ("debug print per chunk (before)", lambda: print("Read chunk: 65536 bytes", file=devnull)),
+            ("counter.inc", lambda: counter.inc(65536)),
+            ("registry lookup + inc", lambda: registry.counter("output_lines_total", "Lines.", app="bench").inc(100)),
+            ("histogram.observe", lambda: histogram.observe(0.003)),
+            ("with histogram.time()", timed_block),
+        ]
+        for label, call in calls:
+            print(f"{label:<32} {per_op(call, args.ops) * 1e9:8.0f} ns")
+
+    baseline = work(args.work)
+    profiler = SamplingProfiler(args.interval)
+    profiler.start()
+    profiled = work(args.work)
+    profiler.stop()
+    print(f"profiler every {args.interval * 1000:.0f}ms: {profiler.samples} samples,"
+          f" {1 - profiled / baseline:+.1%} slowdown of pure-Python work")
+
+
+if __name__ == "__main__":
+    main()
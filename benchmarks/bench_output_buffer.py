@@ -0,0 +1,91 @@
+"""Flood a fake child process with output and measure the cost of storing it.
+
+Usage:
+    python benchmarks/bench_output_buffer.py [--lines 10000000] [--baseline]
+
+``--baseline`` also runs the old ``str +=`` store; it is quadratic, so keep
+``--lines`` small when using it. Each store runs in a fresh interpreter so
+the reported peak RSS is not shared between them.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import OutputBuffer
+
+CHILD = "import sys\nw = sys.stdout.write\nfor i in range({n}):\n    w('line %d of fake training output\\n' % i)\n"
+
+
+def spawn(lines):
+    return subprocess.Popen(
+        [sys.executable, "-c", CHILD.format(n=lines)],
+        stdout=subprocess.PIPE, text=True, bufsize=1,
+    )
+
+
+def run_buffer(lines, max_lines):
+    output = OutputBuffer(max_lines=max_lines)
+    process = spawn(lines)
+    start = time.perf_counter()
+    for line in iter(process.stdout.readline, ''):
+        output.append(line)
+    process.wait()
+    return time.perf_counter() - start, output.line_count, output.byte_count
+
+
+def run_concat(lines):
+    # Same shape as the old launcher: the string lives in a dict, so CPython
+    # cannot grow it in place and every += copies the whole history.
+    outputs = {"app": ""}
+    process = spawn(lines)
+    start = time.perf_counter()
+    for line in iter(process.stdout.readline, ''):
+        outputs["app"] += line
+    process.wait()
+    output = outputs["app"]
+    return time.perf_counter() - start, output.count("\n"), len(output)
+
+
+def peak_rss_mib():
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2**20
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(args):
+    if args.mode == "buffer":
+        elapsed, lines, chars = run_buffer(args.lines, args.max_lines)
+    else:
+        elapsed, lines, chars = run_concat(args.lines)
+    rate = args.lines / elapsed if elapsed else 0
+    print(f"{args.mode:<8} {elapsed:8.2f}s  {rate:12,.0f} lines/s  "
+          f"retained={lines:<10,} chars={chars:<14,} peak_rss={peak_rss_mib():8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    parser.add_argument("--max-lines", type=int, default=100_000)
+    parser.add_argument("--baseline", action="store_true")
+    parser.add_argument("--mode", choices=["buffer", "concat"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args)
+        return
+
+    modes = ["buffer", "concat"] if args.baseline else ["buffer"]
+    for mode in modes:
+        subprocess.run([sys.executable, __file__, "--lines", str(args.lines),
+                        "--max-lines", str(args.max_lines), "--mode", mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
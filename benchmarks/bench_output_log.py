@@ -0,0 +1,75 @@
+"""Spool a large output to disk and time paging through it.
+
+Usage:
+    python benchmarks/bench_output_log.py [--size-mb 1024] [--dir /tmp/bench-logs]
+
+Writes ``--size-mb`` of lines through an ``OutputBuffer`` backed by a
+spooled run log, then times what the output view does: reading the tail
+window on open and windows at random positions while scrolling. Window
+reads should cost the same whatever the size of the log.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import LogSpooler, OutputBuffer
+
+WINDOW = 50
+BATCH = 1000
+LINE = "step {:>10} loss 0.123456 acc 0.987654 lr 3e-4 elapsed 12.3s eta 45.6s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--dir", default=None, help="directory for the log (default: a temp dir)")
+    parser.add_argument("--pages", type=int, default=1000)
+    args = parser.parse_args()
+
+    log_dir = args.dir or tempfile.mkdtemp(prefix="bench-logs-")
+    spooler = LogSpooler(log_dir, keep_runs=1)
+    spooler.start()
+    try:
+        output = OutputBuffer(max_lines=100_000, log=spooler.open_run("bench"))
+        line_bytes = len(LINE.format(0)) + 1
+        lines = args.size_mb * 2**20 // line_bytes
+        start = time.perf_counter()
+        for batch in range(0, lines, BATCH):
+            # Batches like the ones the asyncio backend stores per pipe read.
+            output.extend([LINE.format(i) for i in range(batch, min(batch + BATCH, lines))])
+        output.log.close()
+        spooler.stop()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(output.log.path)
+        print(f"spooled {lines:,} lines, {size / 2**20:.0f} MiB in {elapsed:.1f}s "
+              f"({size / 2**20 / elapsed:.0f} MiB/s including line formatting)")
+
+        start = time.perf_counter()
+        tail = output.lines_range(output.seq - WINDOW, output.seq)
+        print(f"open (tail window from memory): {(time.perf_counter() - start) * 1000:.3f}ms")
+
+        start = time.perf_counter()
+        head = output.lines_range(0, WINDOW)
+        print(f"first window from disk (maps the file): {(time.perf_counter() - start) * 1000:.3f}ms")
+        assert head[0] == LINE.format(0) and tail[-1] == LINE.format(lines - 1)
+
+        positions = [random.randrange(0, output.first_seq - WINDOW) for _ in range(args.pages)]
+        start = time.perf_counter()
+        for position in positions:
+            window = output.lines_range(position, position + WINDOW)
+        per_page = (time.perf_counter() - start) / args.pages
+        assert window[0] == LINE.format(positions[-1])
+        print(f"random {WINDOW}-line windows from disk: {per_page * 1000:.3f}ms each over {args.pages} pages")
+    finally:
+        if args.dir is None:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure how many UI messages the output notifier posts per line ingested.
+
+Usage:
+    python benchmarks/bench_output_notifier.py [--apps 4] [--lines 200000]
+
+Reader threads mark lines as fast as they can while a fake UI thread
+acknowledges each message after a short dispatch delay, the way the
+launcher's message handler does.
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import OutputNotifier
+
+
+def run(apps, lines, window, dispatch_delay):
+    messages = queue.Queue()
+    notifier = OutputNotifier(messages.put, window=window)
+    notifier.start()
+
+    def ui():
+        while True:
+            app_name = messages.get()
+            if app_name is None:
+                return
+            time.sleep(dispatch_delay)
+            notifier.acknowledge(app_name)
+
+    def reader(app_name):
+        for _ in range(lines):
+            notifier.mark(app_name)
+
+    ui_thread = threading.Thread(target=ui)
+    ui_thread.start()
+    readers = [threading.Thread(target=reader, args=(f"app{i}",)) for i in range(apps)]
+    start = time.perf_counter()
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    time.sleep(window * 4)
+    messages.put(None)
+    ui_thread.join()
+    return elapsed, notifier.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=4)
+    parser.add_argument("--lines", type=int, default=200_000, help="lines per app")
+    parser.add_argument("--dispatch-delay", type=float, default=0.0005)
+    args = parser.parse_args()
+
+    for window in (0.016, 0.025, 0.05):
+        elapsed, stats = run(args.apps, args.lines, window, args.dispatch_delay)
+        lines, posted = stats["lines_ingested"], stats["messages_posted"]
+        print(f"window={window * 1000:4.0f}ms  lines={lines:<10,} messages={posted:<8,} "
+              f"lines/message={lines / max(posted, 1):10,.0f}  ingest={lines / elapsed:12,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
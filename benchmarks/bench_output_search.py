@@ -0,0 +1,151 @@
+"""Time output searches over a large synthetic run log.
+
+Usage:
+    python benchmarks/bench_output_search.py [--size 1024] [--memory-lines 100000] [--seed 0]
+
+Writes ``--size`` MiB of log-like output (timestamps, levels, request
+lines, a traceback every few hundred thousand lines) through a ``RunLog``
+with the trigram search index on, and keeps the newest ``--memory-lines``
+in an ``OutputBuffer`` the way a running app does. Reports:
+
+- ingest: the spooler's write rate with and without the trigram index, on
+  the first 64 MiB;
+- queries: time to the first match and to the end of the search, the
+  number of matching lines, and the longest stretch the search held the
+  GIL (how long a UI redraw could be held up), for a few queries searched
+  without and with the index.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import LogReader, OutputBuffer, OutputSearch, RunLog
+
+MIB = 1024 * 1024
+BATCH = 50_000
+INGEST_SAMPLE = 64 * MIB
+
+WORDS = "request served user session cache miss hit upstream worker queue job batch retry model load token".split()
+LEVELS = ["INFO"] * 90 + ["DEBUG"] * 8 + ["WARNING"] * 2
+TRACEBACK = [
+    "Traceback (most recent call last):",
+    '  File "worker.py", line 88, in run',
+    "    result = job.execute()",
+    "ConnectionError: upstream timeout after 30s",
+]
+QUERIES = [
+    ("rare text", "ConnectionError"),
+    ("rare, any case", "traceback"),
+    ("common", "warning"),
+    ("absent", "segmentation fault"),
+    ("regex", r"/upstream timeout after \d+s$/"),
+]
+
+
+def make_lines(rng, count, first):
+    lines = []
+    for i in range(first, first + count):
+        if rng.random() < 0.00001:
+            lines.extend(TRACEBACK)
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8)))
+        lines.append(f"2026-10-18 12:{i // 60000 % 60:02d}:{i // 1000 % 60:02d}.{i % 1000:03d} {rng.choice(LEVELS):<7} id={rng.getrandbits(32):08x} {words}")
+    return lines
+
+
+def write_log(path, size, seed, trigrams, memory_lines=0):
+    """Write ``size`` bytes of lines; return the log, the buffer and MiB/s of the spooler."""
+    rng = random.Random(seed)
+    log = RunLog(path, trigrams=trigrams)
+    output = OutputBuffer(max_lines=memory_lines or 1, log=log)
+    spooling = 0.0
+    while log.size < size:
+        output.extend(make_lines(rng, BATCH, output.seq))
+        start = time.perf_counter()
+        log.flush()
+        spooling += time.perf_counter() - start
+    return log, output, log.size / MIB / spooling
+
+
+class StallMeter:
+    """Measures the longest gap between wakeups of a thread that sleeps 1ms at a time."""
+
+    def __init__(self):
+        self.longest = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.is_set():
+            time.sleep(0.001)
+            now = time.perf_counter()
+            self.longest = max(self.longest, now - last - 0.001)
+            last = now
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.longest
+
+
+def time_query(output, query):
+    search = OutputSearch(query)
+    first = None
+    count = 0
+    meter = StallMeter()
+    start = time.perf_counter()
+
+    def on_matches(seqs):
+        nonlocal first, count
+        first = first or time.perf_counter() - start
+        count += len(seqs)
+
+    search.run(output, on_matches)
+    elapsed = time.perf_counter() - start
+    return first, elapsed, count, search.truncated, meter.stop()
+
+
+def ms(seconds):
+    return f"{seconds * 1000:9.1f}ms" if seconds is not None else f"{'-':>11}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024, help="MiB of output")
+    parser.add_argument("--memory-lines", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-output-search-") as workdir:
+        sample = min(INGEST_SAMPLE, args.size * MIB)
+        _, _, plain = write_log(os.path.join(workdir, "plain.log"), sample, args.seed, trigrams=False)
+        _, _, indexed = write_log(os.path.join(workdir, "sample.log"), sample, args.seed, trigrams=True)
+        print(f"ingest: {plain:.1f} MiB/s without the trigram index, {indexed:.1f} MiB/s with it")
+
+        path = os.path.join(workdir, "run.log")
+        print(f"writing {args.size} MiB...", file=sys.stderr)
+        log, output, _ = write_log(path, args.size * MIB, args.seed, trigrams=True, memory_lines=args.memory_lines)
+        # The same output, read through a log without an index.
+        unindexed = OutputBuffer(max_lines=args.memory_lines, log=LogReader(path))
+        unindexed.merge(output.first_seq, output.lines_range(output.first_seq, output.seq))
+        print(f"{output.seq:,} lines, {log.size / MIB:.0f} MiB on disk, {output.line_count:,} in memory")
+
+        print(f"{'query':<16} {'index':<6} {'first match':>11} {'total':>11} {'lines':>9} {'longest hold':>13}")
+        for label, query in QUERIES:
+            for index, target in (("no", unindexed), ("yes", output)):
+                first, elapsed, count, truncated, stall = time_query(target, query)
+                lines = f"{count:,}{'+' if truncated else ''}"
+                print(f"{label:<16} {index:<6} {ms(first)} {ms(elapsed)} {lines:>9} {ms(stall):>13}")
+        log.close()
+        log.flush()
+
+
+if __name__ == "__main__":
+    main()
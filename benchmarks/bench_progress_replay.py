@@ -0,0 +1,141 @@
+"""Replay a tqdm-style output stream through the old and new ingest paths.
+
+Usage:
+    python benchmarks/bench_progress_replay.py [--capture stream.bin] [--epochs 20] [--steps 2000]
+
+``--capture`` replays raw bytes saved from a real run (for example
+``python train.py 2> stream.bin``); otherwise a stream in tqdm's format is
+generated. The old path split on every ``\\r`` and stored each progress
+frame as a line; the new one rewrites the progress line in place. For each,
+reports the lines and bytes stored and the time to render the stored
+output the way the old output view did (one rich ``Text`` of every line).
+
+The stored lines must not depend on where the pipe happens to split the
+stream: the new path is then fed the end of the stream, and the same end
+followed by a progress bar erased the way ``tqdm(leave=False)`` does,
+``--splits`` times each in small chunks of random sizes, and the script
+exits with status 1 if any run stores other lines than one whole feed.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from rich.console import Console
+from rich.text import Text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import OutputBuffer, OutputStream
+
+# Bytes from the end of the stream used for the chunk boundary check.
+SPLIT_SAMPLE = 16384
+
+
+def tqdm_stream(epochs, steps):
+    parts = []
+    for epoch in range(epochs):
+        for step in range(steps + 1):
+            percent = step * 100 // steps
+            bar = "#" * (percent // 10) + " " * (10 - percent // 10)
+            parts.append(f"\rEpoch {epoch}: {percent:3d}%|{bar}| {step}/{steps} "
+                         f"[00:{step % 60:02d}<00:{(steps - step) % 60:02d}, 123.45it/s, loss=0.{step:04d}]")
+        parts.append("\n")
+        parts.append(f"epoch {epoch} finished: val_loss=0.1234 val_acc=0.9876\n")
+    return "".join(parts).encode()
+
+
+def ingest_old(data, chunk_size):
+    # The previous splitter: \r\n, \r and \n all ended a line.
+    output = OutputBuffer(max_lines=10**9, max_bytes=2**62)
+    partial = ""
+    for i in range(0, len(data), chunk_size):
+        text = partial + data[i:i + chunk_size].decode("utf-8", "replace")
+        lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        partial = lines.pop()
+        output.extend(lines)
+    if partial:
+        output.append(partial)
+    return output
+
+
+def ingest_new(data, chunk_size):
+    return ingest_at(data, range(chunk_size, len(data), chunk_size))
+
+
+def ingest_at(data, boundaries):
+    output = OutputBuffer(max_lines=10**9, max_bytes=2**62)
+    stream = OutputStream(output)
+    start = 0
+    for end in [*boundaries, len(data)]:
+        stream.feed(data[start:end])
+        start = end
+    stream.close()
+    return output
+
+
+def check_splits(data, runs, rng):
+    """Return a description of the first chunking that stores other lines than ``data`` in one piece, or ``None``."""
+    expected, _ = ingest_at(data, ()).lines_since(0)
+    for _ in range(runs):
+        # Small chunks, so that \r\n pairs, escapes and UTF-8 sequences get cut.
+        boundaries, position = [], 0
+        while True:
+            position += rng.choice((1, 2, 3, 7, 64))
+            if position >= len(data):
+                break
+            boundaries.append(position)
+        lines, _ = ingest_at(data, boundaries).lines_since(0)
+        if lines != expected:
+            return f"{len(boundaries) + 1} chunks stored {len(lines)} lines instead of {len(expected)}"
+    return None
+
+
+def render(output, console):
+    lines, _ = output.lines_since(0)
+    return len(console.render_lines(Text("\n".join(lines)), console.options.update_width(120)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--capture", help="file with raw captured output")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--splits", type=int, default=50, help="random chunkings to check each stream with")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, "rb") as file:
+            data = file.read()
+    else:
+        data = tqdm_stream(args.epochs, args.steps)
+    print(f"stream: {len(data):,} bytes")
+
+    console = Console(file=open(os.devnull, "w"), width=120)
+    for name, ingest in (("before", ingest_old), ("after", ingest_new)):
+        start = time.perf_counter()
+        output = ingest(data, args.chunk_size)
+        ingest_time = time.perf_counter() - start
+        start = time.perf_counter()
+        rows = render(output, console)
+        render_time = time.perf_counter() - start
+        print(f"{name:<7} lines={output.line_count:>9,} chars={output.byte_count:>12,} "
+              f"ingest={ingest_time * 1000:8.1f}ms render={render_time * 1000:9.1f}ms ({rows:,} rows)")
+
+    rng = random.Random(args.seed)
+    tail = data[-SPLIT_SAMPLE:]
+    erased = tail + "\rfinal: 50%|#####     | 1/2\r\x1b[K".encode()
+    failed = False
+    for name, stream in (("stream", tail), ("erased", erased)):
+        failure = check_splits(stream, args.splits, rng)
+        print(f"split check ({name}, {args.splits} chunkings): {failure or 'ok'}")
+        failed = failed or failure is not None
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
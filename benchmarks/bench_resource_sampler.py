@@ -0,0 +1,73 @@
+"""Measure the CPU overhead of the resource sampler on many tracked processes.
+
+Usage:
+    python benchmarks/bench_resource_sampler.py [--apps 20] [--children 4] [--seconds 10]
+
+Starts ``--apps`` sleepers that each fork ``--children`` more (100 tracked
+processes by default), samples them at ``--interval`` and reports the
+fraction of one CPU the sampler used. The target is under 1%.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import NEW_SESSION_KWARGS, ResourceSampler, terminate_tree
+
+SLEEPER = (
+    "import subprocess, sys, time\n"
+    "for _ in range(int(sys.argv[1])):\n"
+    "    subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(3600)'])\n"
+    "time.sleep(3600)\n"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", type=int, default=20)
+    parser.add_argument("--children", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    roots = [
+        subprocess.Popen([sys.executable, "-c", SLEEPER, str(args.children)], **NEW_SESSION_KWARGS)
+        for _ in range(args.apps)
+    ]
+    try:
+        time.sleep(2)  # let the children start
+        apps = [(f"app{i}", root.pid) for i, root in enumerate(roots)]
+        sampler = ResourceSampler(lambda: apps, interval=args.interval)
+
+        passes = []
+        for _ in range(3):
+            start = time.perf_counter()
+            sampler.sample()
+            passes.append(time.perf_counter() - start)
+
+        sampler.start()
+        overheads = []
+        deadline = time.monotonic() + args.seconds
+        while time.monotonic() < deadline:
+            time.sleep(args.interval)
+            overheads.append(sampler.overhead)
+        sampler.stop()
+
+        tracked = args.apps * (args.children + 1)
+        history = sampler.history("app0")
+        print(f"tracked processes {tracked}, interval {args.interval:g}s")
+        print(f"single pass: {min(passes) * 1000:.2f}ms (best of {len(passes)})")
+        print(f"sampler CPU: {max(overheads) * 100:.3f}% of one core (worst interval), "
+              f"{sum(overheads) / len(overheads) * 100:.3f}% mean")
+        print(f"app0 RSS {history.latest('rss') / 2**20:.1f} MiB, threads {history.latest('threads'):.0f}")
+    finally:
+        for root in roots:
+            terminate_tree(root.pid, grace_period=1)
+            root.wait()
+
+
+if __name__ == "__main__":
+    main()
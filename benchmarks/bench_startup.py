@@ -0,0 +1,132 @@
+"""Time the launcher's cold start: imports, first frame and the catalog on screen.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 7] [--apps 300] [--fail-above MS]
+
+Each run starts a fresh interpreter in a temporary directory holding a
+generated ``applications.yaml`` of ``--apps`` entries, so nothing is cached
+in ``sys.modules``, and runs the launcher headless with Textual's pilot.
+Reported, as the median and the worst of the runs, all measured from just
+before ``import Launcher`` (interpreter startup is not included):
+
+- import: ``import Launcher``, with Textual itself and the launcher's core;
+- first frame: the first refresh of the main screen has been processed;
+- apps listed: the catalog has been read and shown in the list.
+
+Also prints which of the heavy optional modules were imported by the time
+of the first frame; none of them should be. With ``--fail-above``, exits
+with status 1 if the median time to the first frame is over that many
+milliseconds, so the script can guard against regressions in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules that used to be imported before the first frame.
+DEFERRED = ["yaml", "psutil", "http.server", "theme", "widgets.screens.processes_modal", "widgets.screens.manage_applications_modal"]
+LISTED_TIMEOUT = 30.0
+
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import Launcher
+imported = time.perf_counter()
+marks = {{}}
+
+
+def first_frame():
+    marks["frame"] = time.perf_counter()
+    marks["loaded"] = [name for name in {deferred!r} if name in sys.modules]
+
+
+class Timed(Launcher.CondaLauncher):
+    CSS_PATH = {css!r}  # relative paths are resolved against the subclass's file
+
+    def on_mount(self):
+        # Mount handlers run before the first refresh; this runs after it.
+        self.call_after_refresh(first_frame)
+
+
+async def main():
+    app = Timed()
+    async with app.run_test(size=(120, 40)) as pilot:
+        deadline = time.perf_counter() + {timeout!r}
+        while not app._listed_apps and time.perf_counter() < deadline:
+            await asyncio.sleep(0.001)
+        marks["listed"] = time.perf_counter() if app._listed_apps else None
+        await pilot.press("ctrl+q")
+
+asyncio.run(main())
+print(json.dumps({{
+    "import": imported - start,
+    "frame": marks["frame"] - start,
+    "listed": marks["listed"] and marks["listed"] - start,
+    "loaded": marks["loaded"],
+}}))
+"""
+
+
+def write_catalog(path, count):
+    # Plain YAML by hand, so the parent process does not need PyYAML.
+    with open(path, "w") as file:
+        file.write("applications:\n")
+        for i in range(count):
+            file.write(
+                f"  - name: app-{i:05d}\n"
+                f"    conda_env: env-{i % 20}\n"
+                f"    path: /opt/apps/app_{i:05d}/main.py\n"
+                f"    description: Generated application number {i}\n"
+            )
+
+
+def run_once(workdir):
+    code = CHILD.format(root=ROOT, css=os.path.join(ROOT, "styles.tcss"), deferred=DEFERRED, timeout=LISTED_TIMEOUT)
+    result = subprocess.run([sys.executable, "-c", code], cwd=workdir, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        sys.exit(f"launcher run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def ms(seconds):
+    return f"{seconds * 1000:9.1f}ms" if seconds is not None else f"{'-':>11}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--apps", type=int, default=300, help="entries in the generated catalog")
+    parser.add_argument("--fail-above", type=float, metavar="MS", help="fail if the median first frame is slower")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as workdir:
+        write_catalog(os.path.join(workdir, "applications.yaml"), args.apps)
+        runs = []
+        for i in range(args.runs):
+            print(f"run {i + 1}/{args.runs}...", file=sys.stderr)
+            runs.append(run_once(workdir))
+
+    print(f"{'':<14} {'median':>11} {'worst':>11}")
+    for key, label in (("import", "import"), ("frame", "first frame"), ("listed", "apps listed")):
+        values = [run[key] for run in runs if run[key] is not None]
+        if len(values) < len(runs):
+            print(f"{label:<14} the catalog was not listed within {LISTED_TIMEOUT:.0f}s in {len(runs) - len(values)} runs")
+        if values:
+            print(f"{label:<14} {ms(statistics.median(values))} {ms(max(values))}")
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+    print(f"imported before the first frame: {', '.join(loaded) or 'none of ' + ', '.join(DEFERRED)}")
+
+    if args.fail_above is not None:
+        median = statistics.median(run["frame"] for run in runs) * 1000
+        if median > args.fail_above:
+            print(f"FAIL: first frame took {median:.1f}ms, over {args.fail_above:.1f}ms", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
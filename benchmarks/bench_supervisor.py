@@ -0,0 +1,115 @@
+"""Time attaching to the supervisor and streaming output to several clients.
+
+Usage:
+    python benchmarks/bench_supervisor.py [--lines 1000000] [--clients 3] [--reattach 20]
+
+Starts ``Launcher.py supervisor`` on a temporary socket and launches a
+script (with the current interpreter) that prints ``--lines`` lines and
+then keeps running. Reports:
+
+- streaming: how long ``--clients`` attached clients take to receive all
+  the lines, and the bytes each was sent;
+- reattach: ``--reattach`` rounds of connect, hello and replay of the
+  output tail, against the size of the full output that a client would
+  otherwise be sent.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import FRAME, LINES, encode_message, read_frame
+
+LAUNCHER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Launcher.py")
+
+SCRIPT = """
+import sys, time
+write = sys.stdout.write
+for i in range({lines}):
+    write(f"{{i:>9}} the quick brown fox jumps over the lazy dog\\n")
+sys.stdout.flush()
+time.sleep(3600)
+"""
+
+
+def ms(seconds):
+    return f"{seconds * 1000:8.2f}ms"
+
+
+async def connect(path):
+    reader, writer = await asyncio.open_unix_connection(path, limit=2 ** 24)
+    kind, hello = await read_frame(reader)
+    return reader, writer, len(encode_message(hello))
+
+
+async def receive_until(reader, app_name, seq):
+    """Read frames until line ``seq - 1`` of ``app_name`` has arrived; return the bytes read."""
+    received = 0
+    while True:
+        kind, payload = await read_frame(reader)
+        if kind == LINES:
+            name, start, lines = payload
+            received += FRAME.size + len(name) + sum(map(len, lines)) + len(lines)
+            if name == app_name and start + len(lines) >= seq:
+                return received
+        else:
+            received += len(encode_message(payload))
+
+
+async def bench(args, workdir):
+    path = os.path.join(workdir, "supervisor.sock")
+    script = os.path.join(workdir, "lines.py")
+    with open(script, "w") as file:
+        file.write(SCRIPT.format(lines=args.lines))
+    supervisor = subprocess.Popen([sys.executable, LAUNCHER, "supervisor", "--socket", path], cwd=workdir)
+    try:
+        while not os.path.exists(path):
+            await asyncio.sleep(0.05)
+        clients = [await connect(path) for _ in range(args.clients)]
+        app = {"name": "lines", "conda_env": sys.prefix, "path": script}
+        settings = {"fast_launch": True, "log_dir": os.path.join(workdir, "logs")}
+        start = time.perf_counter()
+        clients[0][1].write(encode_message({"type": "launch", "app": app, "settings": settings}))
+        sent = await asyncio.gather(*(receive_until(reader, "lines", args.lines) for reader, _, _ in clients))
+        elapsed = time.perf_counter() - start
+        print(f"streaming: {args.lines} lines to {args.clients} clients in {ms(elapsed)}"
+              f" ({args.lines / elapsed:,.0f} lines/s per client, {sent[0] / 2 ** 20:.1f} MiB each)")
+        for _, writer, _ in clients:
+            writer.close()
+
+        await asyncio.sleep(1)  # let the run log catch up
+        logs = os.path.join(workdir, "logs", "lines")
+        history = sum(os.path.getsize(os.path.join(logs, name)) for name in os.listdir(logs))
+        times = []
+        replayed = 0
+        for _ in range(args.reattach):
+            start = time.perf_counter()
+            reader, writer, hello = await connect(path)
+            replayed = hello + await receive_until(reader, "lines", args.lines)
+            times.append(time.perf_counter() - start)
+            writer.close()
+        print(f"reattach with tail replay: median {ms(statistics.median(times))}, max {ms(max(times))},"
+              f" {replayed / 1024:.1f} KiB sent; full history is {history / 2 ** 20:.1f} MiB")
+    finally:
+        supervisor.terminate()
+        supervisor.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=3)
+    parser.add_argument("--reattach", type=int, default=20)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="bench-supervisor-") as workdir:
+        asyncio.run(bench(args, workdir))
+
+
+if __name__ == "__main__":
+    main()
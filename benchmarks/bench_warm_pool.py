@@ -0,0 +1,156 @@
+"""Exercise the warm pool against a virtualenv and time warm launches against cold ones.
+
+Usage:
+    python benchmarks/bench_warm_pool.py [--runs 10] [--import-delay 0.3]
+
+A virtualenv built with ``python -m venv`` has the ``bin/python`` layout of a
+conda env, so it stands in for one and no conda install is needed. Its
+site-packages get three modules: one that takes ``--import-delay`` seconds to
+import, one that writes 1 MB to stderr while importing, and one that fails.
+The script then checks that
+
+- a worker that fills its stderr pipe before it is ready still starts;
+- a worker that fails to import reports the error in ``status()``;
+- what the script writes to stderr still reaches the acquirer;
+
+and reports the time from launch to first output line with and without a
+warm worker. Exits with status 1 if a check fails.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import CondaEnvResolver, PrewarmConfig, WarmPool
+
+MODULES = {
+    "slow_import": "import os, time\ntime.sleep(float(os.environ.get('SLOW_IMPORT_DELAY', '0')))\n",
+    # Far more than a pipe holds, so the worker blocks unless stderr is read.
+    "noisy_import": "import sys\nfor i in range(16384):\n    sys.stderr.write('warning %05d ' % i + '.' * 50 + '\\n')\n",
+    "broken_import": "raise ImportError('broken_import cannot be imported')\n",
+}
+SCRIPT = "import sys\nprint('ready', flush=True)\nprint('script stderr', file=sys.stderr)\n"
+READY_TIMEOUT = 30.0
+
+
+def make_venv(root):
+    prefix = os.path.join(root, "venv")
+    subprocess.run([sys.executable, "-m", "venv", "--without-pip", prefix], check=True)
+    site_packages = subprocess.run(
+        [os.path.join(prefix, "Scripts" if os.name == 'nt' else "bin", "python"), "-c",
+         "import sysconfig; print(sysconfig.get_paths()['purelib'])"],
+        check=True, capture_output=True, text=True,
+    ).stdout.strip()
+    for name, source in MODULES.items():
+        with open(os.path.join(site_packages, f"{name}.py"), "w") as file:
+            file.write(source)
+    return prefix
+
+
+async def wait_ready(pool, conda_env, config):
+    """Wait until the pool for ``config`` has an idle worker or an error; return its status."""
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        for status in pool.status():
+            if status["env"] == conda_env.name and status["modules"] == config.modules:
+                if status["idle"] or status["error"]:
+                    return status
+        await asyncio.sleep(0.01)
+    return None
+
+
+async def first_line(process):
+    line = await process.stdout.readline()
+    await process.wait()
+    return line
+
+
+async def time_warm(pool, conda_env, config, path):
+    await wait_ready(pool, conda_env, config)
+    start = time.perf_counter()
+    process = await pool.acquire(conda_env, config, path)
+    await first_line(process)
+    return time.perf_counter() - start
+
+
+async def time_cold(conda_env, config, path):
+    start = time.perf_counter()
+    code = f"import {', '.join(config.modules)}; import runpy; runpy.run_path({path!r}, run_name='__main__')"
+    process = await asyncio.create_subprocess_exec(
+        conda_env.python, "-c", code,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        env=conda_env.environ(),
+    )
+    await first_line(process)
+    return time.perf_counter() - start
+
+
+async def check_noisy(pool, conda_env, path):
+    config = PrewarmConfig(modules=("noisy_import",))
+    await pool.ensure(conda_env, config)
+    status = await wait_ready(pool, conda_env, config)
+    if not status or not status["idle"]:
+        return f"a worker writing 1 MB to stderr did not start: {status}"
+    process = await pool.acquire(conda_env, config, path)
+    stdout, stderr = await process.communicate()
+    if stdout != b"ready\n" or not stderr.endswith(b"script stderr\n"):
+        return f"unexpected output from the noisy worker: {stdout!r}, ...{stderr[-40:]!r}"
+    return None
+
+
+async def check_broken(pool, conda_env):
+    config = PrewarmConfig(modules=("broken_import",))
+    await pool.ensure(conda_env, config)
+    status = await wait_ready(pool, conda_env, config)
+    if not status or "broken_import cannot be imported" not in (status["error"] or ""):
+        return f"the failed import was not reported: {status}"
+    return None
+
+
+async def run(args, root):
+    os.environ["SLOW_IMPORT_DELAY"] = str(args.import_delay)
+    prefix = make_venv(root)
+    path = os.path.join(root, "script.py")
+    with open(path, "w") as file:
+        file.write(SCRIPT)
+    conda_env = CondaEnvResolver().resolve(prefix)
+    config = PrewarmConfig(modules=("slow_import",))
+
+    pool = WarmPool()
+    failures = []
+    try:
+        for check in (check_noisy(pool, conda_env, path), check_broken(pool, conda_env)):
+            failure = await check
+            print(f"{'FAIL' if failure else 'ok':<5}{failure or check.__name__}")
+            if failure:
+                failures.append(failure)
+
+        await pool.ensure(conda_env, config)
+        warm = [await time_warm(pool, conda_env, config, path) for _ in range(args.runs)]
+        cold = [await time_cold(conda_env, config, path) for _ in range(args.runs)]
+    finally:
+        await pool.shutdown()
+    for name, samples in (("cold", cold), ("warm", warm)):
+        print(f"{name:<5}median={statistics.median(samples) * 1000:8.1f}ms  worst={max(samples) * 1000:8.1f}ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--import-delay", type=float, default=0.3, help="seconds slow_import takes to import")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="bench-warm-pool-") as root:
+        failures = asyncio.run(run(args, root))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
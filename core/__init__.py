@@ -0,0 +1,20 @@
+from .output_buffer import OutputBuffer
+from .output_notifier import OutputNotifier
+from .line_splitter import LineSplitter, OutputStream
+from .async_runner import READ_CHUNK_SIZE, run_process, supervise
+from .conda_envs import CondaEnv, CondaEnvNotFound, CondaEnvResolver
+from .warm_pool import PrewarmConfig, WarmPool
+from .process_table import ProcessRecord, ProcessTable, QUEUED, ADMITTED, STARTING, RUNNING, EXITED
+from .process_index import ProcessIndex
+from .termination import DEFAULT_GRACE_PERIOD, NEW_SESSION_KWARGS, terminate_tree
+from .resource_sampler import MetricHistory, ResourceSampler
+from .output_log import LogReader, LogSpooler, RunLog
+from .output_search import OutputSearch
+from .catalog import AppCatalog, CatalogDiff, CatalogError, diff_entries
+from .app_search import AppSearchIndex
+from .commands import build_command
+from .batch import BatchRunner, PrefixedOutput, report
+from .launch_queue import ADMIT_INTERVAL, LaunchQueue, LaunchRequest, ResourceProbe, parse_size
+from .supervisor import FRAME, LINES, MESSAGE, Supervisor, SupervisorClient, default_socket_path, encode_lines, encode_message, read_frame
+from .metrics import MetricsExporter, MetricsRegistry
+from .profiler import SamplingProfiler
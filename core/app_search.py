@@ -0,0 +1,229 @@
+from collections import defaultdict, deque
+from itertools import chain, compress, filterfalse, repeat
+from operator import add, not_
+import re
+import threading
+
+# How well a term matches an entry, best first: the name starts with it,
+# the name contains it, the name contains its letters in order (fuzzy),
+# the environment or description contains it.
+NAME_PREFIX, NAME_SUBSTRING, NAME_FUZZY, TEXT_SUBSTRING = range(4)
+# Catalogs with at least this many entries build their postings on a
+# background thread; smaller ones build them in rebuild().
+BACKGROUND_BUILD = 2000
+# bytes.translate table turning 0/1 bytes into 1/0.
+_INVERT = bytes([1, 0]) + bytes(254)
+
+
+def _postings(strings):
+    """Map every character and every pair of adjacent characters to the ascending indices of the strings containing it."""
+    postings = defaultdict(list)
+    for index, string in enumerate(strings):
+        for gram in {*string, *map(add, string, string[1:])}:
+            postings[gram].append(index)
+    return dict(postings)
+
+
+def _mask(indices, size):
+    """Bytes with a 1 at each of ``indices`` and 0 elsewhere."""
+    mask = bytearray(size)
+    deque(map(mask.__setitem__, indices, repeat(1)), 0)
+    return mask
+
+
+def _and(*masks):
+    size = len(masks[0])
+    value = int.from_bytes(masks[0], "little")
+    for mask in masks[1:]:
+        value &= int.from_bytes(mask, "little")
+    return value.to_bytes(size, "little")
+
+
+def _without(mask, taken):
+    """``mask`` with the entries set in ``taken`` cleared (both are 0/1 bytes)."""
+    size = len(mask)
+    return (int.from_bytes(mask, "little") & ~int.from_bytes(taken, "little")).to_bytes(size, "little")
+
+
+class AppSearchIndex:
+    """Incremental prefix, substring and fuzzy search over catalog entries.
+
+    Lower-cased names and ``conda_env``/description strings are computed
+    once per catalog, along with postings: for every character and
+    character pair, the entries whose name (or text) contains it. A term
+    of up to two characters is looked up directly; a longer one is only
+    checked against the entries under its rarest pair, and the fuzzy match
+    only runs on names that contain all of its characters, so a keystroke
+    costs time in proportion to the matches rather than to the catalog.
+    Large catalogs build the postings on a background thread and are
+    scanned until they are ready. Every whitespace-separated term of the
+    query has to match; results are ordered by the sum of the term ranks,
+    then by catalog order. A query that extends the previous one only
+    re-checks the previous matches, which is what typing produces.
+    """
+
+    def __init__(self, applications=()):
+        self.rebuild(applications)
+
+    def rebuild(self, applications):
+        self.names = [app["name"] for app in applications]
+        self._lowered = [name.lower() for name in self.names]
+        self._texts = [
+            f"{app.get('conda_env') or ''}\0{app.get('description') or ''}".lower()
+            for app in applications
+        ]
+        self._chars = {}
+        self._last_terms = None
+        self._last_matches = None
+        self._term_groups = {}
+        # (lowered names, name postings, text postings, name character masks) once built.
+        self._index = None
+        self._built = threading.Event()
+        if len(self.names) < BACKGROUND_BUILD:
+            self._build(self._lowered, self._texts, self._built)
+        else:
+            threading.Thread(
+                target=self._build, args=(self._lowered, self._texts, self._built),
+                name="app-search-index", daemon=True,
+            ).start()
+
+    def _build(self, lowered, texts, built):
+        names = _postings(lowered)
+        chars = {gram: bytes(_mask(indices, len(lowered))) for gram, indices in names.items() if len(gram) == 1}
+        # The index belongs to the lowered names it was built from; a
+        # rebuild since then has replaced them and ignores it.
+        self._index = (lowered, names, _postings(texts), chars)
+        built.set()
+
+    def wait(self, timeout=None):
+        """Wait until the postings of the current catalog are built; return whether they are."""
+        return self._built.wait(timeout)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query):
+        """Return the names matching ``query``, best matches first."""
+        terms = query.lower().split()
+        if not terms:
+            self._last_terms = None
+            return list(self.names)
+        candidates = range(len(self.names))
+        if self._last_terms and self._extends(terms, self._last_terms):
+            candidates = self._last_matches
+        term_groups = {}
+        for term in terms:
+            # Terms left unchanged since the last query keep their matches.
+            groups = self._term_groups.get(term) if candidates is self._last_matches else None
+            term_groups[term] = groups or self._match(term, candidates)
+        self._last_terms = terms
+        self._term_groups = term_groups
+        if len(term_groups) == 1:
+            matches = list(chain.from_iterable(*term_groups.values()))
+            self._last_matches = sorted(matches)
+        else:
+            scores = None
+            for groups in term_groups.values():
+                ranks = {}
+                for rank, group in enumerate(groups):
+                    ranks.update(dict.fromkeys(group, rank))
+                if scores is None:
+                    scores = ranks
+                else:
+                    scores = {index: score + ranks[index] for index, score in scores.items() if index in ranks}
+            # Catalog order first; the rank sort is stable, so that breaks ties.
+            self._last_matches = sorted(scores)
+            matches = sorted(self._last_matches, key=scores.__getitem__)
+        return list(map(self.names.__getitem__, matches))
+
+    def _match(self, term, indices):
+        """Split the ``indices`` matching ``term`` into one list per rank, best first."""
+        index = self._index
+        if index is not None and index[0] is self._lowered:
+            return self._lookup(term, indices, *index[1:])
+        return self._scan(term, indices)
+
+    def _lookup(self, term, indices, names, texts, chars):
+        size = len(self.names)
+        # None when every entry is a candidate, else a 0/1 byte per entry.
+        allowed = _mask(indices, size) if len(indices) < size else None
+        lowered = self._lowered.__getitem__
+        found = self._containing(term, names, allowed, lowered)
+        at_start = list(map(str.startswith, map(lowered, found), repeat(term)))
+        taken = _mask(found, size)
+        fuzzy = []
+        if len(term) > 1:  # a single character is a substring match anyway
+            possible = [chars.get(char) for char in set(term)]
+            if all(mask is not None for mask in possible):
+                if allowed is not None:
+                    possible.append(allowed)
+                candidates = list(compress(range(size), _without(_and(*possible), taken)))
+                search = re.compile(".*?".join(map(re.escape, term))).search
+                fuzzy = list(compress(candidates, map(search, map(lowered, candidates))))
+                deque(map(taken.__setitem__, fuzzy, repeat(1)), 0)
+        others = _without(allowed, taken) if allowed is not None else taken.translate(_INVERT)
+        in_text = self._containing(term, texts, others, self._texts.__getitem__)
+        return (
+            list(compress(found, at_start)),
+            list(compress(found, map(not_, at_start))),
+            fuzzy,
+            in_text,
+        )
+
+    @staticmethod
+    def _containing(term, postings, allowed, strings):
+        """Ascending indices, among ``allowed`` (``None`` for all), whose string contains ``term``."""
+        if len(term) <= 2:
+            candidates = postings.get(term, [])
+        else:
+            # Every pair of adjacent characters has to be there; the rarest narrows it most.
+            candidates = min((postings.get(pair, []) for pair in map(add, term, term[1:])), key=len)
+        if allowed is not None:
+            candidates = list(compress(candidates, map(allowed.__getitem__, candidates)))
+        if len(term) > 2:
+            candidates = list(compress(candidates, map(str.__contains__, map(strings, candidates), repeat(term))))
+        return candidates
+
+    def _scan(self, term, indices):
+        """``_match`` without postings: test every candidate's strings."""
+        # Each test runs over all candidates in one map() call rather than
+        # per entry in Python, and only on those no better test has matched.
+        lowered = self._lowered.__getitem__
+        in_name = list(map(str.__contains__, map(lowered, indices), repeat(term)))
+        found = list(compress(indices, in_name))
+        others = list(compress(indices, map(not_, in_name)))
+        at_start = list(map(str.startswith, map(lowered, found), repeat(term)))
+        fuzzy = []
+        if len(term) > 1:
+            search = re.compile(".*?".join(map(re.escape, term))).search
+            possible = list(compress(others, map(self._has_chars(term).__getitem__, others)))
+            fuzzy = list(compress(possible, map(search, map(lowered, possible))))
+            if fuzzy:
+                others = list(filterfalse(set(fuzzy).__contains__, others))
+        in_text = map(str.__contains__, map(self._texts.__getitem__, others), repeat(term))
+        return (
+            list(compress(found, at_start)),
+            list(compress(found, map(not_, at_start))),
+            fuzzy,
+            list(compress(others, in_text)),
+        )
+
+    def _has_chars(self, term):
+        """Bytes with a non-zero entry for every name containing all of ``term``'s characters."""
+        maybe = None
+        for char in set(term):
+            names = self._chars.get(char)
+            if names is None:
+                names = self._chars[char] = bytes(map(str.__contains__, self._lowered, repeat(char)))
+            if maybe is None:
+                maybe = names
+            else:
+                # One byte per name, each 0 or 1, so a bitwise AND of the whole maps works.
+                maybe = _and(maybe, names)
+        return maybe
+
+    @staticmethod
+    def _extends(terms, previous):
+        # Anything matching a term also matches every substring of it, so
+        # the new matches are a subset of the old ones.
+        return len(terms) >= len(previous) and all(old in term for term, old in zip(terms, previous))
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sys
+
+from .line_splitter import OutputStream
+from .termination import NEW_SESSION_KWARGS
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_child_watcher_ready = False
+
+
+def _ensure_child_watcher():
+    """Use pidfd-based child reaping on Linux before Python 3.12.
+
+    The default watcher on older Pythons starts one thread per child just to
+    call ``waitpid``, which defeats the point of running on the event loop.
+    Python 3.12+ picks pidfd on its own.
+    """
+    global _child_watcher_ready
+    if _child_watcher_ready:
+        return
+    _child_watcher_ready = True
+    if sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:  # kernel without pidfd support
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(asyncio.get_running_loop())
+    asyncio.set_child_watcher(watcher)
+
+
+async def _read_stream(stream, output, on_lines, on_data=None):
+    lines = OutputStream(output)
+    while True:
+        data = await stream.read(READ_CHUNK_SIZE)
+        if on_data is not None and data:
+            on_data(len(data))
+        count = lines.feed(data) if data else lines.close()
+        if count:
+            on_lines(count)
+        if not data:
+            return
+
+
+async def run_process(command, output, on_lines, on_start=None, shell=False, on_data=None, **kwargs):
+    """Run ``command`` on the current event loop and return its exit code.
+
+    stdout and stderr are both read into ``output``; ``on_lines(count)`` is
+    called after each batch of lines is stored or rewritten, and ``on_start(pid)`` once
+    the child has been spawned. ``on_data(size)``, if given, is called with
+    the size of every chunk read from either pipe.
+    """
+    _ensure_child_watcher()
+    kwargs = {**NEW_SESSION_KWARGS, **kwargs}
+    pipes = dict(stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    if shell:
+        process = await asyncio.create_subprocess_shell(command, **pipes, **kwargs)
+    else:
+        process = await asyncio.create_subprocess_exec(*command, **pipes, **kwargs)
+    return await supervise(process, output, on_lines, on_start, on_data)
+
+
+async def supervise(process, output, on_lines, on_start=None, on_data=None):
+    """Read an already started ``asyncio`` subprocess to completion and return its exit code."""
+    if on_start is not None:
+        on_start(process.pid)
+    await asyncio.gather(
+        _read_stream(process.stdout, output, on_lines, on_data),
+        _read_stream(process.stderr, output, on_lines, on_data),
+    )
+    return await process.wait()
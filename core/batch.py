@@ -0,0 +1,208 @@
+import asyncio
+import os
+import signal
+import sys
+import time
+
+from .async_runner import run_process
+from .commands import build_command
+from .launch_queue import ADMIT_INTERVAL, LaunchQueue, LaunchRequest
+from .output_buffer import OutputBuffer
+from .termination import terminate_tree
+
+# The newest line of an app is held back, since a progress bar may still
+# rewrite it: it is printed once another line follows, or at most this
+# many seconds later. A line rewritten after it was printed is printed
+# again, so a progress bar shows up about once per interval.
+HOLD_DELAY = 1.0
+
+_COLORS = (36, 33, 35, 32, 34, 31)
+
+
+class PrefixedOutput:
+    """Interleaves the output of several apps on one stream, one prefixed line at a time.
+
+    Lines are read back from each app's ``OutputBuffer`` as its
+    ``on_lines`` callback fires, so nothing is stored twice; evicted lines
+    come from the run log.
+    """
+
+    def __init__(self, names, stream, color=False):
+        width = max(map(len, names), default=0)
+        self.stream = stream
+        self._prefixes = {}
+        for i, name in enumerate(names):
+            prefix = f"{name:<{width}} | "
+            if color:
+                prefix = f"\x1b[{_COLORS[i % len(_COLORS)]}m{prefix}\x1b[0m"
+            self._prefixes[name] = prefix
+        self._outputs = {}
+        self._next = {}    # name -> sequence number of the next line to print
+        self._shown = {}   # name -> (seq, text) of a printed line that may still change
+        self._timers = {}
+
+    def attach(self, name, output):
+        self._outputs[name] = output
+        self._next[name] = output.seq
+        self._shown.pop(name, None)
+
+    def update(self, name):
+        """Print the lines ``name`` has added since the last call, holding back the newest."""
+        self._emit(name, hold=True)
+        if name not in self._timers:
+            self._timers[name] = asyncio.get_running_loop().call_later(HOLD_DELAY, self._flush, name)
+
+    def finish(self, name):
+        timer = self._timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+        self._emit(name, hold=False)
+
+    def _flush(self, name):
+        del self._timers[name]
+        self._emit(name, hold=False)
+
+    def _emit(self, name, hold):
+        output = self._outputs[name]
+        stop = output.seq - 1 if hold else output.seq
+        lines = []
+        shown = self._shown.pop(name, None)
+        if shown is not None:
+            seq, text = shown
+            if seq < stop:
+                current = output.lines_range(seq, seq + 1)[0]
+                if current != text:
+                    lines.append(current)
+                if seq == stop - 1:  # still the newest line
+                    self._shown[name] = (seq, current)
+            else:
+                self._shown[name] = shown
+        start = self._next[name]
+        if stop > start:
+            new = output.lines_range(start, stop)
+            lines.extend(new)
+            self._next[name] = stop
+            if not hold:
+                self._shown[name] = (stop - 1, new[-1])
+        if lines:
+            prefix = self._prefixes[name]
+            self.stream.write("".join(f"{prefix}{line}\n" for line in lines))
+            self.stream.flush()
+
+
+class BatchRunner:
+    """Starts catalog entries without the UI, at most ``parallel`` at a time.
+
+    Commands, output buffers, run logs and admission through a
+    ``LaunchQueue`` are the same as in the launcher; ``parallel`` takes the
+    place of the ``max_concurrency`` setting. Output goes to a
+    ``PrefixedOutput``. ``run`` returns one
+    ``(name, returncode, seconds)`` per app, with ``returncode`` ``None``
+    if the app could not be started.
+    """
+
+    def __init__(self, apps, settings, conda_envs, log_spooler, output, parallel=None, errors=sys.stderr):
+        self.apps = apps
+        self.settings = settings
+        self.conda_envs = conda_envs
+        self.log_spooler = log_spooler
+        self.output = output
+        self.parallel = max(1, parallel or settings.get("max_concurrency") or os.cpu_count() or 1)
+        self.errors = errors
+        self.queue = LaunchQueue()
+        self.queue.configure(settings)
+        self.queue.max_concurrency = self.parallel
+        # Built up front so that invalid per-app settings fail before anything starts.
+        self.requests = [LaunchRequest.from_config(app, payload=app) for app in apps]
+
+    async def run(self):
+        task = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        if os.name != 'nt':
+            # CI runners stop jobs with SIGTERM; clean up as for Ctrl+C.
+            loop.add_signal_handler(signal.SIGTERM, task.cancel)
+        admitted = {request.name: asyncio.Event() for request in self.requests}
+        for request in self.requests:
+            self.queue.submit(request)
+
+        def admit():
+            for request in self.queue.pump():
+                admitted[request.name].set()
+
+        async def recheck():
+            while True:
+                await asyncio.sleep(ADMIT_INTERVAL)
+                admit()
+
+        async def run_app(app):
+            await admitted[app["name"]].wait()
+            try:
+                return await self._run_app(app)
+            finally:
+                self.queue.finished(app["name"])
+                admit()
+
+        admit()
+        rechecks = asyncio.ensure_future(recheck())
+        try:
+            return await asyncio.gather(*(run_app(request.payload) for request in self.requests))
+        finally:
+            rechecks.cancel()
+            if os.name != 'nt':
+                loop.remove_signal_handler(signal.SIGTERM)
+
+    async def _run_app(self, app):
+        name = app["name"]
+        command, shell, env = build_command(
+            app, self.settings, self.conda_envs,
+            lambda e: self._warn(f"{name}: {e}; falling back to conda activate."),
+        )
+        try:
+            log = self.log_spooler.open_run(name)
+        except OSError as e:
+            self._warn(f"{name}: cannot write output log: {e}")
+            log = None
+        output = OutputBuffer.from_config(app, log=log)
+        self.output.attach(name, output)
+        pids = []
+        start = time.monotonic()
+        returncode = None
+        try:
+            returncode = await run_process(command, output, lambda count: self.output.update(name), pids.append, shell=shell, env=env)
+        except asyncio.CancelledError:
+            # Apps run in sessions of their own, so Ctrl+C does not reach them.
+            if pids:
+                await asyncio.to_thread(terminate_tree, pids[0])
+            raise
+        except Exception as e:
+            self._warn(f"{name}: could not be started: {e}")
+        finally:
+            output.finish()
+            self.output.finish(name)
+        return name, returncode, time.monotonic() - start
+
+    def _warn(self, message):
+        self.errors.write(f"{message}\n")
+        self.errors.flush()
+
+
+def report(results, stream=sys.stderr):
+    """Write a status line per app to ``stream`` and return the aggregate exit status.
+
+    The status is 0 if every app exited with code 0, and 1 otherwise.
+    """
+    failed = 0
+    width = max((len(name) for name, _, _ in results), default=0)
+    for name, returncode, seconds in results:
+        if returncode is None:
+            status = "could not be started"
+        elif returncode < 0:
+            status = f"killed by signal {-returncode}"
+        else:
+            status = f"exited with code {returncode}"
+        failed += returncode != 0
+        stream.write(f"{name:<{width}}  {status} after {seconds:.1f}s\n")
+    if failed:
+        stream.write(f"{failed} of {len(results)} applications failed.\n")
+    stream.flush()
+    return 1 if failed else 0
@@ -0,0 +1,193 @@
+from collections import namedtuple
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from .lazy import LazyModule
+
+yaml = LazyModule("yaml")
+
+DEFAULT_PATH = "applications.yaml"
+POLL_INTERVAL = 1.0
+# Editors often save in several writes; wait for them to settle.
+SETTLE_DELAY = 0.1
+
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_EVENT_HEADER = struct.Struct("iIII")
+
+CatalogDiff = namedtuple("CatalogDiff", "added removed changed")
+
+
+class CatalogError(ValueError):
+    """``applications.yaml`` could not be parsed or has an invalid entry."""
+
+
+def diff_entries(old, new):
+    """Compare two ``name -> entry`` mappings; names come back in file order."""
+    added = [name for name in new if name not in old]
+    removed = [name for name in old if name not in new]
+    changed = [name for name, entry in new.items() if name in old and old[name] != entry]
+    return CatalogDiff(added, removed, changed)
+
+
+class AppCatalog:
+    """The applications and settings in ``applications.yaml``.
+
+    ``load`` only re-parses the file when its modification time, size or
+    inode has changed. Entries are indexed by name; if a name appears more
+    than once the first entry wins, as the list lookup used to behave.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.applications = []
+        self.settings = {}
+        self.by_name = {}
+        self.duplicates = []
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def load(self):
+        """Re-read the file if it changed on disk and return whether it did.
+
+        Raises ``OSError`` or ``CatalogError``; the previous contents are
+        kept in that case.
+        """
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp == self._stamp:
+                return False
+            with open(self.path, "rb") as file:
+                try:
+                    # CSafeLoader is missing when PyYAML is built without libyaml.
+                    data = yaml.load(file, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+                except yaml.YAMLError as e:
+                    raise CatalogError(f"{self.path}: {e}") from e
+            if not isinstance(data, dict):
+                raise CatalogError(f"{self.path}: expected a mapping at the top level")
+            applications = data.get("applications") or []
+            by_name = {}
+            duplicates = []
+            for app in applications:
+                if not isinstance(app, dict) or "name" not in app:
+                    raise CatalogError(f"{self.path}: application entry without a name: {app!r}")
+                if app["name"] in by_name:
+                    duplicates.append(app["name"])
+                else:
+                    by_name[app["name"]] = app
+            self.applications = applications
+            self.settings = data.get("settings") or {}
+            self.by_name = by_name
+            self.duplicates = duplicates
+            self._stamp = stamp
+            return True
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def watch(self, on_change, on_error=None, poll_interval=POLL_INTERVAL):
+        """Reload on a background thread whenever the file changes.
+
+        ``on_change()`` is called from that thread after a successful
+        reload and ``on_error(exception)`` when the new contents cannot be
+        read. inotify is used on Linux, polling every ``poll_interval``
+        seconds elsewhere or if inotify is unavailable.
+        """
+        if self._thread is not None:
+            return
+
+        def reload():
+            try:
+                changed = self.load()
+            except (OSError, CatalogError) as e:
+                if on_error is not None:
+                    on_error(e)
+                return
+            if changed:
+                on_change()
+
+        self._thread = threading.Thread(target=self._watch, args=(reload, poll_interval), name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self, reload, poll_interval):
+        if sys.platform.startswith("linux"):
+            try:
+                fd = self._inotify_fd()
+            except (OSError, AttributeError):
+                pass
+            else:
+                try:
+                    self._watch_inotify(fd, reload)
+                finally:
+                    os.close(fd)
+                return
+        self._watch_polling(reload, poll_interval)
+
+    def _inotify_fd(self):
+        # Watch the directory rather than the file: editors that save by
+        # renaming a new file over the old one would end a file watch.
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(error, f"cannot watch {directory}")
+        return fd
+
+    def _watch_inotify(self, fd, reload):
+        name = os.fsencode(os.path.basename(self.path))
+        while not self._stop.is_set():
+            if not select.select([fd], [], [], POLL_INTERVAL)[0]:
+                continue
+            if not self._touches(os.read(fd, 64 * 1024), name):
+                continue
+            time.sleep(SETTLE_DELAY)
+            while select.select([fd], [], [], 0)[0]:
+                os.read(fd, 64 * 1024)  # drop the rest of the burst
+            reload()
+
+    @staticmethod
+    def _touches(data, name):
+        position = 0
+        while position < len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, position)
+            position += _EVENT_HEADER.size
+            if data[position:position + length].rstrip(b"\0") == name:
+                return True
+            position += length
+        return False
+
+    def _watch_polling(self, reload, poll_interval):
+        seen = self._stamp
+        while not self._stop.wait(poll_interval):
+            try:
+                stamp = self._file_stamp()
+            except OSError:
+                continue
+            # Compared with the last stamp seen rather than the last one
+            # loaded, so a broken file is reported once, not on every poll.
+            if stamp != seen:
+                seen = stamp
+                time.sleep(SETTLE_DELAY)
+                reload()
@@ -0,0 +1,28 @@
+import os
+
+from .conda_envs import CondaEnvNotFound
+
+
+def build_command(app, settings, conda_envs, on_fallback=None):
+    """Return ``(command, shell, env)`` used to start ``app``.
+
+    With ``fast_launch`` the env's interpreter is run directly; if the env
+    cannot be resolved, ``on_fallback(error)`` is called and the command
+    goes through ``conda activate`` instead.
+    """
+    if app.get("fast_launch", settings.get("fast_launch", False)):
+        # Run the env's interpreter directly instead of going through
+        # shell startup and `conda activate`.
+        try:
+            conda_env = conda_envs.resolve(app["conda_env"])
+            return [conda_env.python, app["path"]], False, conda_env.environ()
+        except CondaEnvNotFound as e:
+            if on_fallback is not None:
+                on_fallback(e)
+
+    activate_cmd = f'conda activate {app["conda_env"]}'
+    python_cmd = f'python "{app["path"]}"'
+    full_cmd = f'{activate_cmd} && {python_cmd}'
+    if os.name == 'nt':  # Windows
+        return full_cmd, True, None
+    return ['bash', '-c', full_cmd], False, None  # Unix-like systems
@@ -0,0 +1,141 @@
+from dataclasses import dataclass, field
+import json
+import os
+import threading
+
+from .lazy import LazyModule
+
+yaml = LazyModule("yaml")
+
+
+class CondaEnvNotFound(LookupError):
+    pass
+
+
+@dataclass(frozen=True)
+class CondaEnv:
+    name: str
+    prefix: str
+    python: str
+    env_vars: dict = field(default_factory=dict)
+
+    def path_entries(self):
+        if os.name == 'nt':
+            return [
+                self.prefix,
+                os.path.join(self.prefix, "Library", "mingw-w64", "bin"),
+                os.path.join(self.prefix, "Library", "usr", "bin"),
+                os.path.join(self.prefix, "Library", "bin"),
+                os.path.join(self.prefix, "Scripts"),
+                os.path.join(self.prefix, "bin"),
+            ]
+        return [os.path.join(self.prefix, "bin")]
+
+    def environ(self, base=None):
+        """Return the environment ``conda activate`` would produce for this env."""
+        env = dict(os.environ if base is None else base)
+        env["PATH"] = os.pathsep.join(self.path_entries() + [env.get("PATH", "")])
+        env["CONDA_PREFIX"] = self.prefix
+        env["CONDA_DEFAULT_ENV"] = self.name
+        env["CONDA_SHLVL"] = str(int(env.get("CONDA_SHLVL", "0") or 0) + 1)
+        env["CONDA_PROMPT_MODIFIER"] = f"({self.name}) "
+        env.pop("PYTHONHOME", None)
+        env.update(self.env_vars)
+        return env
+
+
+def _python_path(prefix):
+    if os.name == 'nt':
+        return os.path.join(prefix, "python.exe")
+    return os.path.join(prefix, "bin", "python")
+
+
+def _read_env_vars(prefix):
+    # Variables set with `conda env config vars set` live in this file.
+    try:
+        with open(os.path.join(prefix, "conda-meta", "state")) as file:
+            return dict(json.load(file).get("env_vars", {}))
+    except (OSError, ValueError):
+        return {}
+
+
+class CondaEnvResolver:
+    """Maps ``conda_env`` names to interpreters without running conda.
+
+    Results are cached per env and reused for as long as the env directory's
+    mtime is unchanged, so a removed or recreated env is picked up while
+    repeat launches cost a single stat.
+    """
+
+    def __init__(self, environ=None):
+        self._environ = os.environ if environ is None else environ
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def root_prefix(self):
+        root = self._environ.get("CONDA_ROOT") or self._environ.get("MAMBA_ROOT_PREFIX")
+        if root:
+            return root
+        exe = self._environ.get("CONDA_EXE")
+        if exe:
+            # <root>/bin/conda or <root>\Scripts\conda.exe
+            return os.path.dirname(os.path.dirname(exe))
+        prefix = self._environ.get("CONDA_PREFIX")
+        if prefix:
+            parent = os.path.dirname(prefix)
+            if os.path.basename(parent) == "envs":
+                return os.path.dirname(parent)
+            return prefix
+        return None
+
+    def envs_dirs(self):
+        dirs = []
+        for var in ("CONDA_ENVS_PATH", "CONDA_ENVS_DIRS"):
+            dirs.extend(d for d in self._environ.get(var, "").split(os.pathsep) if d)
+        dirs.extend(self._condarc_envs_dirs())
+        root = self.root_prefix()
+        if root:
+            dirs.append(os.path.join(root, "envs"))
+        dirs.append(os.path.join(os.path.expanduser("~"), ".conda", "envs"))
+        return [os.path.expanduser(d) for d in dirs]
+
+    def _condarc_envs_dirs(self):
+        try:
+            with open(os.path.join(os.path.expanduser("~"), ".condarc")) as file:
+                condarc = yaml.safe_load(file) or {}
+        except (OSError, yaml.YAMLError):
+            return []
+        return list(condarc.get("envs_dirs") or [])
+
+    def _find_prefix(self, name):
+        if os.path.isabs(name):
+            return name
+        root = self.root_prefix()
+        if name == "base" and root:
+            return root
+        for envs_dir in self.envs_dirs():
+            candidate = os.path.join(envs_dir, name)
+            if os.path.isfile(_python_path(candidate)):
+                return candidate
+        raise CondaEnvNotFound(f"Conda environment '{name}' not found")
+
+    def resolve(self, name):
+        with self._lock:
+            cached = self._cache.get(name)
+        if cached is not None:
+            env, mtime = cached
+            try:
+                if os.stat(env.prefix).st_mtime_ns == mtime:
+                    return env
+            except OSError:
+                pass
+
+        prefix = self._find_prefix(name)
+        python = _python_path(prefix)
+        if not os.path.isfile(python):
+            raise CondaEnvNotFound(f"No Python interpreter in conda environment '{name}' ({prefix})")
+        mtime = os.stat(prefix).st_mtime_ns
+        env = CondaEnv(name=name, prefix=prefix, python=python, env_vars=_read_env_vars(prefix))
+        with self._lock:
+            self._cache[name] = (env, mtime)
+        return env
@@ -0,0 +1,186 @@
+from dataclasses import dataclass
+import math
+import os
+import re
+import threading
+import time
+
+from .lazy import LazyModule
+
+psutil = LazyModule("psutil")
+
+# How often queued launches are re-checked against the current load.
+ADMIT_INTERVAL = 2.0
+# The load average and free memory take a while to show a new process, so
+# its estimates are counted on top of them for this long after admission.
+RESERVE_PERIOD = 60.0
+
+_SIZE = re.compile(r"\s*([\d.]+)\s*([kmgt]?)i?b?\s*", re.IGNORECASE)
+
+
+def parse_size(value):
+    """Bytes in ``value``: a number of bytes or a string such as ``"512M"`` or ``"2 GiB"``."""
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _SIZE.fullmatch(str(value))
+    if not match:
+        raise ValueError(f"invalid size: {value!r}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " kmgt".index(unit.lower() or " "))
+
+
+def _format_size(value):
+    return f"{value / 1024 ** 3:.1f}G"
+
+
+class ResourceProbe:
+    """Current CPU load and free memory of the machine."""
+
+    def cpu_count(self):
+        return os.cpu_count() or 1
+
+    def load(self):
+        """One-minute load average, or current CPU use in cores where there is none."""
+        try:
+            return os.getloadavg()[0]
+        except (AttributeError, OSError):  # Windows
+            return psutil.cpu_percent() / 100 * self.cpu_count()
+
+    def available_memory(self):
+        return psutil.virtual_memory().available
+
+
+@dataclass
+class LaunchRequest:
+    name: str
+    cpu_weight: float = 0.0
+    mem_estimate: int = 0
+    max_concurrency: int = None
+    payload: object = None
+    submitted_at: float = None
+    admitted_at: float = None
+    reason: str = ""  # why it is still queued
+
+    @classmethod
+    def from_config(cls, app, payload=None):
+        return cls(
+            name=app["name"],
+            cpu_weight=float(app.get("cpu_weight", 0) or 0),
+            mem_estimate=parse_size(app.get("mem_estimate")),
+            max_concurrency=app.get("max_concurrency"),
+            payload=payload,
+        )
+
+
+class LaunchQueue:
+    """Admission control for launches.
+
+    Requests are admitted in submission order; the first one that does not
+    fit holds back everything behind it, so a heavy launch is not starved
+    by lighter ones. A request fits when:
+
+    - the number of active launches, itself included, stays within
+      ``max_concurrency`` and within the ``max_concurrency`` of every active
+      request and of itself (an app with ``max_concurrency: 1`` runs alone);
+    - with a ``cpu_weight``, the load average plus the weights of launches
+      admitted in the last ``RESERVE_PERIOD`` seconds plus its own stays
+      within ``max_load_per_cpu`` per CPU;
+    - with a ``mem_estimate``, available memory minus the estimates of
+      recent launches minus its own stays above ``min_free_memory``.
+
+    When nothing is active the resource checks are skipped, so a launch
+    that could never fit still runs, alone. ``pump`` admits what fits and
+    should be called after ``submit``, after ``finished`` and every
+    ``ADMIT_INTERVAL`` seconds.
+    """
+
+    def __init__(self, probe=None, max_concurrency=None, max_load_per_cpu=1.0, min_free_memory=0, clock=time.monotonic):
+        self.probe = probe or ResourceProbe()
+        self.max_concurrency = max_concurrency
+        self.max_load_per_cpu = max_load_per_cpu
+        self.min_free_memory = min_free_memory
+        self.clock = clock
+        self._queued = []
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def configure(self, settings):
+        """Apply the launcher-wide settings from ``applications.yaml``."""
+        self.max_concurrency = settings.get("max_concurrency", self.max_concurrency)
+        self.max_load_per_cpu = settings.get("max_load_per_cpu", self.max_load_per_cpu)
+        self.min_free_memory = parse_size(settings.get("min_free_memory", self.min_free_memory))
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._active or any(request.name == name for request in self._queued)
+
+    @property
+    def queued(self):
+        with self._lock:
+            return list(self._queued)
+
+    @property
+    def active(self):
+        with self._lock:
+            return list(self._active.values())
+
+    def submit(self, request):
+        with self._lock:
+            request.submitted_at = self.clock()
+            self._queued.append(request)
+        return request
+
+    def cancel(self, name):
+        """Drop a queued (not yet admitted) request; returns whether there was one."""
+        with self._lock:
+            for request in self._queued:
+                if request.name == name:
+                    self._queued.remove(request)
+                    return True
+        return False
+
+    def finished(self, name):
+        with self._lock:
+            self._active.pop(name, None)
+
+    def pump(self):
+        """Admit queued requests that fit now and return them in order."""
+        with self._lock:
+            admitted = []
+            while self._queued:
+                request = self._queued[0]
+                request.reason = self._blocked_by(request)
+                if request.reason:
+                    for waiting in self._queued[1:]:
+                        waiting.reason = f"waiting behind {request.name}"
+                    break
+                self._queued.pop(0)
+                request.admitted_at = self.clock()
+                self._active[request.name] = request
+                admitted.append(request)
+            return admitted
+
+    def _blocked_by(self, request):
+        active = list(self._active.values())
+        limits = [r.max_concurrency for r in active + [request] if r.max_concurrency]
+        if self.max_concurrency:
+            limits.append(self.max_concurrency)
+        if len(active) + 1 > min(limits, default=math.inf):
+            return f"waiting for a free slot ({len(active)} running, limit {min(limits)})"
+        if not active:
+            return ""
+        now = self.clock()
+        recent = [r for r in active if now - r.admitted_at < RESERVE_PERIOD]
+        if request.cpu_weight:
+            capacity = self.probe.cpu_count() * self.max_load_per_cpu
+            load = self.probe.load()
+            reserved = sum(r.cpu_weight for r in recent)
+            if load + reserved + request.cpu_weight > capacity:
+                return f"waiting for CPU (load {load:.1f} + {reserved:.1f} reserved + {request.cpu_weight:.1f} > {capacity:.1f})"
+        if request.mem_estimate:
+            available = self.probe.available_memory() - sum(r.mem_estimate for r in recent)
+            if available - request.mem_estimate < self.min_free_memory:
+                return f"waiting for memory ({_format_size(max(available, 0))} available, needs {_format_size(request.mem_estimate)})"
+        return ""
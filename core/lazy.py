@@ -0,0 +1,24 @@
+import importlib
+
+
+class LazyModule:
+    """Stands in for a module and imports it when one of its attributes is first used.
+
+    For dependencies that are slow to import and not needed to draw the
+    first frame: ``psutil = LazyModule("psutil")`` at the top of a module
+    leaves the rest of it unchanged.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            # import_module holds the module's import lock, so threads racing here get the same module.
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded yet"
+        return f"<lazy module {self._name!r} ({state})>"
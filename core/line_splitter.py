@@ -0,0 +1,200 @@
+import codecs
+import re
+
+# \n, \r, backspace, CSI sequences (parameters in group 1, final byte in
+# group 2) and two-byte escapes.
+_CONTROL = re.compile(r"[\r\n\b]|\x1b\[([0-9;?]*)[ -/]*([@-~])|\x1b[@-Z\\-_]")
+_INCOMPLETE_ESCAPE = re.compile(r"\x1b(\[[0-9;?]*[ -/]*)?\Z")
+
+
+def _count(params, default=1):
+    return int(params) if params.isdigit() else default
+
+
+class LineSplitter:
+    """Turns raw pipe chunks into lines the way a terminal would show them.
+
+    ``\\r`` returns the cursor to the start of the line, so progress bars
+    that redraw themselves overwrite the line instead of producing a new
+    one per frame. Backspace and the CSI cursor movement and erase-in-line
+    sequences (``C``, ``D``, ``G``, ``K``) are applied too; every other
+    escape sequence, colours included, is dropped.
+
+    ``feed`` returns ``(replace, lines)``. A partial line is held back
+    until its newline arrives, unless it has been redrawn: then it is
+    returned while still *open*, so a progress bar shows up before it
+    finishes. When ``replace`` is true the first of ``lines`` is a new
+    version of the open line returned last time.
+    """
+
+    def __init__(self, encoding="utf-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._rest = ""   # "\r" or an escape sequence cut off at the end of a chunk
+        self._line = ""   # the line under the cursor
+        self._col = 0
+        self._redrawn = False  # whether the cursor has moved back on this line
+        # Whether this line has been redrawn with something on it. Once it
+        # has, it stays open even if it is erased to nothing, wherever the
+        # chunks happen to end.
+        self._shown = False
+        self._open = False
+
+    @property
+    def line_open(self):
+        """Whether the last line returned is still being written."""
+        return self._open
+
+    def feed(self, data):
+        text = self._rest + self._decoder.decode(data)
+        self._rest = ""
+        # Hold back a trailing \r in case the matching \n is in the next chunk.
+        if text.endswith("\r"):
+            text, self._rest = text[:-1], "\r"
+        else:
+            start = text.rfind("\x1b", max(0, len(text) - 64))
+            if start != -1 and _INCOMPLETE_ESCAPE.match(text, start):
+                text, self._rest = text[:start], text[start:]
+        return self._process(text)
+
+    def flush(self):
+        text = self._rest + self._decoder.decode(b"", final=True)
+        self._rest = ""
+        replace, lines = self._process(text)
+        if self._line and not self._open:
+            lines.append(self._line)
+        self._line, self._col, self._redrawn, self._shown, self._open = "", 0, False, False, False
+        return replace, lines
+
+    def _process(self, text):
+        if not text:
+            return False, []
+        replace = self._open
+        text = text.replace("\r\n", "\n")
+        if self._col == len(self._line) and "\r" not in text and "\x1b" not in text and "\b" not in text:
+            # Plain text appended at the end of the line: no need to tokenize.
+            lines = text.split("\n")
+            lines[0] = self._line + lines[0]
+            self._line = lines.pop()
+            self._col = len(self._line)
+            if lines:
+                self._redrawn = self._shown = False
+        elif "\x1b" not in text and "\b" not in text:
+            # Only \r and \n: overlay each line's frames without tokenizing.
+            lines = []
+            for i, piece in enumerate(text.split("\n")):
+                if i:
+                    lines.append(self._line)
+                    self._line, self._col, self._redrawn, self._shown = "", 0, False, False
+                frames = piece.split("\r")
+                if frames[0]:
+                    self._write(frames[0])
+                if len(frames) > 1:
+                    self._overwrite(frames[1:])
+                    self._redrawn = True
+        else:
+            lines = []
+            position = 0
+            for match in _CONTROL.finditer(text):
+                if match.start() > position:
+                    self._write(text[position:match.start()])
+                position = match.end()
+                token = match.group()
+                if token == "\n":
+                    lines.append(self._line)
+                    self._line, self._col, self._redrawn, self._shown = "", 0, False, False
+                    continue
+                # An erase may empty the line; note whether it was shown before.
+                self._shown = self._shown or (self._redrawn and bool(self._line))
+                self._redrawn = True
+                if token == "\r":
+                    self._col = 0
+                elif token == "\b":
+                    self._col = max(0, self._col - 1)
+                elif match.group(2):
+                    self._csi(match.group(1), match.group(2))
+            if position < len(text):
+                self._write(text[position:])
+        self._shown = self._shown or (self._redrawn and bool(self._line))
+        if self._shown or (replace and not lines):
+            lines.append(self._line)
+            self._open = True
+        else:
+            self._open = False
+        return replace, lines
+
+    def _write(self, text):
+        line, col = self._line, self._col
+        if col >= len(line):
+            line = line + " " * (col - len(line)) + text
+        else:
+            line = line[:col] + text + line[col + len(text):]
+        self._line, self._col = line, col + len(text)
+
+    def _overwrite(self, frames):
+        """Apply ``frames`` in order, each written from column 0."""
+        # Each column ends up holding the last frame long enough to reach
+        # it, so walk back from the last frame only until the longest is covered.
+        result = frames[-1]
+        longest = max(map(len, frames))
+        for frame in reversed(frames):
+            if len(result) >= longest:
+                break
+            if len(frame) > len(result):
+                result += frame[len(result):]
+        self._line = result + self._line[len(result):]
+        self._col = len(frames[-1])
+
+    def _csi(self, params, final):
+        if final == "K":
+            mode = _count(params, 0)
+            if mode == 0:
+                self._line = self._line[:self._col]
+            elif mode == 1:
+                self._line = " " * self._col + self._line[self._col:]
+            elif mode == 2:
+                self._line = ""
+        elif final == "G":
+            self._col = max(0, _count(params) - 1)
+        elif final == "C":
+            self._col += _count(params)
+        elif final == "D":
+            self._col = max(0, self._col - _count(params))
+
+
+class OutputStream:
+    """Stores the raw output of one pipe in an ``OutputBuffer``.
+
+    An open line (see ``LineSplitter``) is rewritten in place with
+    ``OutputBuffer.replace_last`` as long as no other stream has added a
+    line after it; otherwise the new version is appended below, as a
+    terminal would leave the old frame on screen.
+    """
+
+    def __init__(self, output, encoding="utf-8"):
+        self.output = output
+        self._splitter = LineSplitter(encoding)
+        self._open_seq = None
+        self._open_text = None
+
+    def feed(self, data):
+        """Store a chunk of raw bytes and return how many lines were added or changed."""
+        return self._store(*self._splitter.feed(data))
+
+    def close(self):
+        return self._store(*self._splitter.flush())
+
+    def _store(self, replace, lines):
+        if not lines:
+            return 0
+        changed = len(lines)
+        last = lines[-1]
+        # If another stream got in first but the stored line is still
+        # current, there is nothing to redo either.
+        if replace and (self.output.replace_last(lines[0], self._open_seq) or lines[0] == self._open_text):
+            lines = lines[1:]
+        last_seq = self.output.extend(lines) if lines else self._open_seq
+        if self._splitter.line_open:
+            self._open_seq, self._open_text = last_seq, last
+        else:
+            self._open_seq = self._open_text = None
+        return changed
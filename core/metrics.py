@@ -0,0 +1,207 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import os
+import threading
+import time
+
+PREFIX = "conda_launcher_"
+# Upper bounds, in seconds, of the histogram buckets.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# How often the textfile is rewritten.
+TEXTFILE_INTERVAL = 5.0
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Distribution of observed values, kept as bucket counts plus sum and maximum."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    @contextmanager
+    def time(self):
+        """Observe the time spent in the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile ``q`` (the maximum for the last one)."""
+        with self._lock:
+            rank = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return min(bound, self.max)
+            return self.max
+
+
+class MetricsRegistry:
+    """Counters and histograms of the launcher's own work, by name and labels.
+
+    Looking up a metric is a dict lookup once it exists, and updating it
+    takes one uncontended lock, so hot paths can update metrics per chunk
+    of output. ``render`` produces the Prometheus text format.
+    """
+
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self._families = {}  # name -> [kind, help, {labels: metric}]
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, **labels):
+        return self._get("counter", name, help, labels, Counter)
+
+    def histogram(self, name, help, buckets=DEFAULT_BUCKETS, **labels):
+        return self._get("histogram", name, help, labels, lambda: Histogram(buckets))
+
+    def _get(self, kind, name, help, labels, make):
+        key = tuple(sorted(labels.items()))
+        family = self._families.get(name)
+        metric = family[2].get(key) if family is not None else None
+        if metric is None:
+            with self._lock:
+                family = self._families.setdefault(name, [kind, help, {}])
+                if family[0] != kind:
+                    raise ValueError(f"{name} is already a {family[0]}")
+                metric = family[2].setdefault(key, make())
+        return metric
+
+    def collect(self):
+        """Return ``[(name, kind, help, [(labels, metric), ...]), ...]`` sorted by name."""
+        with self._lock:
+            return [
+                (name, kind, help, sorted(metrics.items()))
+                for name, (kind, help, metrics) in sorted(self._families.items())
+            ]
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        out = []
+        for name, kind, help, metrics in self.collect():
+            name = self.prefix + name
+            out.append(f"# HELP {name} {help}")
+            out.append(f"# TYPE {name} {kind}")
+            for labels, metric in metrics:
+                if kind == "counter":
+                    out.append(f"{name}{_labels(labels)} {metric.value}")
+                    continue
+                with metric._lock:
+                    counts, total, count = list(metric.counts), metric.sum, metric.count
+                cumulative = 0
+                for bound, bucket in zip(metric.buckets + (float("inf"),), counts):
+                    cumulative += bucket
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                out.append(f"{name}_sum{_labels(labels)} {total!r}")
+                out.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(out) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class MetricsExporter:
+    """Publishes a ``MetricsRegistry`` for Prometheus.
+
+    With ``textfile``, the metrics are written to that file every
+    ``interval`` seconds (atomically, for node_exporter's textfile
+    collector); with ``port``, they are served at ``/metrics`` on
+    ``host``. ``start`` raises ``OSError`` if the port cannot be bound.
+    """
+
+    def __init__(self, registry, textfile=None, port=None, host="127.0.0.1", interval=TEXTFILE_INTERVAL):
+        self.registry = registry
+        self.textfile = textfile
+        self.port = port
+        self.host = host
+        self.interval = interval
+        self.error = None  # last error writing the textfile
+        self._server = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self.port:
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+            registry = self.registry
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_error(404)
+                        return
+                    body = registry.render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True))
+        if self.textfile:
+            self._threads.append(threading.Thread(target=self._run, name="metrics-textfile", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.textfile:
+            self.write_textfile()
+
+    def _run(self):
+        while True:
+            self.write_textfile()
+            if self._stop.wait(self.interval):
+                return
+
+    def write_textfile(self):
+        temporary = f"{self.textfile}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as file:
+                file.write(self.registry.render())
+            os.replace(temporary, self.textfile)
+            self.error = None
+        except OSError as e:
+            self.error = str(e)
@@ -0,0 +1,227 @@
+from collections import deque
+import threading
+
+DEFAULT_MAX_LINES = 100_000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+CHUNK_SIZE = 4096
+
+
+class OutputBuffer:
+    """Bounded store for a single process's output.
+
+    Lines are kept in fixed-size chunks so appending never copies earlier
+    output, and the oldest lines are dropped once either cap is exceeded.
+    Every line gets a sequence number; readers remember the last sequence
+    number they saw and ask for ``lines_since`` it.
+
+    If ``log`` is given (a ``RunLog``), every line is also spooled to disk,
+    and lines evicted from memory can still be read back with ``lines_range``.
+    The newest line is held back from the log until another line follows
+    it or ``finish`` is called, since ``replace_last`` may still rewrite it.
+    """
+
+    def __init__(self, max_lines=DEFAULT_MAX_LINES, max_bytes=DEFAULT_MAX_BYTES, log=None):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.log = log
+        self._held = None  # newest line, not yet sent to the log
+        self._chunks = deque()
+        self._head = 0  # index of the first retained line in _chunks[0]
+        self._line_count = 0
+        self._byte_count = 0
+        self._seq = 0
+        self.clears = 0  # bumped by clear(), so views know their cached lines are stale
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, app, log=None):
+        return cls(
+            max_lines=app.get("max_output_lines", DEFAULT_MAX_LINES),
+            max_bytes=app.get("max_output_bytes", DEFAULT_MAX_BYTES),
+            log=log,
+        )
+
+    @property
+    def line_count(self):
+        return self._line_count
+
+    @property
+    def byte_count(self):
+        return self._byte_count
+
+    @property
+    def seq(self):
+        """Sequence number that the next appended line will receive."""
+        return self._seq
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest line still retained."""
+        return self._seq - self._line_count
+
+    @property
+    def first_readable(self):
+        """Sequence number of the oldest line ``lines_range`` can return."""
+        return 0 if self.log is not None else self.first_seq
+
+    def append(self, line):
+        line = line.rstrip("\n")
+        with self._lock:
+            self._add(line)
+            if self.log is not None:
+                self._spool((line,))
+            return self._seq - 1
+
+    def extend(self, lines):
+        """Store ``lines`` and return the sequence number of the last one."""
+        lines = [line.rstrip("\n") for line in lines]
+        with self._lock:
+            for line in lines:
+                self._add(line)
+            if self.log is not None and lines:
+                self._spool(lines)
+            return self._seq - 1
+
+    def _spool(self, lines):
+        if self._held is not None:
+            self.log.write((self._held,))
+        self.log.write(lines[:-1])
+        self._held = lines[-1]
+
+    def replace_last(self, line, seq=None):
+        """Overwrite the newest line in place, e.g. with a new frame of a progress bar.
+
+        With ``seq``, the line is only replaced if the newest line still has
+        that sequence number. Returns whether it was replaced.
+        """
+        with self._lock:
+            if not self._line_count or (seq is not None and seq != self._seq - 1):
+                return False
+            chunk = self._chunks[-1]
+            self._byte_count += len(line) - len(chunk[-1])
+            chunk[-1] = line
+            if self.log is not None:
+                self._held = line
+            return True
+
+    def merge(self, start, lines):
+        """Apply ``lines`` copied from another buffer, where the first is line ``start``.
+
+        For a mirror of a buffer kept in another process. Lines the mirror
+        already has are skipped, except the newest, which the original may
+        have rewritten since. If lines are missing before ``start``, the
+        mirror drops what it holds and continues numbering from ``start``;
+        the missing lines can still come from ``log``. Returns the number
+        of lines added or changed.
+        """
+        with self._lock:
+            if start > self._seq:
+                self._chunks.clear()
+                self._head = self._line_count = self._byte_count = 0
+                self._seq = start
+            skip = self._seq - start
+            changed = 0
+            if 0 < skip <= len(lines) and self._line_count:
+                line = lines[skip - 1]
+                chunk = self._chunks[-1]
+                if chunk[-1] != line:
+                    self._byte_count += len(line) - len(chunk[-1])
+                    chunk[-1] = line
+                    changed = 1
+            for line in lines[skip:]:
+                self._add(line)
+            return changed + max(len(lines) - skip, 0)
+
+    def finish(self):
+        """Send the held-back last line to the log and close it; no more lines will come."""
+        with self._lock:
+            if self.log is None:
+                return
+            if self._held is not None:
+                self.log.write([self._held])
+                self._held = None
+            self.log.close()
+
+    def _add(self, line):
+        if not self._chunks or len(self._chunks[-1]) >= CHUNK_SIZE:
+            self._chunks.append([])
+        self._chunks[-1].append(line)
+        self._line_count += 1
+        self._byte_count += len(line)
+        self._seq += 1
+        self._trim()
+
+    def _trim(self):
+        while self._line_count > self.max_lines or (
+            self._byte_count > self.max_bytes and self._line_count > 1
+        ):
+            chunk = self._chunks[0]
+            self._byte_count -= len(chunk[self._head])
+            chunk[self._head] = None
+            self._head += 1
+            self._line_count -= 1
+            if self._head == len(chunk):
+                self._chunks.popleft()
+                self._head = 0
+
+    def lines_since(self, offset, limit=None):
+        """Return ``(lines, next_offset)`` for every retained line at or after ``offset``.
+
+        If ``offset`` points at lines that have already been evicted, reading
+        starts from the oldest retained line instead. ``limit`` keeps only the
+        most recent ``limit`` of those lines.
+        """
+        with self._lock:
+            start = max(offset, self.first_seq)
+            if limit is not None:
+                start = max(start, self._seq - limit)
+            return self._slice(start, self._seq), self._seq
+
+    def lines_range(self, start, stop):
+        """Return lines ``start`` to ``stop`` (exclusive), by sequence number.
+
+        Lines no longer in memory are read from the run log. The result has
+        one entry per requested line below ``seq``; evicted lines that the
+        log does not have (yet) come back empty.
+        """
+        with self._lock:
+            stop = min(stop, self._seq)
+            first = self.first_seq
+            lines = self._slice(max(start, first), stop)
+        if start >= first:
+            return lines
+        evicted = min(stop, first) - start
+        older = self.log.lines(start, start + evicted) if self.log is not None else []
+        return older + [""] * (evicted - len(older)) + lines
+
+    def _slice(self, start, stop):
+        if start >= stop:
+            return []
+        # Every chunk but the last is full, so the position can be computed
+        # directly instead of walking the chunks.
+        position = start - self.first_seq + self._head
+        index, skip = divmod(position, CHUNK_SIZE)
+        count = stop - start
+        lines = []
+        while len(lines) < count:
+            lines.extend(self._chunks[index][skip:skip + count - len(lines)])
+            index += 1
+            skip = 0
+        return lines
+
+    def text(self):
+        lines, _ = self.lines_since(0)
+        return "\n".join(lines)
+
+    def clear(self):
+        """Drop the lines kept in memory; sequence numbers carry on, and the log keeps them."""
+        with self._lock:
+            # No line is left for replace_last to rewrite, so the held one is final.
+            if self._held is not None:
+                self.log.write((self._held,))
+                self._held = None
+            self.clears += 1
+            self._chunks.clear()
+            self._head = 0
+            self._line_count = 0
+            self._byte_count = 0
@@ -0,0 +1,324 @@
+from array import array
+from datetime import datetime
+import mmap
+import os
+import re
+import threading
+
+DEFAULT_LOG_DIR = "logs"
+DEFAULT_KEEP_RUNS = 5
+FLUSH_INTERVAL = 0.2
+# Byte offset of every INDEX_STEP-th line is kept; finding any other line
+# means skipping at most INDEX_STEP - 1 newlines from the nearest entry.
+INDEX_STEP = 256
+# Bits in the trigram mask kept per INDEX_STEP lines when the search index
+# is on (see ``trigram_mask``).
+TRIGRAM_BITS = 4096
+
+
+def trigram_mask(data):
+    """Bit mask of the trigrams in the words of ``data``, ASCII letters lower-cased.
+
+    Only trigrams within a whitespace-separated word count, so repeated words
+    are handled once. Each trigram sets one of ``TRIGRAM_BITS`` bits, like a
+    Bloom filter: a block whose mask lacks a bit of a query's mask cannot
+    contain the query. Masks are only comparable within one process.
+    """
+    trigrams = set()
+    for word in set(data.lower().split()):
+        trigrams.update(zip(word, word[1:], word[2:]))
+    bits = bytearray(TRIGRAM_BITS // 8)
+    for bit in {hash(trigram) % TRIGRAM_BITS for trigram in trigrams}:
+        bits[bit >> 3] |= 1 << (bit & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _slug(app_name):
+    return re.sub(r"[^\w.-]+", "_", app_name).strip("._") or "app"
+
+
+class RunLog:
+    """Output of one run of an app, spooled to its own log file.
+
+    ``write`` only queues lines; a ``LogSpooler`` thread encodes queued
+    lines, appends them to the file in one write and records a sparse
+    line-offset index as it goes. ``lines`` reads back through ``mmap`` and
+    that index, so only the requested lines are touched however large the
+    file is. Lines are readable once they have been flushed.
+
+    With ``trigrams``, the spooler also keeps a ``trigram_mask`` of every
+    block of ``INDEX_STEP`` lines, which lets a search skip blocks.
+    """
+
+    def __init__(self, path, trigrams=False):
+        self.path = path
+        self.error = None
+        self._file = open(path, "wb")
+        self._pending = []
+        self._closed = False
+        self._offsets = array("Q")  # byte offset of line i * INDEX_STEP
+        self._trigrams = [] if trigrams else None  # trigram mask of lines from i * INDEX_STEP
+        self._line_count = 0        # lines on disk
+        self._size = 0              # bytes on disk
+        self._lock = threading.Lock()
+        self._map = None
+        self._map_lock = threading.Lock()
+
+    @property
+    def line_count(self):
+        return self._line_count
+
+    @property
+    def size(self):
+        return self._size
+
+    def write(self, lines):
+        with self._lock:
+            if not self._closed:
+                self._pending.extend(lines)
+
+    def close(self):
+        """Stop accepting lines; the spooler closes the file after the last flush."""
+        with self._lock:
+            self._closed = True
+
+    @property
+    def finished(self):
+        return self._file is None
+
+    def flush(self):
+        """Write queued lines to disk. Called by the spooler thread only."""
+        with self._lock:
+            lines, self._pending = self._pending, []
+            closed = self._closed
+            count, size = self._line_count, self._size
+        if self._file is None:
+            return
+        if lines:
+            offsets = []
+            masks = []
+            chunks = []
+            # Encoded in groups that end on index boundaries, so only the
+            # first line of each group needs its offset recorded.
+            i = 0
+            while i < len(lines):
+                if count % INDEX_STEP == 0:
+                    offsets.append(size)
+                group = lines[i:i + INDEX_STEP - count % INDEX_STEP]
+                data = ("\n".join(group) + "\n").encode("utf-8", "replace")
+                chunks.append(data)
+                if self._trigrams is not None:
+                    masks.append((count // INDEX_STEP, trigram_mask(data)))
+                i += len(group)
+                count += len(group)
+                size += len(data)
+            try:
+                self._file.write(b"".join(chunks))
+                self._file.flush()
+            except OSError as e:
+                self.error = str(e)
+                closed = True
+                with self._lock:
+                    self._closed = True  # nothing more can be written
+                    self._pending = []
+            else:
+                # Published only after the write, so readers never see lines
+                # that are not in the file yet.
+                with self._lock:
+                    self._offsets.extend(offsets)
+                    for block, mask in masks:
+                        if block < len(self._trigrams):
+                            self._trigrams[block] |= mask
+                        else:
+                            self._trigrams.append(mask)
+                    self._line_count, self._size = count, size
+        if closed:
+            try:
+                self._file.close()
+            except OSError:
+                pass  # flushing what a failed write left buffered fails again
+            self._file = None
+
+    def _remap(self, size):
+        if self._map is None or len(self._map) < size:
+            if self._map is not None:
+                self._map.close()
+            with open(self.path, "rb") as file:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def extent(self):
+        """Return ``(lines, size, offsets, trigrams)`` of what is on disk now.
+
+        ``offsets`` and ``trigrams`` are copies of the per-block index;
+        ``trigrams`` is ``None`` unless the search index is on.
+        """
+        with self._lock:
+            trigrams = list(self._trigrams) if self._trigrams is not None else None
+            return self._line_count, self._size, array("Q", self._offsets), trigrams
+
+    def lines(self, start, stop):
+        """Return flushed lines ``start`` to ``stop`` (exclusive) of this run."""
+        with self._lock:
+            stop = min(stop, self._line_count)
+            if start >= stop:
+                return []
+            position = self._offsets[start // INDEX_STEP]
+            size = self._size
+        with self._map_lock:
+            return _read_lines(self._remap(size), position, start % INDEX_STEP, stop - start)
+
+
+class LogReader:
+    """Read-only view of a run log that another process is writing.
+
+    Takes the place of a ``RunLog`` in an ``OutputBuffer`` that mirrors one
+    kept elsewhere: ``write`` and ``close`` do nothing, and ``lines`` indexes
+    the file as far as it is asked to, so only what has been scrolled to
+    is scanned.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.error = None  # only a RunLog fails to write
+        self._offsets = array("Q")
+        self._line_count = 0  # complete lines indexed so far
+        self._size = 0        # bytes indexed so far
+        self._map = None
+        self._lock = threading.Lock()
+
+    def write(self, lines):
+        pass
+
+    def close(self):
+        pass
+
+    def extent(self):
+        """Like ``RunLog.extent``, but only the size is known without reading the file."""
+        try:
+            return None, os.path.getsize(self.path), None, None
+        except OSError:
+            return None, 0, None, None
+
+    def _remap(self, size):
+        if self._map is None or len(self._map) < size:
+            if self._map is not None:
+                self._map.close()
+            with open(self.path, "rb") as file:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _index(self, stop):
+        """Index lines until ``stop`` lines are known or the end of the file."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size <= self._size:
+            return
+        data = self._remap(size)
+        position, count = self._size, self._line_count
+        while count < stop:
+            end = data.find(b"\n", position, size)
+            if end == -1:
+                break
+            if count % INDEX_STEP == 0:
+                self._offsets.append(position)
+            position, count = end + 1, count + 1
+        self._size, self._line_count = position, count
+
+    def lines(self, start, stop):
+        """Return lines ``start`` to ``stop`` (exclusive) that are in the file so far."""
+        with self._lock:
+            if stop > self._line_count:
+                self._index(stop)
+            stop = min(stop, self._line_count)
+            if start >= stop:
+                return []
+            return _read_lines(self._map, self._offsets[start // INDEX_STEP], start % INDEX_STEP, stop - start)
+
+
+def _read_lines(data, position, skip, count):
+    """Decode ``count`` lines of ``data`` after skipping ``skip`` lines from ``position``."""
+    for _ in range(skip):
+        position = data.find(b"\n", position) + 1
+    lines = []
+    for _ in range(count):
+        end = data.find(b"\n", position)
+        lines.append(data[position:end].decode("utf-8", "replace"))
+        position = end + 1
+    return lines
+
+
+class LogSpooler:
+    """Writes every open ``RunLog`` to disk from one background thread.
+
+    Each run gets a new file under ``<log_dir>/<app name>/``, named by its
+    start time, and only the newest ``keep_runs`` files of an app are kept.
+    ``keep_runs`` of 0 turns logging off. ``on_error(path, error)`` is
+    called from the spooling thread when a log stops being written because
+    of an ``OSError``, such as a full disk.
+    """
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR, keep_runs=DEFAULT_KEEP_RUNS, interval=FLUSH_INTERVAL, search_index=False, on_error=None):
+        self.log_dir = log_dir
+        self.keep_runs = keep_runs
+        self.search_index = search_index
+        self.on_error = on_error
+        self.interval = interval
+        self._runs = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-spooler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the thread and write out everything still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def open_run(self, app_name):
+        """Create the log for a new run of ``app_name``, or return ``None`` if logging is off."""
+        if self.keep_runs <= 0:
+            return None
+        directory = os.path.join(self.log_dir, _slug(app_name))
+        os.makedirs(directory, exist_ok=True)
+        name = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        run = RunLog(os.path.join(directory, f"{name}.log"), trigrams=self.search_index)
+        with self._lock:
+            self._runs.append(run)
+            active = {os.path.abspath(other.path) for other in self._runs}
+        self._prune(directory, active)
+        return run
+
+    def _prune(self, directory, active):
+        runs = sorted(name for name in os.listdir(directory) if name.endswith(".log"))
+        for name in runs[:-self.keep_runs]:
+            path = os.path.join(directory, name)
+            if os.path.abspath(path) in active:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # still open elsewhere (Windows) or already gone
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            runs = list(self._runs)
+        for run in runs:
+            had_error = run.error is not None
+            run.flush()
+            if not had_error and run.error is not None and self.on_error is not None:
+                self.on_error(run.path, run.error)
+        with self._lock:
+            self._runs = [run for run in self._runs if not run.finished]
@@ -0,0 +1,73 @@
+from collections import defaultdict
+import threading
+
+DEFAULT_BATCH_WINDOW = 0.025
+DEFAULT_MAX_BATCH_LINES = 2000
+
+
+class OutputNotifier:
+    """Coalesces "new output" notifications from reader threads.
+
+    Reader threads call ``mark`` for every line they store. A single flusher
+    thread posts at most one notification per app every ``window`` seconds,
+    or sooner once an app has ``max_batch_lines`` unreported lines. An app
+    that already has a notification in flight is not notified again until
+    the UI calls ``acknowledge`` for it.
+    """
+
+    def __init__(self, post, window=DEFAULT_BATCH_WINDOW, max_batch_lines=DEFAULT_MAX_BATCH_LINES):
+        self._post = post
+        self.window = window
+        self.max_batch_lines = max_batch_lines
+        self._dirty = defaultdict(int)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flush_now = threading.Event()
+        self._thread = None
+        self.lines_ingested = 0
+        self.messages_posted = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="output-notifier", daemon=True)
+            self._thread.start()
+
+    def mark(self, app_name, lines=1):
+        with self._lock:
+            self.lines_ingested += lines
+            count = self._dirty[app_name] + lines
+            self._dirty[app_name] = count
+        if count == lines:
+            self._wake.set()
+        elif count >= self.max_batch_lines:
+            self._flush_now.set()
+
+    def acknowledge(self, app_name):
+        with self._lock:
+            self._pending.discard(app_name)
+            dirty = app_name in self._dirty
+        if dirty:
+            self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return {"lines_ingested": self.lines_ingested, "messages_posted": self.messages_posted}
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._flush_now.wait(self.window)
+            self._wake.clear()
+            self._flush_now.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            ready = [app_name for app_name in self._dirty if app_name not in self._pending]
+            for app_name in ready:
+                del self._dirty[app_name]
+                self._pending.add(app_name)
+            self.messages_posted += len(ready)
+        for app_name in ready:
+            self._post(app_name)
@@ -0,0 +1,152 @@
+import mmap
+import re
+
+from .output_log import INDEX_STEP, trigram_mask
+
+# The log is scanned this many bytes at a time; a chunk is matched with the
+# GIL held, so this bounds how long a search can hold up the UI thread.
+CHUNK_BYTES = 256 * 1024
+# Lines of in-memory output scanned at a time.
+CHUNK_LINES = 4000
+# A search stops once it has found this many matching lines.
+MAX_MATCHES = 100_000
+
+
+class OutputSearch:
+    """Finds the lines of an ``OutputBuffer`` that match a query.
+
+    A query written as ``/.../`` is a regular expression, anything else is
+    plain text; either ignores case when it has no upper-case letters.
+    ``run`` scans the run log on disk through ``mmap`` and then the lines
+    that are only in memory, reporting matching line numbers a chunk at a
+    time. It can be called again later to search only newer lines; the line
+    searched last is searched again, as it may have been rewritten, so
+    callers should ignore repeats. Plain text queries skip the log blocks
+    that the log's trigram index rules out.
+    Raises ``re.error`` for an invalid regular expression.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        regex = len(query) > 2 and query.startswith("/") and query.endswith("/")
+        source = query[1:-1] if regex else query
+        self.ignore_case = source == source.lower()
+        self.literal = None if regex else (source.lower() if self.ignore_case else source)
+        source = source if regex else re.escape(source)
+        # Used for highlighting. Searches match lower-cased text instead of
+        # using IGNORECASE, which makes the regex engine several times slower.
+        self.pattern = re.compile(source, re.MULTILINE | (re.IGNORECASE if self.ignore_case else 0))
+        self._search = re.compile(source, re.MULTILINE).search
+        self.searched_to = 0  # line number up to which lines have been searched
+        self.matches = 0
+        self.truncated = False  # stopped at MAX_MATCHES
+
+    def run(self, output, on_matches, cancelled=lambda: False):
+        """Search the lines of ``output`` added since the last run.
+
+        ``on_matches`` is called with each ascending list of matching line
+        numbers as they are found. Returns ``False`` if ``cancelled()``
+        became true before the search got to the end.
+        """
+        start = self.searched_to
+        if start == 0 and output.log is not None:
+            start = self._search_log(output.log, on_matches, cancelled)
+            if start is None:
+                return False
+        elif start:
+            start -= 1  # the last line may have been rewritten since
+        start = max(start, output.first_readable)
+        stop = output.seq
+        while start < stop and not self.truncated:
+            if cancelled():
+                return False
+            end = min(stop, start + CHUNK_LINES)
+            self._report(self._scan("\n".join(output.lines_range(start, end)), start), on_matches)
+            start = self.searched_to = end
+        self.searched_to = max(self.searched_to, stop)
+        return True
+
+    def _search_log(self, log, on_matches, cancelled):
+        """Search the log file; return the number of lines in it, or ``None`` if cancelled."""
+        lines, size, offsets, trigrams = log.extent()
+        if not size:
+            return 0
+        with open(log.path, "rb") as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            # Only whole lines; the file may be growing.
+            size = data.rfind(b"\n", 0, min(size, len(data))) + 1
+            for begin, end, line in self._log_ranges(size, offsets, trigrams):
+                while begin < end and not self.truncated:
+                    if cancelled():
+                        return None
+                    stop = data.rfind(b"\n", begin, min(end, begin + CHUNK_BYTES)) + 1
+                    if stop <= begin:  # a line longer than a chunk
+                        stop = data.find(b"\n", begin, end) + 1 or end
+                    chunk = data[begin:stop]
+                    self._report(self._scan(chunk.decode("utf-8", "replace"), line), on_matches)
+                    line += chunk.count(b"\n")
+                    begin = stop
+            return line if lines is None else lines
+        finally:
+            data.close()
+
+    def _log_ranges(self, size, offsets, trigrams):
+        """``(start byte, end byte, first line)`` of the parts of the log to scan."""
+        if trigrams is None or self.literal is None or len(self.literal) < 3:
+            return [(0, size, 0)]
+        text = self.literal
+        if self.ignore_case:
+            # The index only lower-cases ASCII, so other letters may be
+            # upper-case in the log.
+            text = "".join(char if char.isascii() else " " for char in text)
+        mask = trigram_mask(text.encode("utf-8"))
+        ranges = []
+        for block, block_mask in enumerate(trigrams):
+            if block_mask & mask != mask:
+                continue
+            begin = offsets[block]
+            end = offsets[block + 1] if block + 1 < len(offsets) else size
+            if ranges and ranges[-1][1] == begin:
+                ranges[-1] = (ranges[-1][0], end, ranges[-1][2])
+            else:
+                ranges.append((begin, end, block * INDEX_STEP))
+        return ranges
+
+    def _scan(self, text, first):
+        """Line numbers of the lines of ``text`` that match, counting from ``first``."""
+        # Lower-casing can change the length of some text, so positions
+        # below are all in the lower-cased copy.
+        haystack = text.lower() if self.ignore_case else text
+        if self.literal is not None:
+            needle = self.literal
+            find = lambda position: haystack.find(needle, position)
+        else:
+            search = self._search
+
+            def find(position):
+                match = search(haystack, position)
+                return match.start() if match else -1
+
+        found = []
+        line, counted = first, 0
+        position = find(0)
+        while position != -1 and position < len(haystack):
+            line += haystack.count("\n", counted, position)
+            counted = position
+            found.append(line)
+            end = haystack.find("\n", position)
+            if end == -1:
+                break
+            position = find(end + 1)
+        return found
+
+    def _report(self, found, on_matches):
+        if not found:
+            return
+        room = MAX_MATCHES - self.matches
+        if len(found) >= room:
+            found = found[:room]
+            self.truncated = True
+        self.matches += len(found)
+        on_matches(found)
@@ -0,0 +1,152 @@
+import os
+import threading
+
+from .lazy import LazyModule
+
+psutil = LazyModule("psutil")
+
+
+def _normalize(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def child_pids(pid):
+    """Direct children of ``pid`` without scanning every process on the host."""
+    task_dir = f"/proc/{pid}/task"
+    try:
+        children = []
+        for tid in os.listdir(task_dir):
+            with open(f"{task_dir}/{tid}/children") as file:
+                children.extend(int(child) for child in file.read().split())
+        return children
+    except FileNotFoundError:
+        if os.path.isdir(task_dir):
+            return []  # gone between listdir and open
+    except OSError:
+        pass
+    # No /proc (or no children file): ask psutil, which scans the process table.
+    try:
+        return [child.pid for child in psutil.Process(pid).children()]
+    except psutil.Error:
+        return []
+
+
+class _Entry:
+    __slots__ = ("process", "app_name", "script")
+
+    def __init__(self, process, app_name, script):
+        self.process = process
+        self.app_name = app_name
+        self.script = script
+
+
+class ProcessIndex:
+    """Finds the process actually running each launched script.
+
+    Only descendants of processes the launcher spawned are examined, and
+    once an app's script is found its tree is no longer inspected.
+    ``track`` and the lookups only touch dictionaries, so they are safe to
+    call from the UI thread; ``refresh``, which reads /proc and psutil, runs
+    on a background thread (the resource sampler's). It also drops processes
+    that have exited, checked against the cached ``psutil.Process``, which
+    remembers its create time, so a PID reused by an unrelated process is
+    forgotten on the next refresh.
+    """
+
+    def __init__(self):
+        self._roots = {}      # app_name -> (root pid, normalized script path, direct)
+        self._entries = {}    # pid -> _Entry
+        self._by_app = {}     # app_name -> pid of the script's interpreter
+        self._lock = threading.Lock()
+
+    def track(self, app_name, pid, script_path, direct=False):
+        """Start indexing the tree rooted at ``pid`` on the next ``refresh``.
+
+        ``direct`` means ``pid`` runs the script itself (no shell wrapper).
+        """
+        script = _normalize(script_path)
+        with self._lock:
+            self._untrack(app_name)
+            self._roots[app_name] = (pid, script, direct)
+
+    def untrack(self, app_name):
+        with self._lock:
+            self._untrack(app_name)
+
+    def _untrack(self, app_name):
+        self._roots.pop(app_name, None)
+        self._by_app.pop(app_name, None)
+        for pid in [pid for pid, entry in self._entries.items() if entry.app_name == app_name]:
+            del self._entries[pid]
+
+    def _runs_script(self, process, script):
+        try:
+            cmdline = process.cmdline()
+        except psutil.Error:
+            return False
+        # The script is the first argument after the interpreter, so a shell
+        # wrapper that merely mentions the path inside `-c` does not match.
+        for arg in cmdline[1:]:
+            if arg.startswith("-"):
+                continue
+            return _normalize(arg) == script
+        return False
+
+    def refresh(self):
+        """Drop exited processes and look for the script process of apps not resolved yet."""
+        # The lock is only held to copy and publish, so lookups never wait on /proc.
+        with self._lock:
+            entries = dict(self._entries)
+            pending = {name: root for name, root in self._roots.items() if name not in self._by_app}
+        gone = {pid: entries.pop(pid) for pid, entry in list(entries.items()) if not entry.process.is_running()}
+        found = {name: self._resolve(name, *root, entries) for name, root in pending.items()}
+        with self._lock:
+            for pid, old in gone.items():
+                entry = self._entries.get(pid)
+                if entry is old:
+                    del self._entries[pid]
+                    if self._by_app.get(entry.app_name) == pid:
+                        del self._by_app[entry.app_name]
+            for name, (script_pid, tree) in found.items():
+                # Skip apps untracked or launched again while their tree was read.
+                if self._roots.get(name) != pending[name]:
+                    continue
+                for pid in [pid for pid, entry in self._entries.items() if entry.app_name == name]:
+                    del self._entries[pid]
+                self._entries.update(tree)
+                if script_pid is not None:
+                    self._by_app[name] = script_pid
+
+    def _resolve(self, app_name, root, script, direct, known):
+        """Return ``(script pid or None, {pid: _Entry})`` for the tree of ``root``."""
+        tree = {}
+        found = None
+        pending = [root]
+        while pending:
+            pid = pending.pop()
+            entry = known.get(pid)
+            if entry is None or entry.app_name != app_name:
+                try:
+                    entry = _Entry(psutil.Process(pid), app_name, script)
+                except psutil.Error:
+                    continue
+            tree[pid] = entry
+            if direct:
+                return pid, tree
+            # Until the script is found, command lines are re-read: a shell
+            # wrapper keeps its PID when it execs the interpreter.
+            if found is None and self._runs_script(entry.process, script):
+                found = pid
+            pending.extend(child_pids(pid))
+        return found, tree
+
+    def script_pid(self, app_name):
+        """Return the PID running ``app_name``'s script, or ``None`` if it is not known yet."""
+        with self._lock:
+            return self._by_app.get(app_name)
+
+    def app_name(self, pid):
+        """Return the tracked app whose process tree ``pid`` was found in, or ``None``."""
+        with self._lock:
+            entry = self._entries.get(pid)
+            return entry.app_name if entry is not None else None
@@ -0,0 +1,93 @@
+from dataclasses import dataclass, replace
+import threading
+import time
+
+QUEUED = "queued"
+ADMITTED = "admitted"
+STARTING = "starting"
+RUNNING = "running"
+EXITED = "exited"
+
+
+@dataclass(frozen=True)
+class ProcessRecord:
+    app_name: str
+    state: str = STARTING
+    pid: int = None
+    returncode: int = None
+    queued_at: float = None
+    admitted_at: float = None
+    started_at: float = None
+    running_at: float = None
+    exited_at: float = None
+
+
+class ProcessTable:
+    """Authoritative state of every launched app.
+
+    Launch backends report each transition as it happens (spawn, then the
+    result of waiting on the child), so reading the table never touches
+    ``/proc``. ``on_change(record)`` is called after every transition, from
+    whichever thread made it.
+    """
+
+    def __init__(self, on_change=None):
+        self._records = {}
+        self._lock = threading.Lock()
+        self._on_change = on_change
+
+    def _update(self, app_name, **changes):
+        with self._lock:
+            record = replace(self._records[app_name], **changes)
+            self._records[app_name] = record
+        if self._on_change is not None:
+            self._on_change(record)
+        return record
+
+    def _new(self, record):
+        with self._lock:
+            self._records[record.app_name] = record
+        if self._on_change is not None:
+            self._on_change(record)
+        return record
+
+    def apply(self, record):
+        """Store a record as reported by another process's table."""
+        return self._new(record)
+
+    def queued(self, app_name):
+        return self._new(ProcessRecord(app_name, state=QUEUED, queued_at=time.time()))
+
+    def admitted(self, app_name):
+        return self._update(app_name, state=ADMITTED, admitted_at=time.time())
+
+    def starting(self, app_name):
+        # A launch that went through the queue keeps its queue timestamps.
+        previous = self.get(app_name)
+        if previous is not None and previous.state == ADMITTED:
+            return self._update(app_name, state=STARTING, started_at=time.time())
+        return self._new(ProcessRecord(app_name, started_at=time.time()))
+
+    def running(self, app_name, pid):
+        return self._update(app_name, state=RUNNING, pid=pid, running_at=time.time())
+
+    def exited(self, app_name, returncode):
+        return self._update(app_name, state=EXITED, returncode=returncode, exited_at=time.time())
+
+    def get(self, app_name):
+        with self._lock:
+            return self._records.get(app_name)
+
+    def records(self):
+        with self._lock:
+            return list(self._records.values())
+
+    def pending(self):
+        """Return the records of launches that are queued or admitted but not started yet."""
+        with self._lock:
+            return [r for r in self._records.values() if r.state in (QUEUED, ADMITTED)]
+
+    def running_apps(self):
+        """Return ``(app_name, pid)`` for every app whose process is alive."""
+        with self._lock:
+            return [(r.app_name, r.pid) for r in self._records.values() if r.state == RUNNING]
@@ -0,0 +1,86 @@
+from collections import Counter
+import os
+import sys
+import threading
+
+# Each sample walks every thread's stack while holding the GIL. At 10 ms
+# bench_metrics.py measured a slowdown of up to about 15% of pure-Python
+# work; at 50 ms it stays within a few percent.
+DEFAULT_INTERVAL = 0.05
+# Deeper stacks are cut at the root end.
+MAX_DEPTH = 128
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the Python stack of every thread in the process every ``interval`` seconds.
+
+    Stacks are counted in the folded format that flamegraph.pl, speedscope
+    and inferno read: one line per distinct stack, frames from the thread
+    name down to the innermost function separated by ``;``, then the
+    number of samples. Sampling takes the GIL for a moment per interval,
+    so it is meant to be switched on while looking into a problem.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is None:
+            # Each thread gets its own event, so a quick stop and start cannot revive the old one.
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, stop):
+        own = threading.get_ident()
+        while not stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None and len(frames) < MAX_DEPTH:
+                    frames.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                frames.append(names.get(ident, f"thread-{ident}"))
+                stacks.append(";".join(reversed(frames)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+    def dump(self, path):
+        """Write the stacks sampled since the last dump to ``path``; return the number of samples."""
+        with self._lock:
+            stacks, self._stacks = self._stacks, Counter()
+            samples, self.samples = self.samples, 0
+        try:
+            with open(path, "w", encoding="utf-8") as file:
+                for stack, count in stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+        except OSError:
+            # Keep the samples for the next dump, along with any taken meanwhile.
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += samples
+            raise
+        return samples
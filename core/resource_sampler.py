@@ -0,0 +1,220 @@
+from array import array
+import os
+import sys
+import threading
+import time
+
+from .lazy import LazyModule
+from .process_index import child_pids
+
+psutil = LazyModule("psutil")
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_HISTORY = 60
+# Process trees rarely change shape, so children lists are re-read only
+# every few passes; in between the known PIDs are sampled directly.
+TREE_REFRESH_PASSES = 5
+METRICS = ("cpu", "rss", "threads", "fds", "read_rate", "write_rate")
+
+if sys.platform.startswith("linux"):
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class MetricHistory:
+    """Fixed-size ring of samples for one app, one ``array('d')`` per metric."""
+
+    def __init__(self, size=DEFAULT_HISTORY):
+        self.size = size
+        self.count = 0
+        self._head = 0
+        self._series = {name: array("d", bytes(8 * size)) for name in METRICS}
+
+    def add(self, sample):
+        for name in METRICS:
+            self._series[name][self._head] = sample[name]
+        self._head = (self._head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def latest(self, name):
+        if not self.count:
+            return 0.0
+        return self._series[name][self._head - 1]
+
+    def series(self, name):
+        """Samples of ``name``, oldest first."""
+        values = self._series[name]
+        if self.count < self.size:
+            return values[:self.count]
+        return values[self._head:] + values[:self._head]
+
+
+def _read_file(path):
+    # Raw os calls skip the buffered file object, which dominates for tiny /proc files.
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, 4096)
+    finally:
+        os.close(fd)
+
+
+def _read_linux(pid):
+    """Return ``(cpu_ticks, rss_bytes, threads, fds, read_bytes, write_bytes)`` from /proc."""
+    stat = _read_file(f"/proc/{pid}/stat")
+    # comm may contain spaces or parentheses, so split after the last ')'.
+    fields = stat[stat.rindex(b")") + 2:].split()
+    ticks = int(fields[11]) + int(fields[12])
+    threads = int(fields[17])
+    rss = int(fields[21]) * _PAGE_SIZE
+    try:
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+    except PermissionError:
+        fds = 0
+    read_bytes = write_bytes = 0
+    try:
+        for line in _read_file(f"/proc/{pid}/io").splitlines():
+            if line.startswith(b"read_bytes:"):
+                read_bytes = int(line.split()[1])
+            elif line.startswith(b"write_bytes:"):
+                write_bytes = int(line.split()[1])
+    except (PermissionError, FileNotFoundError):
+        pass
+    return ticks, rss, threads, fds, read_bytes, write_bytes
+
+
+def _read_psutil(pid):
+    process = psutil.Process(pid)
+    with process.oneshot():
+        times = process.cpu_times()
+        ticks = times.user + times.system
+        rss = process.memory_info().rss
+        threads = process.num_threads()
+        try:
+            fds = process.num_fds() if os.name != 'nt' else process.num_handles()
+        except psutil.AccessDenied:
+            fds = 0
+        try:
+            io = process.io_counters()
+            read_bytes, write_bytes = io.read_bytes, io.write_bytes
+        except (psutil.AccessDenied, AttributeError):
+            read_bytes = write_bytes = 0
+    return ticks, rss, threads, fds, read_bytes, write_bytes
+
+
+class _AppState:
+    def __init__(self, root, history_size):
+        self.root = root
+        self.history = MetricHistory(history_size)
+        self.last = {}  # pid -> (cpu_ticks, read_bytes, write_bytes)
+        self.last_time = None
+        self.pids = None
+        self.passes = 0
+
+
+class ResourceSampler:
+    """Samples CPU, memory, threads, fds and I/O of each launched app's process tree.
+
+    A background thread reads every tracked tree in one pass per
+    ``interval``. Trees are walked through /proc children lists on Linux,
+    and psutil is used elsewhere. ``get_roots`` returns ``(app_name, pid)``
+    pairs for the apps to sample. ``on_pass``, if given, is called on the
+    sampler thread after every pass, for other /proc work that should stay
+    off the UI thread. ``overhead`` is the fraction of one CPU the sampler
+    itself used over the last pass.
+    """
+
+    def __init__(self, get_roots, interval=DEFAULT_INTERVAL, history_size=DEFAULT_HISTORY, on_pass=None):
+        self._get_roots = get_roots
+        self.on_pass = on_pass
+        self.interval = interval
+        self.history_size = history_size
+        self._apps = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._read = _read_linux if sys.platform.startswith("linux") else _read_psutil
+        self._tick_scale = 1.0 / _CLK_TCK if self._read is _read_linux else 1.0
+        self.overhead = 0.0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def history(self, app_name):
+        with self._lock:
+            state = self._apps.get(app_name)
+            return state.history if state is not None else None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            wall = time.perf_counter()
+            cpu = time.thread_time()
+            self.sample()
+            if self.on_pass is not None:
+                self.on_pass()
+            wall = time.perf_counter() - wall + self.interval
+            self.overhead = (time.thread_time() - cpu) / wall
+
+    def _tree(self, root):
+        pids = []
+        pending = [root]
+        while pending:
+            pid = pending.pop()
+            pids.append(pid)
+            pending.extend(child_pids(pid))
+        return pids
+
+    def sample(self):
+        now = time.monotonic()
+        roots = dict(self._get_roots())
+        with self._lock:
+            for app_name in list(self._apps):
+                if roots.get(app_name) != self._apps[app_name].root:
+                    del self._apps[app_name]
+            for app_name, root in roots.items():
+                if app_name not in self._apps:
+                    self._apps[app_name] = _AppState(root, self.history_size)
+            states = list(self._apps.values())
+
+        for state in states:
+            self._sample_tree(state, now)
+
+    def _sample_tree(self, state, now):
+        totals = dict(cpu=0.0, rss=0.0, threads=0.0, fds=0.0, read_rate=0.0, write_rate=0.0)
+        current = {}
+        if state.pids is None or state.passes % TREE_REFRESH_PASSES == 0:
+            state.pids = self._tree(state.root)
+        state.passes += 1
+        for pid in state.pids:
+            try:
+                ticks, rss, threads, fds, read_bytes, write_bytes = self._read(pid)
+            except (OSError, ValueError, IndexError, psutil.Error):
+                continue  # exited mid-pass
+            current[pid] = (ticks, read_bytes, write_bytes)
+            totals["rss"] += rss
+            totals["threads"] += threads
+            totals["fds"] += fds
+            last = state.last.get(pid)
+            if last is None:
+                # A newly found process only sets its baseline; its totals so far
+                # were not spent in this interval.
+                continue
+            last_ticks, last_read, last_write = last
+            totals["cpu"] += ticks - last_ticks
+            totals["read_rate"] += read_bytes - last_read
+            totals["write_rate"] += write_bytes - last_write
+
+        first = state.last_time is None
+        elapsed = now - state.last_time if not first else 0
+        state.last = current
+        state.last_time = now
+        if first or elapsed <= 0:
+            return  # the first pass only establishes a baseline
+        totals["cpu"] = totals["cpu"] * self._tick_scale / elapsed * 100
+        totals["read_rate"] /= elapsed
+        totals["write_rate"] /= elapsed
+        state.history.add(totals)
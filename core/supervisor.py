@@ -0,0 +1,500 @@
+import asyncio
+from dataclasses import asdict
+import errno
+import json
+import os
+import signal
+import socket
+import struct
+import tempfile
+import time
+
+from .async_runner import run_process, supervise
+from .commands import build_command
+from .conda_envs import CondaEnvNotFound, CondaEnvResolver
+from .launch_queue import ADMIT_INTERVAL, LaunchQueue, LaunchRequest
+from .output_buffer import OutputBuffer
+from .output_log import DEFAULT_LOG_DIR, LogReader, LogSpooler
+from .process_table import ProcessRecord, ProcessTable, QUEUED, ADMITTED, STARTING, EXITED
+from .termination import terminate_tree
+from .warm_pool import WarmPool
+
+# Every frame is a kind byte and a payload length, then the payload.
+# MESSAGE payloads are JSON objects; LINES payloads are a header (app name
+# length, sequence number of the first line, line count), the app name and
+# the lines joined with newlines, all UTF-8.
+FRAME = struct.Struct("!BI")
+# struct ucred: pid, uid, gid of the process at the other end of a socket.
+PEERCRED = struct.Struct("3i")
+LINES_HEADER = struct.Struct("!HQI")
+MESSAGE = 1
+LINES = 2
+MAX_FRAME = 256 * 1024 * 1024
+
+# Lines of each app's output sent to a client that attaches; older lines
+# are read from the run log on the client's side when scrolled to.
+REPLAY_LINES = 1000
+# Most lines sent in one frame.
+FRAME_LINES = 10000
+# Seconds of output collected before it is sent to clients.
+SEND_INTERVAL = 0.025
+# A client with this many bytes not yet sent to it gets no new output
+# until it catches up; lines it misses come from the run log.
+CLIENT_HIGH_WATER = 4 * 1024 * 1024
+# Seconds the supervisor waits, with no client attached and nothing
+# queued or running, before it exits.
+IDLE_TIMEOUT = 30.0
+# Seconds a client waits for a supervisor it has started to accept.
+CONNECT_TIMEOUT = 10.0
+
+
+def default_socket_path():
+    directory = os.environ.get("XDG_RUNTIME_DIR")
+    if directory:
+        return os.path.join(directory, f"conda-launcher-{os.getuid()}.sock")
+    # The temp directory is shared, so the socket goes in a directory of the user's own.
+    return os.path.join(tempfile.gettempdir(), f"conda-launcher-{os.getuid()}", "supervisor.sock")
+
+
+def _socket_directory(path):
+    """Create the directory of ``path``, private to this user if it is new, and refuse one another user owns."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    owner = os.stat(directory).st_uid
+    # root owns shared directories such as /tmp; anyone else could swap the socket.
+    if owner not in (os.getuid(), 0):
+        raise PermissionError(errno.EACCES, f"{directory} belongs to another user (uid {owner})")
+
+
+def encode_message(message):
+    payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    return FRAME.pack(MESSAGE, len(payload)) + payload
+
+
+def encode_lines(app_name, start, lines):
+    name = app_name.encode("utf-8")
+    body = "\n".join(lines).encode("utf-8", "replace")
+    header = LINES_HEADER.pack(len(name), start, len(lines))
+    return FRAME.pack(LINES, len(header) + len(name) + len(body)) + header + name + body
+
+
+async def read_frame(reader):
+    """Read one frame and return ``(MESSAGE, message)`` or ``(LINES, (app_name, start, lines))``."""
+    kind, length = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if length > MAX_FRAME:
+        raise ValueError(f"frame of {length} bytes exceeds the limit")
+    payload = await reader.readexactly(length)
+    if kind == MESSAGE:
+        return kind, json.loads(payload)
+    if kind == LINES:
+        name_length, start, count = LINES_HEADER.unpack_from(payload)
+        offset = LINES_HEADER.size + name_length
+        name = payload[LINES_HEADER.size:offset].decode("utf-8")
+        lines = payload[offset:].decode("utf-8", "replace").split("\n") if count else []
+        return kind, (name, start, lines)
+    raise ValueError(f"unknown frame kind {kind}")
+
+
+class _Client:
+    def __init__(self, writer):
+        self.writer = writer
+        self.sent = {}      # app name -> sequence number of the next line not sent
+        self.dirty = set()  # apps with output not sent yet
+        self.behind = set() # apps with output skipped while congested
+
+    def send(self, data):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def notice(self, message, severity="information"):
+        self.send(encode_message({"type": "notice", "message": message, "severity": severity}))
+
+    @property
+    def congested(self):
+        return self.writer.transport.get_write_buffer_size() > CLIENT_HIGH_WATER
+
+
+class Supervisor:
+    """Background process that owns launched apps on behalf of UI clients.
+
+    Apps are launched, queued and read exactly as in the launcher, but
+    their process table and output buffers live here, so they keep running
+    when every UI has quit. Any number of clients can attach to the Unix
+    socket at ``path``; each gets the process table and the last
+    ``REPLAY_LINES`` lines of every output when it attaches, then every
+    state change and new output as it happens. The supervisor exits once
+    nothing is queued or running and no client has been attached for
+    ``IDLE_TIMEOUT`` seconds, and terminates its apps on SIGTERM or SIGINT.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_socket_path()
+        self.conda_envs = CondaEnvResolver()
+        self.warm_pool = WarmPool()
+        self.log_spooler = LogSpooler()
+        self.launch_queue = LaunchQueue()
+        self.process_table = ProcessTable(self._record_changed)
+        self.outputs = {}  # app name -> OutputBuffer of its latest run
+        self.logs = {}     # app name -> log file of its latest run
+        self.clients = []
+        self._reasons = {}
+        self._dirty = set()
+        self._stop = None
+        self._idle_timer = None
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        _socket_directory(self.path)
+        # Binding would replace the socket of a supervisor that is still serving.
+        probe = socket.socket(socket.AF_UNIX)
+        try:
+            probe.connect(self.path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+        else:
+            raise OSError(errno.EADDRINUSE, "a supervisor is already running")
+        finally:
+            probe.close()
+        # Only the owner may connect; the socket is their launcher.
+        umask = os.umask(0o077)
+        try:
+            server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+        finally:
+            os.umask(umask)
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._stop.set)
+        self.log_spooler.on_error = lambda path, error: loop.call_soon_threadsafe(
+            self._notice, f"Stopped writing output log {path}: {error}.", "error"
+        )
+        self.log_spooler.start()
+        tasks = [asyncio.ensure_future(self._send_output()), asyncio.ensure_future(self._recheck_queue())]
+        self._check_idle()
+        try:
+            await self._stop.wait()
+        finally:
+            server.close()
+            for task in tasks:
+                task.cancel()
+            for client in self.clients:
+                client.writer.close()
+            for app_name, pid in self.process_table.running_apps():
+                await asyncio.to_thread(terminate_tree, pid)
+            await self.warm_pool.shutdown()
+            self.log_spooler.stop()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def _broadcast(self, data):
+        for client in self.clients:
+            client.send(data)
+
+    def _notice(self, message, severity="information"):
+        for client in self.clients:
+            client.notice(message, severity)
+
+    def _record_message(self, record):
+        return {"type": "record", "record": asdict(record), "log": self.logs.get(record.app_name)}
+
+    def _record_changed(self, record):
+        if record.state == EXITED:
+            # So that clients have all of the output before they learn of the exit.
+            self._flush_app(record.app_name)
+        self._broadcast(encode_message(self._record_message(record)))
+
+    async def _handle_client(self, reader, writer):
+        client = _Client(writer)
+        client.send(encode_message({
+            "type": "hello",
+            "pid": os.getpid(),
+            "records": [self._record_message(record) for record in self.process_table.records()],
+            "reasons": self._reasons,
+        }))
+        client.dirty.update(self.outputs)
+        self.clients.append(client)
+        self._check_idle()
+        try:
+            while True:
+                kind, message = await read_frame(reader)
+                if kind == MESSAGE:
+                    self._handle_message(client, message)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.clients.remove(client)
+            writer.close()
+            self._check_idle()
+
+    def _handle_message(self, client, message):
+        kind = message.get("type")
+        if kind == "launch":
+            self.launch(message["app"], message.get("settings") or {}, client.notice)
+        elif kind == "cancel":
+            if self.launch_queue.cancel(message["name"]):
+                self.process_table.exited(message["name"], None)
+                self._notice(f"Cancelled launch of {message['name']}.")
+        elif kind == "prewarm":
+            asyncio.ensure_future(self._prewarm(message["app"], message.get("settings") or {}))
+
+    def _configure(self, settings):
+        log_dir = settings.get("log_dir")
+        # Relative to a client's directory, which is unknown here.
+        if log_dir is not None and os.path.isabs(log_dir):
+            self.log_spooler.log_dir = log_dir
+        self.log_spooler.keep_runs = settings.get("log_keep_runs", self.log_spooler.keep_runs)
+        self.log_spooler.search_index = settings.get("output_search_index", False)
+        self.warm_pool.max_workers = settings.get("prewarm_max_workers", self.warm_pool.max_workers)
+        self.launch_queue.configure(settings)
+
+    def launch(self, app, settings, reply=None):
+        """Queue ``app`` with the launcher ``settings`` of the client that asked for it.
+
+        Problems with the request go to ``reply(message, severity)`` only;
+        what happens to the launch is announced to every client.
+        """
+        reply = reply or self._notice
+        name = app["name"]
+        if name in self.launch_queue:
+            reply(f"{name} is already queued or running.")
+            return
+        try:
+            self._configure(settings)
+            request = LaunchRequest.from_config(app, payload=(app, settings))
+        except ValueError as e:
+            reply(f"Cannot launch {name}: {e}", severity="error")
+            return
+        self.launch_queue.submit(request)
+        self.process_table.queued(name)
+        self._admit()
+        if request.admitted_at is None:
+            self._notice(f"Queued {name}: {request.reason}.")
+
+    def _admit(self):
+        for request in self.launch_queue.pump():
+            self.process_table.admitted(request.name)
+            asyncio.ensure_future(self._run_app(*request.payload))
+        reasons = {request.name: request.reason for request in self.launch_queue.queued}
+        if reasons != self._reasons:
+            self._reasons = reasons
+            self._broadcast(encode_message({"type": "reasons", "reasons": reasons}))
+
+    async def _recheck_queue(self):
+        while True:
+            await asyncio.sleep(ADMIT_INTERVAL)
+            self._admit()
+
+    async def _prewarm(self, app, settings):
+        self._configure(settings)
+        try:
+            await self.warm_pool.prewarm_app(app, self.conda_envs)
+        except CondaEnvNotFound as e:
+            self._notice(f"Cannot prewarm {app['name']}: {e}", severity="warning")
+
+    def _new_output(self, app):
+        name = app["name"]
+        if name in self.outputs:
+            # Clients get the rest of the previous run before the new one starts.
+            self._flush_app(name)
+        try:
+            log = self.log_spooler.open_run(name)
+        except OSError as e:
+            self._notice(f"Cannot write output log for {name}: {e}", severity="warning")
+            log = None
+        self.logs[name] = log.path if log is not None else None
+        output = self.outputs[name] = OutputBuffer.from_config(app, log=log)
+        for client in self.clients:
+            client.sent[name] = 0
+        return output
+
+    async def _run_app(self, app, settings):
+        name = app["name"]
+        command, shell, env = build_command(
+            app, settings, self.conda_envs,
+            lambda e: self._notice(f"{e}; falling back to conda activate.", severity="warning"),
+        )
+        output = self._new_output(app)
+        self.process_table.starting(name)
+        self._notice(f"Launched {name} in {app['conda_env']} environment.")
+
+        def on_lines(count):
+            self._dirty.add(name)
+
+        returncode = None
+        try:
+            process = await self.warm_pool.acquire_app(app, self.conda_envs)
+            if process is not None:
+                returncode = await supervise(process, output, on_lines, lambda pid: self.process_table.running(name, pid))
+            else:
+                returncode = await run_process(command, output, on_lines, lambda pid: self.process_table.running(name, pid), shell=shell, env=env)
+        except Exception as e:
+            self._notice(f"Error launching application: {e}", severity="error")
+        finally:
+            output.finish()
+            self.process_table.exited(name, returncode)
+            self.launch_queue.finished(name)
+            self._admit()
+            self._check_idle()
+
+    async def _send_output(self):
+        while True:
+            await asyncio.sleep(SEND_INTERVAL)
+            dirty, self._dirty = self._dirty, set()
+            for client in self.clients:
+                client.dirty |= dirty
+                if client.congested:
+                    client.behind |= client.dirty
+                    continue
+                for name in client.dirty:
+                    self._send_lines(client, name)
+                client.dirty.clear()
+
+    def _flush_app(self, name):
+        """Send ``name``'s unsent output to every client right away."""
+        for client in self.clients:
+            self._send_lines(client, name)
+            client.dirty.discard(name)
+
+    def _send_lines(self, client, name):
+        output = self.outputs.get(name)
+        if output is None:
+            return
+        seq = output.seq
+        # The last line sent is sent again, since a progress bar may have
+        # rewritten it.
+        start = max(client.sent.get(name, 0) - 1, output.first_seq)
+        if name not in client.sent or name in client.behind:
+            # Attaching, or skipped while congested: only the tail.
+            start = max(start, seq - REPLAY_LINES)
+            client.behind.discard(name)
+        for begin in range(start, seq, FRAME_LINES):
+            client.send(encode_lines(name, begin, output.lines_range(begin, min(begin + FRAME_LINES, seq))))
+        client.sent[name] = seq
+
+    def _check_idle(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+        if not self.clients and not self.launch_queue.queued and not self.launch_queue.active:
+            self._idle_timer = asyncio.get_running_loop().call_later(IDLE_TIMEOUT, self._stop.set)
+
+
+class SupervisorClient:
+    """A UI's connection to a ``Supervisor``.
+
+    Records reported by the supervisor are stored in ``process_table`` and
+    output is merged into mirror buffers from ``make_output(app_name,
+    log_path)``, so the UI reads both as it does for apps it runs itself.
+    ``on_lines(app_name, count)`` follows every merge and
+    ``on_notice(message, severity)`` every notice. ``reasons`` holds why
+    each queued launch is waiting. Relative script paths in the entries
+    sent are resolved against ``base_dir`` (the catalog's directory).
+    """
+
+    def __init__(self, process_table, make_output, on_lines, on_notice, path=None, base_dir=None):
+        self.path = path or default_socket_path()
+        self.base_dir = os.path.abspath(base_dir or os.getcwd())
+        self.process_table = process_table
+        self.make_output = make_output
+        self.on_lines = on_lines
+        self.on_notice = on_notice
+        self.outputs = {}
+        self.reasons = {}
+        self.pid = None
+        self._reader = None
+        self._writer = None
+
+    async def connect(self, spawn=None):
+        """Attach to the supervisor, calling ``spawn()`` to start one if none is running."""
+        try:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            if spawn is None:
+                raise
+            if os.path.exists(self.path):
+                os.unlink(self.path)  # left behind by a supervisor that died
+            spawn()
+            deadline = time.monotonic() + CONNECT_TIMEOUT
+            while True:
+                await asyncio.sleep(0.05)
+                try:
+                    self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    if time.monotonic() > deadline:
+                        raise
+        self._check_peer()
+        kind, hello = await read_frame(self._reader)
+        self.pid = hello["pid"]
+        self.reasons = hello["reasons"]
+        for message in hello["records"]:
+            self._apply_record(message, attaching=True)
+
+    async def run(self):
+        """Process frames until the connection is closed."""
+        try:
+            while True:
+                kind, payload = await read_frame(self._reader)
+                if kind == LINES:
+                    name, start, lines = payload
+                    output = self.outputs.get(name)
+                    if output is not None:
+                        count = output.merge(start, lines)
+                        if count:
+                            self.on_lines(name, count)
+                elif payload["type"] == "record":
+                    self._apply_record(payload)
+                elif payload["type"] == "reasons":
+                    self.reasons = payload["reasons"]
+                elif payload["type"] == "notice":
+                    self.on_notice(payload["message"], severity=payload["severity"])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.close()
+
+    def _apply_record(self, message, attaching=False):
+        record = ProcessRecord(**message["record"])
+        # A mirror per run: from its start, or from attaching to it.
+        if record.state == STARTING or (attaching and record.state not in (QUEUED, ADMITTED)):
+            log = message["log"]
+            self.outputs[record.app_name] = self.make_output(record.app_name, LogReader(log) if log else None)
+        self.process_table.apply(record)
+
+    def _check_peer(self):
+        """Refuse a supervisor run by another user, such as one serving a socket planted in a shared directory."""
+        sock = self._writer.get_extra_info("socket")
+        if hasattr(socket, "SO_PEERCRED"):
+            uid = PEERCRED.unpack(sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEERCRED.size))[1]
+        else:
+            uid = os.stat(self.path).st_uid  # no peer credentials here; trust the socket's owner
+        if uid != os.getuid():
+            self.close()
+            raise PermissionError(errno.EACCES, f"{self.path} is served by another user (uid {uid})")
+
+    def send(self, message):
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(encode_message(message))
+
+    def _portable(self, app, settings):
+        """``app`` and ``settings`` with their paths made absolute; the supervisor may run in another directory."""
+        app = dict(app, path=os.path.join(self.base_dir, app["path"]))
+        settings = dict(settings, log_dir=os.path.abspath(settings.get("log_dir", DEFAULT_LOG_DIR)))
+        return app, settings
+
+    def launch(self, app, settings):
+        app, settings = self._portable(app, settings)
+        self.send({"type": "launch", "app": app, "settings": settings})
+
+    def cancel(self, app_name):
+        self.send({"type": "cancel", "name": app_name})
+
+    def prewarm(self, app, settings):
+        app, settings = self._portable(app, settings)
+        self.send({"type": "prewarm", "app": app, "settings": settings})
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
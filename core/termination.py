@@ -0,0 +1,107 @@
+import os
+import signal
+import subprocess
+import time
+
+from .lazy import LazyModule
+
+psutil = LazyModule("psutil")
+
+DEFAULT_GRACE_PERIOD = 5.0
+POLL_INTERVAL = 0.05
+
+# Launched apps get a session (process group) of their own, so the whole
+# tree can be signalled at once and the launcher's own group is untouched.
+if os.name == 'nt':
+    NEW_SESSION_KWARGS = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    NEW_SESSION_KWARGS = {"start_new_session": True}
+
+
+def _alive(process):
+    try:
+        return process.status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+
+def _signal_group(pgid, sig):
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _outside_group(processes, pgid):
+    if pgid is None:
+        return processes
+    outside = []
+    for process in processes:
+        try:
+            if os.getpgid(process.pid) != pgid:
+                outside.append(process)
+        except ProcessLookupError:
+            pass
+    return outside
+
+
+def _terminate_all(processes, hard=False):
+    for process in processes:
+        try:
+            if hard:
+                process.kill()
+            else:
+                process.terminate()
+        except psutil.NoSuchProcess:
+            pass
+
+
+def terminate_tree(pid, grace_period=DEFAULT_GRACE_PERIOD, on_progress=None):
+    """Terminate ``pid`` and every descendant, escalating to a hard kill.
+
+    The process group is signalled in one call, and descendants that moved
+    to another group are signalled individually. Blocks for at most
+    ``grace_period`` seconds plus the time for the hard kill to land, so it
+    belongs on a worker thread. Exits are detected by polling rather than
+    ``wait()``, which would reap the launch backend's child and lose its
+    exit code. Returns the number of processes still alive at the end.
+    """
+    report = on_progress or (lambda message: None)
+    root = psutil.Process(pid)
+    try:
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        processes = [root]
+
+    pgid = None
+    if os.name != 'nt':
+        try:
+            pgid = os.getpgid(pid)
+        except ProcessLookupError:
+            pass
+        if pgid == os.getpgrp():
+            pgid = None  # never signal the launcher's own group
+
+    report(f"Sending SIGTERM to {len(processes)} process(es)")
+    strays = _outside_group(processes, pgid)
+    if pgid is not None:
+        _signal_group(pgid, signal.SIGTERM)
+    _terminate_all(strays)
+
+    deadline = time.monotonic() + grace_period
+    alive = [process for process in processes if _alive(process)]
+    while alive and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        alive = [process for process in alive if _alive(process)]
+    if not alive:
+        return 0
+
+    report(f"{len(alive)} process(es) ignored SIGTERM after {grace_period:g}s, killing")
+    if pgid is not None:
+        _signal_group(pgid, signal.SIGKILL)
+    _terminate_all(_outside_group(alive, pgid), hard=True)
+    deadline = time.monotonic() + 1.0
+    while alive and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        alive = [process for process in alive if _alive(process)]
+    return len(alive)
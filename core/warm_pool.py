@@ -0,0 +1,282 @@
+from collections import deque
+from dataclasses import dataclass
+import asyncio
+import json
+import logging
+import time
+
+from .async_runner import _ensure_child_watcher
+from .conda_envs import CondaEnvNotFound
+from .termination import NEW_SESSION_KWARGS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+READY_MARKER = b"\0conda-launcher-ready\n"
+# Chunks of an unacquired worker's stderr kept to explain a failed start.
+STDERR_TAIL = 20
+
+# Runs inside the target env: import the requested modules, report ready,
+# then wait for a script to run in place of a cold `python script.py`.
+BOOTSTRAP = r"""
+import importlib, json, os, runpy, sys
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+sys.stdout.buffer.write(b"\0conda-launcher-ready\n")
+sys.stdout.flush()
+line = sys.stdin.readline()
+if not line:
+    sys.exit(0)
+request = json.loads(line)
+sys.stdin.close()
+sys.stdin = open(os.devnull)
+path = request["path"]
+sys.argv = [path]
+sys.path[0] = os.path.dirname(os.path.abspath(path))
+runpy.run_path(path, run_name="__main__")
+"""
+
+
+@dataclass(frozen=True)
+class PrewarmConfig:
+    size: int = 1
+    modules: tuple = ()
+    idle_timeout: float = 600.0
+
+    @classmethod
+    def from_config(cls, app):
+        """Read the ``prewarm`` entry of an application, or return ``None`` if it is off.
+
+        ``prewarm`` may be ``true``, a pool size, or a mapping with ``size``,
+        ``modules`` and ``idle_timeout``.
+        """
+        prewarm = app.get("prewarm")
+        if not prewarm:
+            return None
+        if prewarm is True:
+            return cls()
+        if isinstance(prewarm, int):
+            return cls(size=prewarm)
+        return cls(
+            size=int(prewarm.get("size", 1)),
+            modules=tuple(prewarm.get("modules") or ()),
+            idle_timeout=float(prewarm.get("idle_timeout", 600.0)),
+        )
+
+
+class _EnvPool:
+    def __init__(self, conda_env, config):
+        self.conda_env = conda_env
+        self.config = config
+        self.idle = []
+        self.starting = 0
+        self.last_used = time.monotonic()
+        self.error = None
+        # Idle worker -> the task reading its stderr until it is acquired.
+        self.drains = {}
+
+
+class WarmPool:
+    """Keeps idle interpreters per conda env with their modules already imported.
+
+    Pools are keyed by interpreter and module list, so apps sharing an env and
+    imports share workers. A pool refills after each launch, is emptied once
+    it has gone ``idle_timeout`` seconds without one, and stops refilling if
+    a worker fails to start. ``max_workers`` caps idle and starting workers
+    across all pools.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._pools = {}
+        self._reaper = None
+        # Background ensure/fill tasks; the loop only keeps weak references.
+        self._tasks = set()
+
+    def _key(self, conda_env, config):
+        return (conda_env.python, config.modules)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Filling a warm pool failed", exc_info=task.exception())
+
+    def _total_workers(self):
+        return sum(len(pool.idle) + pool.starting for pool in self._pools.values())
+
+    def status(self):
+        return [
+            {
+                "env": pool.conda_env.name,
+                "modules": pool.config.modules,
+                "size": pool.config.size,
+                "idle": len(pool.idle),
+                "starting": pool.starting,
+                "error": pool.error,
+            }
+            for pool in self._pools.values()
+        ]
+
+    async def ensure(self, conda_env, config):
+        """Create the pool for ``conda_env`` if needed and fill it to its size.
+
+        This also clears a previous start failure, so the pool is retried.
+        """
+        key = self._key(conda_env, config)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _EnvPool(conda_env, config)
+        pool.error = None
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap())
+        await self._fill(pool)
+
+    async def _fill(self, pool):
+        needed = pool.config.size - len(pool.idle) - pool.starting
+        needed = min(needed, self.max_workers - self._total_workers())
+        if needed <= 0 or pool.error:
+            return
+        await asyncio.gather(*(self._start_worker(pool) for _ in range(needed)))
+
+    async def _start_worker(self, pool):
+        pool.starting += 1
+        process = None
+        try:
+            _ensure_child_watcher()
+            process = await asyncio.create_subprocess_exec(
+                pool.conda_env.python, "-c", BOOTSTRAP, *pool.config.modules,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=pool.conda_env.environ(),
+                **NEW_SESSION_KWARGS,
+            )
+            # Nobody reads stderr until the worker is acquired, and a full
+            # pipe would block its imports; keep only the end of it.
+            tail = deque(maxlen=STDERR_TAIL)
+            drain = asyncio.create_task(_drain(process.stderr, tail))
+            # Anything printed while importing is dropped along with the marker.
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    await drain
+                    await process.wait()
+                    stderr = b"".join(tail).decode(errors="replace").strip().splitlines()
+                    pool.error = stderr[-1] if stderr else f"exit code {process.returncode}"
+                    return
+                if line == READY_MARKER:
+                    break
+        except OSError as e:
+            pool.error = str(e)
+            return
+        except asyncio.CancelledError:
+            # shutdown() cancels fills in progress; don't leave their workers behind.
+            if process is not None and process.returncode is None:
+                process.kill()
+            raise
+        finally:
+            pool.starting -= 1
+        pool.drains[process] = drain
+        pool.idle.append(process)
+
+    async def prewarm_app(self, app, conda_envs):
+        """Start the workers of catalog entry ``app``; raises ``CondaEnvNotFound`` if its env is unknown."""
+        await self.ensure(conda_envs.resolve(app["conda_env"]), PrewarmConfig.from_config(app))
+
+    async def acquire_app(self, app, conda_envs):
+        """``acquire`` for catalog entry ``app``, or ``None`` if it is not prewarmed or its env is unknown."""
+        config = PrewarmConfig.from_config(app)
+        if not config:
+            return None
+        try:
+            conda_env = conda_envs.resolve(app["conda_env"])
+        except CondaEnvNotFound:
+            return None
+        return await self.acquire(conda_env, config, app["path"])
+
+    async def acquire(self, conda_env, config, path):
+        """Hand ``path`` to an idle worker and return its process, or ``None`` if none is ready."""
+        pool = self._pools.get(self._key(conda_env, config))
+        if pool is None:
+            self._spawn(self.ensure(conda_env, config))
+            return None
+        pool.last_used = time.monotonic()
+        process = None
+        while pool.idle and process is None:
+            candidate = pool.idle.pop(0)
+            await _stop_draining(pool.drains.pop(candidate))
+            if candidate.returncode is None:
+                process = candidate
+        self._spawn(self._fill(pool))
+        if process is None:
+            return None
+        process.stdin.write(json.dumps({"path": path}).encode() + b"\n")
+        await process.stdin.drain()
+        process.stdin.close()
+        return process
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(5)
+            try:
+                await self._reap_idle()
+            except Exception:
+                # Keep reaping on the next pass rather than leaving idle workers running for good.
+                logger.exception("Reaping idle warm workers failed")
+
+    async def _reap_idle(self):
+        now = time.monotonic()
+        # ensure() can add pools while a worker is being stopped.
+        for pool in list(self._pools.values()):
+            if pool.idle and now - pool.last_used > pool.config.idle_timeout:
+                idle, pool.idle = pool.idle, []
+                for process in idle:
+                    await self._stop_worker(pool, process)
+            else:
+                # Drop workers that died while waiting.
+                for process in [process for process in pool.idle if process.returncode is not None]:
+                    pool.idle.remove(process)
+                    await _stop_draining(pool.drains.pop(process))
+
+    async def _stop_worker(self, pool, process):
+        await _stop_draining(pool.drains.pop(process))
+        if process.returncode is None:
+            # Closing stdin makes the bootstrap exit without running anything.
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+    async def shutdown(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for task in list(self._tasks):
+            task.cancel()
+        for pool in list(self._pools.values()):
+            idle, pool.idle = pool.idle, []
+            for process in idle:
+                await self._stop_worker(pool, process)
+
+
+async def _drain(stream, tail):
+    # Chunks rather than lines: a long line without a newline must not stop the draining.
+    while chunk := await stream.read(4096):
+        tail.append(chunk)
+
+
+async def _stop_draining(drain):
+    """Cancel ``drain`` and wait for it, so the acquirer reads stderr from where it stopped."""
+    drain.cancel()
+    try:
+        await drain
+    except asyncio.CancelledError:
+        pass
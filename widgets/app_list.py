@@ -0,0 +1,135 @@
+from rich.segment import Segment
+from rich.style import Style
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+
+class AppList(ScrollView, can_focus=True):
+    """List of application names that only renders the rows on screen.
+
+    Unlike a ``ListView`` there is no widget per entry, so showing or
+    filtering a catalog of thousands of applications costs one list
+    assignment. Up/down move the cursor; enter or a click selects.
+    """
+
+    COMPONENT_CLASSES = {"app-list--cursor", "app-list--hover"}
+
+    BINDINGS = [
+        Binding("enter", "select_cursor", "Select", show=False),
+        Binding("up", "cursor_up", "Cursor up", show=False),
+        Binding("down", "cursor_down", "Cursor down", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+    ]
+
+    class Selected(Message):
+        def __init__(self, name: str) -> None:
+            self.name = name
+            super().__init__()
+
+    def __init__(self, placeholder="No applications.", **kwargs):
+        super().__init__(**kwargs)
+        self.placeholder = placeholder
+        self.rows = []
+        self.cursor = 0
+        self._hover = None
+
+    @property
+    def highlighted(self):
+        """Name of the row under the cursor, or ``None`` if the list is empty."""
+        return self.rows[self.cursor] if self.rows else None
+
+    def set_rows(self, names):
+        """Show ``names``, keeping the cursor on the same name if it is still listed."""
+        current = self.highlighted
+        self.rows = names
+        self.cursor = 0
+        if current is not None:
+            try:
+                self.cursor = names.index(current)
+            except ValueError:
+                self.scroll_to(y=0, animate=False, immediate=True)
+        self._hover = None
+        self.virtual_size = Size(0, len(names))
+        self._scroll_to_cursor()
+        self.refresh()
+
+    def move_cursor(self, row):
+        if not self.rows:
+            return
+        self.cursor = max(0, min(row, len(self.rows) - 1))
+        self._scroll_to_cursor()
+        self.refresh()
+
+    def _scroll_to_cursor(self):
+        height = self.scrollable_content_region.height
+        if self.cursor < self.scroll_offset.y:
+            self.scroll_to(y=self.cursor, animate=False, immediate=True)
+        elif height and self.cursor >= self.scroll_offset.y + height:
+            self.scroll_to(y=self.cursor - height + 1, animate=False, immediate=True)
+
+    def action_select_cursor(self):
+        if self.rows:
+            self.post_message(self.Selected(self.rows[self.cursor]))
+
+    def action_cursor_up(self):
+        self.move_cursor(self.cursor - 1)
+
+    def action_cursor_down(self):
+        self.move_cursor(self.cursor + 1)
+
+    def action_page_up(self):
+        self.move_cursor(self.cursor - max(1, self.scrollable_content_region.height))
+
+    def action_page_down(self):
+        self.move_cursor(self.cursor + max(1, self.scrollable_content_region.height))
+
+    def action_first(self):
+        self.move_cursor(0)
+
+    def action_last(self):
+        self.move_cursor(len(self.rows) - 1)
+
+    def _row_at(self, event):
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return None
+        row = self.scroll_offset.y + offset.y
+        return row if row < len(self.rows) else None
+
+    def on_click(self, event):
+        row = self._row_at(event)
+        if row is not None:
+            self.move_cursor(row)
+            self.action_select_cursor()
+
+    def on_mouse_move(self, event):
+        row = self._row_at(event)
+        if row != self._hover:
+            self._hover = row
+            self.refresh()
+
+    def on_leave(self, event):
+        if self._hover is not None:
+            self._hover = None
+            self.refresh()
+
+    def render_line(self, y):
+        width = self.size.width
+        style = self.rich_style
+        row = self.scroll_offset.y + y
+        if not self.rows:
+            text = f" {self.placeholder}" if y == 0 else ""
+            return Strip([Segment(text, style + Style(italic=True))]).crop_extend(0, width, style)
+        if row >= len(self.rows):
+            return Strip.blank(width, style)
+        if row == self.cursor:
+            style += self.get_component_rich_style("app-list--cursor")
+        elif row == self._hover:
+            style += self.get_component_rich_style("app-list--hover")
+        return Strip([Segment(f" {self.rows[row]}", style)]).crop_extend(0, width, style)
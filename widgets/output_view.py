@@ -0,0 +1,163 @@
+from bisect import bisect_left
+
+from rich.cells import cell_len
+from rich.control import strip_control_codes
+from rich.segment import Segment
+from rich.style import Style
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+
+# Only this many of the newest lines are measured per update to size the
+# horizontal scroll range, so opening a large output stays cheap.
+WIDTH_SAMPLE = 5000
+
+
+class OutputView(ScrollView, can_focus=True):
+    """Scrollable view of an ``OutputBuffer`` that only fetches the lines on screen.
+
+    Recent lines come from memory and older ones from the run log on disk,
+    so scrolling through a huge log costs one window of lines per redraw.
+    The view follows new output while it is scrolled to the bottom.
+
+    Lines matched by an ``OutputSearch`` are highlighted as the search adds
+    them, and ``next_match`` moves between them.
+    """
+
+    COMPONENT_CLASSES = {"output-view--match", "output-view--current-match"}
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.output = None
+        self.placeholder = ""
+        self._base = 0      # sequence number shown on the first row
+        self._width = 0
+        self._read_offset = 0
+        self._window_start = 0
+        self._window = []
+        self._window_clears = 0  # output.clears when the window was read
+        self._clears = 0         # output.clears when the width was measured
+        self.search = None
+        self.matches = []       # matching line numbers, ascending
+        self._match_set = set()
+        self.current_match = None  # index into matches
+
+    def show(self, output, placeholder="No output available."):
+        """Display ``output`` (or only ``placeholder`` if it is ``None``), scrolled to the end."""
+        self.output = output
+        self.placeholder = placeholder
+        self._width = 0
+        self._read_offset = 0
+        self._clears = output.clears if output is not None else 0
+        self.update(follow=True)
+        # The view may have just been unhidden and not laid out yet.
+        self.call_after_refresh(self.scroll_end, animate=False, x_axis=False)
+
+    def update(self, follow=None):
+        """Pick up lines appended to the output since the last call."""
+        if follow is None:
+            follow = self.is_vertical_scroll_end and not self.is_vertical_scrollbar_grabbed
+        count = 0
+        if self.output is not None:
+            if self.output.clears != self._clears:
+                self._clears = self.output.clears
+                self._width = 0
+            self._base = self.output.first_readable
+            # The last line seen may have been rewritten since, so measure it again.
+            new_lines, self._read_offset = self.output.lines_since(max(self._read_offset - 1, 0), WIDTH_SAMPLE)
+            if new_lines:
+                self._width = max(self._width, max(cell_len(line) for line in new_lines))
+            count = self._read_offset - self._base
+        self._window = []
+        self.virtual_size = Size(self._width, count)
+        if follow:
+            self.scroll_end(animate=False, immediate=True, x_axis=False)
+        self.refresh()
+
+    def set_search(self, search):
+        """Highlight the matches of ``search`` (or nothing if ``None``) as they are added."""
+        self.search = search
+        self.matches = []
+        self._match_set = set()
+        self.current_match = None
+        self.refresh()
+
+    def add_matches(self, seqs):
+        """Add lines found by the current search; the view moves to the first one found."""
+        new = [seq for seq in seqs if seq not in self._match_set]
+        if not new:
+            return
+        self._match_set.update(new)
+        self.matches.extend(new)
+        if self.current_match is None:
+            self._goto_match(0)
+        self.refresh()
+
+    def next_match(self, step=1):
+        """Move to the next match, or the previous one with ``step=-1``, wrapping around."""
+        if not self.matches:
+            return
+        if self.current_match is None:
+            # Start from the top of the screen.
+            index = bisect_left(self.matches, self._base + self.scroll_offset.y)
+            self._goto_match(index if step > 0 else index - 1)
+        else:
+            self._goto_match(self.current_match + step)
+
+    def _goto_match(self, index):
+        self.current_match = index % len(self.matches)
+        row = self.matches[self.current_match] - self._base
+        self.scroll_to(y=max(row - self.size.height // 2, 0), animate=False, immediate=True)
+        self.refresh()
+
+    def _line(self, index):
+        if self.output.clears != self._window_clears:
+            # Cleared since the window was read: it may hold lines that are gone.
+            self._window = []
+        if not self._window_start <= index < self._window_start + len(self._window):
+            # Fetch the whole visible window in one read.
+            self._window_start = index
+            self._window_clears = self.output.clears
+            start = self._base + index
+            self._window = self.output.lines_range(start, start + self.size.height)
+        return self._window[index - self._window_start]
+
+    def render_line(self, y):
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        style = self.rich_style
+        index = scroll_y + y
+        if not self.virtual_size.height:
+            text = self.placeholder if y == 0 else ""
+            return Strip([Segment(text, style + Style(italic=True))]).crop_extend(0, width, style)
+        if index >= self.virtual_size.height:
+            return Strip.blank(width, style)
+        seq = self._base + index
+        if self._unavailable(seq):
+            return Strip([Segment("log unavailable", style + Style(italic=True, dim=True))]).crop_extend(scroll_x, scroll_x + width, style)
+        text = strip_control_codes(self._line(index)).expandtabs()
+        if seq in self._match_set:
+            current = self.current_match is not None and self.matches[self.current_match] == seq
+            segments = self._highlight(text, style, "output-view--current-match" if current else "output-view--match")
+        else:
+            segments = [Segment(text, style)]
+        return Strip(segments).crop_extend(scroll_x, scroll_x + width, style)
+
+    def _unavailable(self, seq):
+        """Whether line ``seq`` left memory but never reached the run log, which failed to write."""
+        log = self.output.log
+        return log is not None and log.error is not None and log.line_count <= seq < self.output.first_seq
+
+    def _highlight(self, text, style, component):
+        match_style = style + self.get_component_rich_style(component)
+        segments = []
+        end = 0
+        for match in self.search.pattern.finditer(text):
+            if match.end() > match.start():
+                segments.append(Segment(text[end:match.start()], style))
+                segments.append(Segment(match.group(), match_style))
+                end = match.end()
+        if not segments:  # only empty matches, such as /^$/
+            return [Segment(text, match_style)]
+        segments.append(Segment(text[end:], style))
+        return segments
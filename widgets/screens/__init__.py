@@ -1,2 +1,16 @@
-from .processes_modal import ProcessesModal
-from .manage_applications_modal import ManageApplicationsModal
+import importlib
+
+# Screens are imported when first used, not when the app starts.
+_MODULES = {
+    "ProcessesModal": "processes_modal",
+    "ManageApplicationsModal": "manage_applications_modal",
+    "StatsModal": "stats_modal",
+}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{_MODULES[name]}", __name__), name)
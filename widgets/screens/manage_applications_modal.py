@@ -26,11 +26,11 @@ class ManageApplicationsModal(Screen):
         yaml_editor.theme = "conda"
         yaml_editor.show_line_numbers = True
         
-        with open("applications.yaml", "r") as file:
+        with open(self.app.catalog.path, "r") as file:
             yaml_content = file.read()
         
         yaml_editor.load_text(yaml_content)
-        yaml_editor.border_title = "applications.yaml"
+        yaml_editor.border_title = self.app.catalog.path
 
     def on_button_pressed(self, event: Button.Pressed):
         if event.button.id == "save_button":
@@ -40,9 +40,9 @@ class ManageApplicationsModal(Screen):
     def save_yaml(self):
         yaml_editor = self.query_one("#yaml_editor", TextArea)
         updated_content = yaml_editor.text
-        with open("applications.yaml", "r") as file:
+        with open(self.app.catalog.path, "r") as file:
             original_content = file.read()
         if updated_content != original_content:
-            with open("applications.yaml", "w") as file:
+            with open(self.app.catalog.path, "w") as file:
                 file.write(updated_content)
             self.post_message(self.ApplicationsUpdated())
@@ -1,16 +1,44 @@
 from textual.screen import Screen
-from textual.containers import Container, Horizontal, Vertical
-from textual.widgets import Static, ListView, ListItem, Button, Header, Footer, RichLog
+from textual.containers import Horizontal, Vertical
+from textual.widgets import Static, ListView, ListItem, Button, Header, Footer, Input
 from textual.binding import Binding
 from textual.message import Message
-from rich.text import Text
+from textual.css.query import NoMatches
+from textual.worker import get_current_worker
 import psutil
-import os
+import re
+import time
+
+from core import DEFAULT_GRACE_PERIOD, QUEUED, OutputSearch, terminate_tree
+from widgets.output_view import OutputView
+
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values, width=12):
+    values = values[-width:]
+    if not values:
+        return ""
+    top = max(values) or 1.0
+    return "".join(SPARK_BLOCKS[min(int(value / top * (len(SPARK_BLOCKS) - 1)), len(SPARK_BLOCKS) - 1)] for value in values)
+
+
+def format_bytes(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024:
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}TB"
 
 class ProcessesModal(Screen):
     BINDINGS = [
         Binding("escape", "app.pop_screen", "Close"),
-        Binding("ctrl+r", "refresh", "Refresh")
+        Binding("ctrl+r", "refresh", "Refresh"),
+        # Priority, or the search Input's own ctrl+k (delete to end of line) takes it while focused.
+        Binding("ctrl+k", "kill_all", "Kill All", priority=True),
+        Binding("ctrl+f", "focus_search", "Search Output"),
+        Binding("f3", "next_match", "Next Match", show=False),
+        Binding("shift+f3", "previous_match", "Previous Match", show=False),
     ]
 
     def compose(self):
@@ -19,11 +47,14 @@ class ProcessesModal(Screen):
             Vertical(
                 Static("Running Applications", classes="section-title"),
                 ListView(id="running_apps_list"),
+                Static("", id="warm_pool_status", classes="hidden"),
                 id="processes_modal"
             ),
             Vertical(
                 Static("", id="output_title"),
-                RichLog(id="process_output", wrap=True, markup=True, auto_scroll=False),
+                Input(placeholder="Search output (/.../ for a regular expression)", id="output_search"),
+                Static("", id="search_status"),
+                OutputView(id="process_output"),
                 id="output_sidebar",
                 classes="hidden"
             ),
@@ -32,25 +63,40 @@ class ProcessesModal(Screen):
         yield Footer()
 
     def on_mount(self):
+        self.output_search = None
+        self.search_running = False
         self.update_running_apps()
-        self.output_timer = self.set_interval(0.1, self.update_process_output)
-        self.scroll_timer = self.set_interval(0.1, self.check_scroll_position)
-        self.user_scrolled = False
-        self.last_scroll_position = 0
+        self.warm_pool_timer = self.set_interval(1, self.update_warm_pool_status)
+        self.metrics_timer = self.set_interval(self.app.resource_sampler.interval, self.update_metrics)
 
     def on_unmount(self):
-        self.output_timer.stop()
-        self.scroll_timer.stop()
+        self.warm_pool_timer.stop()
+        self.metrics_timer.stop()
 
     def update_running_apps(self):
         running_apps = self.app.get_running_apps()
         running_apps_list = self.query_one("#running_apps_list", ListView)
         running_apps_list.clear()
+        # Launches waiting in the queue come first, in queue order.
+        self.pending_names = [record.app_name for record in self.app.process_table.pending()]
+        for index, app_name in enumerate(self.pending_names):
+            buttons = []
+            if self.app.process_table.get(app_name).state == QUEUED:
+                buttons.append(Button("Cancel", id=f"cancel_{index}", classes="action-button"))
+            running_apps_list.append(
+                ListItem(
+                    Horizontal(
+                        Static(self.pending_info(app_name), id=f"pending_{index}", classes="app-info"),
+                        *buttons,
+                        classes="list-item-content"
+                    )
+                )
+            )
         for app_name, pid in running_apps:
             running_apps_list.append(
                 ListItem(
                     Horizontal(
-                        Static(f"{app_name} (PID: {pid})", classes="app-info"),
+                        Static(self.app_info(app_name, pid), id=f"info_{pid}", classes="app-info"),
                         Button("Kill", id=f"kill_{pid}", classes="action-button"),
                         Button("View", id=f"view_{pid}", classes="action-button"),
                         classes="list-item-content"
@@ -62,6 +108,59 @@ class ProcessesModal(Screen):
         if hasattr(self, 'current_pid') and not any(pid == self.current_pid for _, pid in running_apps):
             self.close_output_sidebar()
 
+        self.update_warm_pool_status()
+
+    def app_info(self, app_name, pid):
+        info = f"{app_name} (PID: {pid})"
+        history = self.app.resource_sampler.history(app_name)
+        if history is None or not history.count:
+            return info + "\nCollecting metrics..."
+        cpu = history.series("cpu")
+        rss = history.series("rss")
+        info += f"\nCPU {cpu[-1]:5.1f}% {sparkline(cpu)}  RSS {format_bytes(rss[-1])} {sparkline(rss)}"
+        info += (
+            f"\nthreads {history.latest('threads'):.0f}  fds {history.latest('fds'):.0f}"
+            f"  I/O r {format_bytes(history.latest('read_rate'))}/s w {format_bytes(history.latest('write_rate'))}/s"
+        )
+        return info
+
+    def pending_info(self, app_name):
+        record = self.app.process_table.get(app_name)
+        if record.state != QUEUED:
+            return f"{app_name} (admitted)\nStarting..."
+        reason = self.app.launch_reason(app_name)
+        info = f"{app_name} (queued for {time.time() - record.queued_at:.0f}s)"
+        return info + f"\n{reason[:1].upper()}{reason[1:]}"
+
+    def update_metrics(self):
+        for index, app_name in enumerate(getattr(self, 'pending_names', [])):
+            try:
+                self.query_one(f"#pending_{index}", Static).update(self.pending_info(app_name))
+            except NoMatches:
+                pass
+        for app_name, pid in self.app.get_running_apps():
+            try:
+                self.query_one(f"#info_{pid}", Static).update(self.app_info(app_name, pid))
+            except NoMatches:
+                pass
+
+    def update_warm_pool_status(self):
+        lines = []
+        for pool in self.app.warm_pool.status():
+            modules = ", ".join(pool["modules"]) or "no modules"
+            line = f"{pool['env']} ({modules}): {pool['idle']}/{pool['size']} ready"
+            if pool["starting"]:
+                line += f", {pool['starting']} starting"
+            if pool["error"]:
+                line += f" - failed: {pool['error']}"
+            lines.append(line)
+        text = "Warm pool\n" + "\n".join(lines) if lines else ""
+        if text != getattr(self, 'warm_pool_text', None):
+            self.warm_pool_text = text
+            status = self.query_one("#warm_pool_status", Static)
+            status.update(text)
+            status.set_class(not lines, "hidden")
+
     def on_button_pressed(self, event: Button.Pressed):
         button_id = event.button.id
         if button_id.startswith("kill_"):
@@ -70,104 +169,80 @@ class ProcessesModal(Screen):
         elif button_id.startswith("view_"):
             pid = int(button_id.split("_")[1])
             self.toggle_process_output(pid)
+        elif button_id.startswith("cancel_"):
+            self.app.cancel_launch(self.pending_names[int(button_id.split("_")[1])])
 
     def action_refresh(self):
         self.update_running_apps()
 
     def kill_process(self, pid):
-        try:
-            process = psutil.Process(pid)
-            app_name = next((name for name, p in self.app.running_processes.items() if p == pid), None)
-            
-            if app_name is None:
-                # Check if this is a child process or a restarted process
-                for name, initial_pid in self.app.running_processes.items():
-                    if self.is_related_process(initial_pid, pid):
-                        app_name = name
-                        break
-            
-            if app_name is None:
-                self.notify(f"Process with PID {pid} is not managed by this application.")
-                self.update_running_apps()  # Refresh the list to remove any stale entries
-                return
-
-            def kill_proc_tree(proc, include_parent=True):
-                children = proc.children(recursive=True)
-                for child in children:
-                    try:
-                        child.terminate()
-                    except psutil.NoSuchProcess:
-                        pass
-                gone, still_alive = psutil.wait_procs(children, timeout=5)
-                for p in still_alive:
-                    try:
-                        p.kill()
-                    except psutil.NoSuchProcess:
-                        pass
-                if include_parent:
-                    try:
-                        proc.terminate()
-                        proc.wait(5)
-                    except psutil.NoSuchProcess:
-                        pass
-
-            kill_proc_tree(process)
-            
-            self.notify(f"Process {app_name} (PID: {pid}) and its children have been terminated.")
-            
-            # Remove the process from the app's running processes
-            if app_name in self.app.running_processes:
-                del self.app.running_processes[app_name]
-            if app_name in self.app.process_outputs:
-                del self.app.process_outputs[app_name]
-
-            # Delete the associated .log file
-            log_file = f"{app_name}.log"
-            if os.path.exists(log_file):
-                try:
-                    os.remove(log_file)
-                    self.notify(f"Deleted log file: {log_file}")
-                except Exception as e:
-                    self.notify(f"Error deleting log file {log_file}: {str(e)}")
-
-            # Close the sidebar if the killed process was being viewed
-            if hasattr(self, 'current_pid') and self.current_pid == pid:
-                self.close_output_sidebar()
-
-            self.update_running_apps()  # Refresh the list immediately after killing a process
+        app_name = next((name for name, p in self.app.running_processes.items() if p == pid), None)
+        
+        if app_name is None:
+            # A process further down a launched tree, e.g. the interpreter under a shell wrapper.
+            app_name = self.app.process_index.app_name(pid)
+        
+        if app_name is None:
+            self.notify(f"Process with PID {pid} is not managed by this application.")
+            self.update_running_apps()  # Refresh the list to remove any stale entries
+            return
+
+        self.notify(f"Terminating {app_name} (PID: {pid})...")
+        # The app may be launched again during the grace period; only this run's output is dropped.
+        output = self.app.process_outputs.get(app_name)
+        # Runs on the app so the kill finishes even if this screen is closed.
+        self.app.run_worker(lambda: self._terminate(app_name, pid, output), thread=True, group="kill", exit_on_error=False)
 
+    def action_kill_all(self):
+        running_apps = self.app.get_running_apps()
+        if not running_apps:
+            self.notify("No running processes.")
+            return
+        for _, pid in running_apps:
+            self.kill_process(pid)
+
+    def _terminate(self, app_name, pid, output):
+        """Worker thread body: terminate the process tree and report back to the UI."""
+        grace_period = self.app.settings.get("kill_grace_period", DEFAULT_GRACE_PERIOD)
+
+        def progress(message):
+            self.app.call_from_thread(self.notify, f"{app_name}: {message}")
+
+        try:
+            remaining = terminate_tree(pid, grace_period, progress)
         except psutil.NoSuchProcess:
-            self.notify(f"Process with PID {pid} not found.")
-            self.update_running_apps()  # Refresh the list to remove any stale entries
+            self.app.call_from_thread(self.notify, f"Process with PID {pid} not found.")
+            remaining = 0
         except psutil.AccessDenied:
-            self.notify(f"Access denied when trying to terminate process with PID {pid}.")
+            self.app.call_from_thread(self.notify, f"Access denied when trying to terminate process with PID {pid}.")
+            return
         except Exception as e:
-            self.notify(f"Error terminating process: {str(e)}")
-            self.update_running_apps()  # Refresh the list to ensure it's up-to-date
+            self.app.call_from_thread(self.notify, f"Error terminating process: {str(e)}")
+            return
+        self.app.call_from_thread(self._finish_kill, app_name, pid, output, remaining)
 
-    def is_related_process(self, initial_pid, current_pid):
-        try:
-            initial_process = psutil.Process(initial_pid)
-            current_process = psutil.Process(current_pid)
-            
-            # Check if it's a child process
-            if current_process in initial_process.children(recursive=True):
-                return True
-            
-            # Check if it has the same name or command line
-            if current_process.name() == initial_process.name():
-                return True
-            
-            if len(current_process.cmdline()) > 1 and len(initial_process.cmdline()) > 1:
-                if current_process.cmdline()[-1] == initial_process.cmdline()[-1]:
-                    return True
-            
-            return False
-        except psutil.NoSuchProcess:
-            return False
+    def _finish_kill(self, app_name, pid, output, remaining):
+        if remaining:
+            self.notify(f"{remaining} process(es) of {app_name} could not be killed.", severity="error")
+        else:
+            self.notify(f"Process {app_name} (PID: {pid}) and its children have been terminated.")
+
+        # The process table learns about the exit from the launch backend;
+        # only the in-memory output needs dropping here. The run's log file
+        # stays on disk until log_keep_runs newer runs have replaced it.
+        if output is not None and self.app.process_outputs.get(app_name) is output:
+            del self.app.process_outputs[app_name]
+
+        if not self.is_mounted:
+            return
+
+        # Close the sidebar if the killed process was being viewed
+        if hasattr(self, 'current_pid') and self.current_pid == pid:
+            self.close_output_sidebar()
+
+        self.update_running_apps()  # Refresh the list immediately after killing a process
 
     def toggle_process_output(self, pid):
-        output_sidebar = self.query_one("#output_sidebar")
         if hasattr(self, 'current_pid') and self.current_pid == pid:
             self.close_output_sidebar()
         else:
@@ -176,6 +251,8 @@ class ProcessesModal(Screen):
     def close_output_sidebar(self):
         output_sidebar = self.query_one("#output_sidebar")
         output_sidebar.add_class("hidden")
+        self.query_one("#process_output", OutputView).show(None, "")
+        self.start_search("")
         if hasattr(self, 'current_pid'):
             delattr(self, 'current_pid')
         if hasattr(self, 'current_app_name'):
@@ -185,63 +262,121 @@ class ProcessesModal(Screen):
         output_sidebar = self.query_one("#output_sidebar")
         output_sidebar.remove_class("hidden")
         
-        process_output = self.query_one("#process_output", RichLog)
-        process_output.clear()
-        
+        process_output = self.query_one("#process_output", OutputView)
+
         try:
-            process = psutil.Process(pid)
+            psutil.Process(pid)  # raises NoSuchProcess if it has exited
             self.current_app_name = next((app_name for app_name, app_pid in self.app.running_processes.items() if app_pid == pid), "Unknown")
             self.current_pid = pid
             
             output_title = self.query_one("#output_title", Static)
             output_title.update(f"Output for {self.current_app_name}")
             
-            output = self.app.get_process_output(self.current_app_name)
-            if output:
-                process_output.write(Text(output))
-                process_output.scroll_end(animate=False)
-            else:
-                process_output.write(Text("No output available.", style="italic"))
-            
-            self.user_scrolled = False
-            
+            process_output.show(self.app.process_outputs.get(self.current_app_name))
+            self.start_search(self.query_one("#output_search", Input).value)
+
         except psutil.NoSuchProcess:
-            process_output.write(Text(f"Process with PID {pid} not found.", style="red"))
+            process_output.show(None, f"Process with PID {pid} not found.")
         except psutil.AccessDenied:
-            process_output.write(Text(f"Access denied when trying to access process with PID {pid}.", style="red"))
+            process_output.show(None, f"Access denied when trying to access process with PID {pid}.")
 
     def update_process_output(self):
         if hasattr(self, 'current_app_name') and hasattr(self, 'current_pid'):
-            process_output = self.query_one("#process_output", RichLog)
-            new_output = self.app.get_process_output(self.current_app_name)
-            if new_output:
-                current_content = process_output.render()
-                if new_output != current_content:
-                    process_output.clear()
-                    process_output.write(Text(new_output))
-                    if not self.user_scrolled:
-                        process_output.scroll_end(animate=False)
-
-    def on_process_output_updated(self, message: Message):
-        if hasattr(self, 'current_app_name') and hasattr(message, 'app_name') and message.app_name == self.current_app_name:
-            self.update_process_output()
+            with self.app.metrics.histogram("output_view_update_seconds", "Time taken to bring the output view up to date with new output.").time():
+                self.query_one("#process_output", OutputView).update()
 
     def on_conda_launcher_process_output_updated(self, message: Message):
         if hasattr(self, 'current_app_name') and hasattr(message, 'app_name') and message.app_name == self.current_app_name:
             self.update_process_output()
-        if message.app_name not in [app_name for app_name, _ in self.app.get_running_apps()]:
-            self.update_running_apps()  # Refresh the list when a new process is added
+            # Search the new lines too.
+            if self.output_search is not None and not self.search_running and not self.output_search.truncated:
+                self._run_search(self.output_search)
 
-    def check_scroll_position(self):
-        if hasattr(self, 'current_app_name') and hasattr(self, 'current_pid'):
-            process_output = self.query_one("#process_output", RichLog)
-            current_scroll = process_output.scroll_y
-            
-            if current_scroll < self.last_scroll_position:
-                # Scrolled up
-                self.user_scrolled = True
-            elif current_scroll >= process_output.max_scroll_y:
-                # Scrolled to bottom
-                self.user_scrolled = False
-            
-            self.last_scroll_position = current_scroll
+    def on_input_changed(self, event: Input.Changed):
+        if event.input.id == "output_search":
+            self.start_search(event.value)
+
+    def on_input_submitted(self, event: Input.Submitted):
+        if event.input.id == "output_search":
+            self.action_next_match()
+
+    def action_focus_search(self):
+        if not self.query_one("#output_sidebar").has_class("hidden"):
+            self.query_one("#output_search", Input).focus()
+
+    def action_next_match(self):
+        self.query_one("#process_output", OutputView).next_match()
+        self.update_search_status()
+
+    def action_previous_match(self):
+        self.query_one("#process_output", OutputView).next_match(-1)
+        self.update_search_status()
+
+    def start_search(self, query):
+        """Search the viewed output for ``query``, replacing the search in progress."""
+        process_output = self.query_one("#process_output", OutputView)
+        self.output_search = None
+        self.search_running = False
+        self.workers.cancel_group(self, "output_search")
+        status = ""
+        if query and process_output.output is not None:
+            try:
+                self.output_search = OutputSearch(query)
+            except re.error as e:
+                status = f"Invalid regular expression: {e}"
+        process_output.set_search(self.output_search)
+        self.query_one("#search_status", Static).update(status)
+        if self.output_search is not None:
+            self._run_search(self.output_search)
+
+    def _run_search(self, search):
+        output = self.query_one("#process_output", OutputView).output
+        self.search_running = True
+        self.update_search_status()
+        # Matching runs on a thread; starting another search cancels this one.
+        self.run_worker(lambda: self._search(search, output), thread=True, exclusive=True, group="output_search", exit_on_error=False)
+
+    def _search(self, search, output):
+        """Worker thread body: run ``search`` over ``output`` and pass the matches to the UI."""
+        worker = get_current_worker()
+
+        def on_matches(seqs):
+            self.app.call_from_thread(self._add_matches, search, seqs)
+
+        try:
+            search.run(output, on_matches, lambda: worker.is_cancelled)
+        except OSError as e:
+            self.app.call_from_thread(self.notify, f"Error searching output: {str(e)}", severity="error")
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self._search_finished, search, output)
+
+    def _add_matches(self, search, seqs):
+        if search is self.output_search:
+            self.query_one("#process_output", OutputView).add_matches(seqs)
+            self.update_search_status()
+
+    def _search_finished(self, search, output):
+        if search is not self.output_search:
+            return
+        self.search_running = False
+        if search.searched_to < output.seq and not search.truncated:
+            self._run_search(search)  # more output arrived meanwhile
+        else:
+            self.update_search_status()
+
+    def update_search_status(self):
+        if self.output_search is None:
+            return
+        process_output = self.query_one("#process_output", OutputView)
+        count = len(process_output.matches)
+        # Only the first pass is worth reporting; later ones cover a few new lines.
+        searching = self.search_running and self.output_search.searched_to == 0
+        if not count:
+            text = "Searching..." if searching else "No matches"
+        else:
+            text = f"{count}{'+' if self.output_search.truncated else ''} matching lines"
+            if process_output.current_match is not None:
+                text = f"{process_output.current_match + 1} of {text}"
+            if searching:
+                text += ", searching..."
+        self.query_one("#search_status", Static).update(text)
@@ -0,0 +1,73 @@
+from textual.screen import Screen
+from textual.containers import VerticalScroll
+from textual.widgets import Static, Header, Footer
+from textual.binding import Binding
+
+
+def format_seconds(value):
+    if value < 0.001:
+        return f"{value * 1e6:.0f}us"
+    return f"{value * 1000:.1f}ms" if value < 1 else f"{value:.2f}s"
+
+
+def format_metrics(registry):
+    lines = []
+    for name, kind, help, metrics in registry.collect():
+        lines.append(f"{name}  ({help})")
+        for labels, metric in metrics:
+            label = ", ".join(f"{key}={value}" for key, value in labels) or "all"
+            if kind == "counter":
+                lines.append(f"  {label:<30} {metric.value:,}")
+            elif metric.count:
+                lines.append(
+                    f"  {label:<30} {metric.count:,} x  avg {format_seconds(metric.sum / metric.count)}"
+                    f"  p50 <{format_seconds(metric.quantile(0.5))}  p95 <{format_seconds(metric.quantile(0.95))}"
+                    f"  max {format_seconds(metric.max)}"
+                )
+    return "\n".join(lines) or "Nothing recorded yet."
+
+
+class StatsModal(Screen):
+    """The launcher's own metrics, the exporter and the profiler, for telling whether the launcher is the bottleneck."""
+
+    BINDINGS = [
+        Binding("escape", "app.pop_screen", "Close"),
+        Binding("f11", "app.dump_profile", "Dump Profile"),
+    ]
+
+    def compose(self):
+        yield Header()
+        yield VerticalScroll(
+            Static("Launcher Stats", classes="section-title"),
+            Static("", id="stats_status", markup=False),
+            Static("", id="stats_metrics", markup=False),
+            id="stats_modal"
+        )
+        yield Footer()
+
+    def on_mount(self):
+        self.update_stats()
+        self.stats_timer = self.set_interval(1, self.update_stats)
+
+    def on_unmount(self):
+        self.stats_timer.stop()
+
+    def update_stats(self):
+        status = []
+        exporter = self.app.metrics_exporter
+        if exporter is None:
+            status.append("Metrics export: off (set metrics_port or metrics_textfile)")
+        else:
+            if exporter.port:
+                status.append(f"Metrics served at http://{exporter.host}:{exporter.port}/metrics")
+            if exporter.textfile:
+                error = f" - failed: {exporter.error}" if exporter.error else ""
+                status.append(f"Metrics written to {exporter.textfile}{error}")
+        profiler = self.app.profiler
+        if profiler.running:
+            status.append(f"Profiler: {profiler.samples} samples since the last dump (F11 writes them)")
+        else:
+            status.append("Profiler: off (set profiler: true)")
+        status.append(f"Resource sampler: {self.app.resource_sampler.overhead:.1%} of a CPU")
+        self.query_one("#stats_status", Static).update("\n".join(status))
+        self.query_one("#stats_metrics", Static).update(format_metrics(self.app.metrics))